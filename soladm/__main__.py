@@ -1,10 +1,21 @@
 from getpass import getpass
 import argparse
-from typing import Optional, Tuple
+import asyncio
+from typing import (
+    Awaitable, Callable, Dict, Iterable, List, Optional, Tuple)
 from pathlib import Path
+from soladm import alerts
+from soladm import bans
+from soladm import event
+from soladm import export
+from soladm import matches
 from soladm import net
+from soladm import remote
+from soladm import rules
+from soladm.pipeline import DecodePipeline
 from soladm import ui
 from soladm.config import config
+from soladm.profiling import profiler
 
 
 DEFAULT_PORT = 23073
@@ -38,6 +49,16 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         '--pass', dest='password', default=None,
         help='server password to connect with')
+    parser.add_argument(
+        '--view', metavar='PATH',
+        help='browse a log file instead of connecting to a server')
+    parser.add_argument(
+        '--fleet', action='store_true',
+        help='show an overview of all servers from the config file')
+    parser.add_argument(
+        '--profile', metavar='PATH',
+        help='record timings and dump them on exit in the folded format '
+        'used by flamegraph.pl')
     return parser.parse_args()
 
 
@@ -69,11 +90,172 @@ def main() -> None:
     args = parse_args()
     _load_config(args.config)
 
+    if args.profile:
+        profiler.enabled = True
+
+    if args.view:
+        ui.run_viewer(Path(args.view))
+    elif args.fleet:
+        _run_fleet()
+    else:
+        _run_single(args)
+
+    if args.profile:
+        profiler.dump(Path(args.profile))
+
+
+def _make_connection(host: str, port: int, password: str) -> net.Connection:
+    return net.Connection(
+        host,
+        port,
+        password,
+        stall_timeout=config.health.stall_timeout,
+        keepalive_idle=config.health.keepalive_idle,
+        outbox_ttl=config.health.outbox_ttl)
+
+
+def _attach_bans(connections: Iterable[net.Connection]) -> None:
+    ban_list = bans.load_access_list(config.bans.ban_lists)
+    if not len(ban_list):
+        return
+    whitelist = bans.load_access_list(config.bans.whitelists)
+    for connection in connections:
+        bans.BanEnforcer(ban_list, whitelist, config.bans.action).attach(
+            connection)
+
+
+def _attach_match_tracking(connections: Dict[str, net.Connection]) -> None:
+    if not config.matches.path:
+        return
+    match_log = matches.MatchLog(
+        Path(config.matches.path).expanduser(),
+        config.matches.max_size,
+        config.matches.backups)
+    for name, connection in connections.items():
+        tracker = matches.MatchTracker(name)
+        tracker.on_match_end.append(match_log.append)
+        tracker.attach(connection)
+
+
+def _make_export_sink(
+        connections: Dict[str, net.Connection]) -> Optional[export.ExportSink]:
+    if not config.export.path:
+        return None
+    sink = export.ExportSink(
+        Path(config.export.path).expanduser(),
+        config.export.format,
+        config.export.compress,
+        classify=config.ui.classify)
+    for name, connection in connections.items():
+        sink.attach(connection, name, config.export.snapshots)
+    sink.start()
+    return sink
+
+
+def _make_alerts(
+        connections: Dict[str, net.Connection]
+) -> Optional[alerts.AlertDispatcher]:
+    sinks: List[alerts.AlertSink] = []
+    if config.alerts.command:
+        sinks.append(alerts.CommandSink(config.alerts.command))
+    if config.alerts.webhook:
+        sinks.append(alerts.WebhookSink(config.alerts.webhook))
+    if config.alerts.path:
+        sinks.append(alerts.FileSink(Path(config.alerts.path).expanduser()))
+    if not sinks:
+        return None
+    patterns = config.alerts.regexes
+    if patterns is None:
+        patterns = config.ui.bell_regexes
+    dispatcher = alerts.AlertDispatcher(
+        sinks,
+        patterns,
+        config.alerts.batch_window,
+        config.alerts.cooldown,
+        config.alerts.queue_size)
+    for name, connection in connections.items():
+        dispatcher.attach(connection, name)
+    return dispatcher
+
+
+def _start_remote(
+        connections: Dict[str, net.Connection]
+) -> Optional[remote.RemoteServer]:
+    if not config.remote.listen:
+        return None
+    server = remote.RemoteServer(
+        connections, config.remote.token, config.remote.queue_size)
+    asyncio.get_event_loop().run_until_complete(
+        server.start(config.remote.listen))
+    return server
+
+
+def _run_fleet() -> None:
+    if not config.fleet.servers:
+        raise SystemExit('No [server.NAME] sections in the config file.')
+    connections = {
+        server.name: _make_connection(
+            server.host, server.port or DEFAULT_PORT, server.password)
+        for server in config.fleet.servers.values()}
+    for connection in connections.values():
+        rules.RuleEngine(config.rules.rules).attach(connection)
+    _attach_bans(connections.values())
+    _attach_match_tracking(connections)
+    sink = _make_export_sink(connections)
+    dispatcher = _make_alerts(connections)
+    remote_server = _start_remote(connections)
+
+    pipeline: Optional[DecodePipeline] = None
+    if config.pipeline.workers > 0:
+        pipeline = DecodePipeline(config.pipeline.workers)
+        for connection in connections.values():
+            pipeline.register(connection)
+
+    shutdown: List[Callable[[], Awaitable[None]]] = []
+    if remote_server:
+        shutdown.append(remote_server.close)
+    on_exception = event.EventHandler()
+    if sink:
+        sink.on_exception.append(on_exception)
+    if dispatcher:
+        dispatcher.on_error.append(on_exception)
+        shutdown.append(dispatcher.close)
+
+    try:
+        ui.run_fleet(connections, shutdown, on_exception)
+    finally:
+        if pipeline:
+            pipeline.close()
+        if sink:
+            sink.close()
+
+
+def _run_single(args: argparse.Namespace) -> None:
     log_path = args.log or config.log.path
     host, port, password = _get_connection_info(args)
 
-    connection = net.Connection(host, port, password)
-    ui.run(connection, Path(log_path) if log_path else None)
+    connection = _make_connection(host, port, password)
+    rules.RuleEngine(config.rules.rules).attach(connection)
+    _attach_bans([connection])
+    connections = {'{}:{}'.format(host, port): connection}
+    _attach_match_tracking(connections)
+    sink = _make_export_sink(connections)
+    dispatcher = _make_alerts(connections)
+    if sink:
+        sink.on_exception.append(connection.on_exception)
+    if dispatcher:
+        dispatcher.on_error.append(connection.on_exception)
+    remote_server = _start_remote(connections)
+    shutdown: List[Callable[[], Awaitable[None]]] = []
+    if remote_server:
+        shutdown.append(remote_server.close)
+    if dispatcher:
+        shutdown.append(dispatcher.close)
+    try:
+        ui.run(connection, Path(log_path) if log_path else None, shutdown)
+    finally:
+        if sink:
+            sink.close()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,290 @@
+import abc
+import asyncio
+import json
+import shlex
+import time
+import urllib.request
+from datetime import datetime
+from pathlib import Path
+from typing import (
+    Any, Callable, Dict, List, NamedTuple, Optional, Pattern, Sequence, Tuple)
+from soladm import event, net
+from soladm.util import Cooldown
+
+
+DEFAULT_BATCH_WINDOW = 2.0
+DEFAULT_COOLDOWN = 60.0
+DEFAULT_QUEUE_SIZE = 100
+DEFAULT_TIMEOUT = 10.0
+# how long exiting waits for the last alerts to be delivered
+CLOSE_TIMEOUT = 5.0
+# how many of the merged lines are passed on with an alert
+SAMPLE_SIZE = 5
+
+
+class Alert(NamedTuple):
+    server: str
+    key: str
+    # the first few of the lines merged into this alert, and how many there
+    # were in total
+    texts: List[str]
+    count: int
+    time: float
+
+    @property
+    def text(self) -> str:
+        if self.count > 1:
+            return '{} (and {} more)'.format(self.texts[0], self.count - 1)
+        return self.texts[0]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'server': self.server,
+            'key': self.key,
+            'text': self.text,
+            'texts': self.texts,
+            'count': self.count,
+            'time': self.time,
+        }
+
+
+class AlertSink(abc.ABC):
+    @abc.abstractmethod
+    async def send(self, alerts: List[Alert]) -> None:
+        raise NotImplementedError()
+
+
+class CommandSink(AlertSink):
+    # runs a command, such as notify-send, for every alert; {server}, {text}
+    # and {count} in its arguments are replaced
+    def __init__(
+            self, command: str, timeout: float = DEFAULT_TIMEOUT) -> None:
+        self.args = shlex.split(command)
+        self.timeout = timeout
+
+    async def send(self, alerts: List[Alert]) -> None:
+        for alert in alerts:
+            process = await asyncio.create_subprocess_exec(
+                *(
+                    arg.format(
+                        server=alert.server,
+                        text=alert.text,
+                        count=alert.count)
+                    for arg in self.args
+                ),
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL)
+            try:
+                await asyncio.wait_for(process.wait(), self.timeout)
+            except asyncio.TimeoutError:
+                process.kill()
+                raise
+
+
+class WebhookSink(AlertSink):
+    # POSTs every batch as {"alerts": [...]}; urllib blocks, so it runs in a
+    # worker thread
+    def __init__(self, url: str, timeout: float = DEFAULT_TIMEOUT) -> None:
+        self.url = url
+        self.timeout = timeout
+
+    async def send(self, alerts: List[Alert]) -> None:
+        data = json.dumps(
+            {'alerts': [alert.to_dict() for alert in alerts]}).encode()
+        await asyncio.get_event_loop().run_in_executor(
+            None, self._post, data)
+
+    def _post(self, data: bytes) -> None:
+        request = urllib.request.Request(
+            self.url,
+            data=data,
+            headers={'Content-Type': 'application/json'},
+            method='POST')
+        with urllib.request.urlopen(request, timeout=self.timeout) as reply:
+            reply.read()
+
+
+class FileSink(AlertSink):
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    async def send(self, alerts: List[Alert]) -> None:
+        lines = ''.join(
+            '[{}] {}: {}\n'.format(
+                datetime.fromtimestamp(alert.time).strftime(
+                    '%Y-%m-%d %H:%M:%S'),
+                alert.server,
+                alert.text)
+            for alert in alerts)
+        await asyncio.get_event_loop().run_in_executor(
+            None, self._write, lines)
+
+    def _write(self, lines: str) -> None:
+        with self.path.open('a', encoding='utf-8') as handle:
+            handle.write(lines)
+
+
+async def _cancel(task: Optional['asyncio.Future[None]']) -> None:
+    if task:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+
+class _Pending:
+    __slots__ = ('texts', 'count', 'deadline')
+
+    def __init__(self, text: str, deadline: float) -> None:
+        self.texts = [text]
+        self.count = 1
+        self.deadline = deadline
+
+
+class _SinkWorker:
+    # every sink has its own queue and task, so that a slow one only holds
+    # up itself; when it falls behind, batches are dropped
+    def __init__(
+            self,
+            sink: AlertSink,
+            queue_size: int,
+            on_error: event.EventHandler) -> None:
+        self.sink = sink
+        self.queue: 'asyncio.Queue[List[Alert]]' = asyncio.Queue(queue_size)
+        self.dropped = 0
+        self._on_error = on_error
+        self._falling_behind = False
+        self._task: Optional['asyncio.Future[None]'] = None
+
+    def push(self, alerts: List[Alert]) -> None:
+        if not self._task:
+            self._task = asyncio.ensure_future(self._run())
+        try:
+            self.queue.put_nowait(alerts)
+            self._falling_behind = False
+        except asyncio.QueueFull:
+            self.dropped += 1
+            # reported once for every stretch of drops
+            if not self._falling_behind:
+                self._falling_behind = True
+                self._on_error(RuntimeError(
+                    '{} is falling behind, dropping alerts'.format(
+                        type(self.sink).__name__)))
+
+    async def close(self) -> None:
+        await _cancel(self._task)
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            alerts = await self.queue.get()
+            try:
+                await self.sink.send(alerts)
+            except asyncio.CancelledError:
+                raise
+            except Exception as ex:
+                self._on_error(ex)
+            finally:
+                self.queue.task_done()
+
+
+class AlertDispatcher:
+    # console lines matching the patterns become alerts. the first match of
+    # a pattern on a server waits for the batch window so that a flood ends
+    # up in a single alert; after that the pattern is quiet for the cooldown
+    # and what it matches meanwhile is counted into the next alert.
+    def __init__(
+            self,
+            sinks: Sequence[AlertSink],
+            patterns: Sequence[Pattern] = (),
+            batch_window: float = DEFAULT_BATCH_WINDOW,
+            cooldown: float = DEFAULT_COOLDOWN,
+            queue_size: int = DEFAULT_QUEUE_SIZE,
+            clock: Callable[[], float] = time.monotonic) -> None:
+        self.patterns = list(patterns)
+        self.batch_window = batch_window
+        self.on_error = event.EventHandler()
+        self._workers = [
+            _SinkWorker(sink, queue_size, self.on_error) for sink in sinks]
+        self._clock = clock
+        self._cooldown = Cooldown(cooldown, clock)
+        self._pending: Dict[Tuple[str, str], _Pending] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional['asyncio.Future[None]'] = None
+
+    @property
+    def dropped(self) -> int:
+        return sum(worker.dropped for worker in self._workers)
+
+    def attach(self, connection: net.Connection, server: str) -> None:
+        connection.on_message.append(lambda text: self.check(server, text))
+
+    def check(self, server: str, text: str) -> None:
+        for pattern in self.patterns:
+            if pattern.match(text):
+                self.notify(server, pattern.pattern, text)
+                return
+
+    def notify(self, server: str, key: str, text: str) -> None:
+        pending = self._pending.get((server, key))
+        if pending:
+            pending.count += 1
+            if len(pending.texts) < SAMPLE_SIZE:
+                pending.texts.append(text)
+            return
+        delay = max(
+            self.batch_window, self._cooldown.remaining((server, key)))
+        self._pending[server, key] = _Pending(text, self._clock() + delay)
+        if not self._task:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.ensure_future(self._run())
+        assert self._wakeup
+        self._wakeup.set()
+
+    def flush(self, force: bool = False) -> None:
+        now = self._clock()
+        alerts = []
+        for (server, key), pending in list(self._pending.items()):
+            if force or pending.deadline <= now:
+                del self._pending[server, key]
+                self._cooldown.ready((server, key))
+                alerts.append(Alert(
+                    server, key, pending.texts, pending.count, time.time()))
+        if alerts:
+            for worker in self._workers:
+                worker.push(alerts)
+
+    async def drain(self) -> None:
+        # sends everything pending right away and waits until it's delivered
+        self.flush(force=True)
+        for worker in self._workers:
+            await worker.queue.join()
+
+    async def close(self, timeout: float = CLOSE_TIMEOUT) -> None:
+        # what's still waiting for its batch window or cooldown is sent
+        # first, but a stuck sink doesn't hold up exiting for long
+        try:
+            await asyncio.wait_for(self.drain(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        await _cancel(self._task)
+        self._task = None
+        for worker in self._workers:
+            await worker.close()
+
+    async def _run(self) -> None:
+        assert self._wakeup
+        while True:
+            self._wakeup.clear()
+            if self._pending:
+                delay = min(
+                    pending.deadline for pending in self._pending.values()
+                ) - self._clock()
+                if delay <= 0:
+                    self.flush()
+                    continue
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await self._wakeup.wait()
@@ -0,0 +1,351 @@
+import asyncio
+import json
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+from soladm import event, net, parser
+from soladm.matches import MatchSummary, MatchTracker
+from soladm.profiling import profiler
+
+
+DEFAULT_RATING = 1500.0
+# kills happen all the time, so each one moves the ratings only a little
+KILL_FACTOR = 4.0
+MATCH_FACTOR = 16.0
+# how much better balanced a split has to be for every extra player moved
+DEFAULT_MOVE_PENALTY = 25.0
+DEFAULT_NODE_LIMIT = 5000
+
+_TWO_TEAM_MODES = (
+    net.GameMode.CaptureTheFlag,
+    net.GameMode.Infiltration,
+    net.GameMode.HoldTheFlag,
+)
+_TEAMS = (net.PlayerTeam.ALPHA, net.PlayerTeam.BRAVO)
+
+
+def player_key(name: str, hwid: str) -> str:
+    return hwid or name
+
+
+def _expected(rating: float, opponent: float) -> float:
+    return 1 / (1 + 10 ** ((opponent - rating) / 400))
+
+
+class RatingStore:
+    # Elo ratings by HWID (or name, for players without one), saved as a
+    # single JSON object
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = path
+        self.ratings: Dict[str, float] = {}
+        self.dirty = False
+
+    def __len__(self) -> int:
+        return len(self.ratings)
+
+    def get(self, key: str) -> float:
+        return self.ratings.get(key, DEFAULT_RATING)
+
+    def record_kill(self, killer: str, victim: str) -> None:
+        if killer == victim:
+            return
+        change = KILL_FACTOR * (
+            1 - _expected(self.get(killer), self.get(victim)))
+        self.ratings[killer] = self.get(killer) + change
+        self.ratings[victim] = self.get(victim) - change
+        self.dirty = True
+
+    def record_match(self, summary: MatchSummary) -> None:
+        # every player plays against the average of the other team
+        teams: Dict[int, List[str]] = {int(team): [] for team in _TEAMS}
+        for player in summary.players:
+            if player.team in teams:
+                teams[player.team].append(
+                    player_key(player.name, player.hwid))
+        alpha, bravo = (teams[team] for team in _TEAMS)
+        if not alpha or not bravo:
+            return
+        score_alpha = summary.scores[0] if summary.scores else 0
+        score_bravo = summary.scores[1] if len(summary.scores) > 1 else 0
+        result = (
+            0.5 if score_alpha == score_bravo
+            else float(score_alpha > score_bravo))
+        average_alpha = sum(map(self.get, alpha)) / len(alpha)
+        average_bravo = sum(map(self.get, bravo)) / len(bravo)
+        for keys, opponent, score in (
+                (alpha, average_bravo, result),
+                (bravo, average_alpha, 1 - result)):
+            for key in keys:
+                self.ratings[key] = self.get(key) + MATCH_FACTOR * (
+                    score - _expected(self.get(key), opponent))
+        self.dirty = True
+
+    def load(self) -> None:
+        if not self.path or not self.path.exists():
+            return
+        with self.path.open('r', encoding='utf-8') as handle:
+            self.ratings = {
+                key: float(value) for key, value in json.load(handle).items()}
+        self.dirty = False
+
+    def save(self) -> None:
+        if not self.path or not self.dirty:
+            return
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with tmp_path.open('w', encoding='utf-8') as handle:
+            json.dump(
+                {key: round(value, 1) for key, value in self.ratings.items()},
+                handle,
+                separators=(',', ':'))
+        tmp_path.replace(self.path)
+        self.dirty = False
+
+
+class Move(NamedTuple):
+    player_id: int
+    name: str
+    team: net.PlayerTeam
+
+    @property
+    def command(self) -> str:
+        return '/setteam{} {}'.format(int(self.team), self.player_id)
+
+
+class Split(NamedTuple):
+    alpha: float
+    bravo: float
+    moves: List[Move]
+
+    @property
+    def difference(self) -> float:
+        return abs(self.alpha - self.bravo)
+
+
+def _improve(
+        values: Sequence[float],
+        on_alpha: Sequence[bool],
+        move_penalty: float) -> List[bool]:
+    # hill climbing from the current teams by moving or swapping players,
+    # which gives the search a good split to beat right away
+    count = len(values)
+    assignment = list(on_alpha)
+    # uneven teams have to be evened out first
+    while 2 * sum(assignment) - count > 1:
+        assignment[assignment.index(True)] = False
+    while count - 2 * sum(assignment) > 1:
+        assignment[assignment.index(False)] = True
+    alpha_count = sum(assignment)
+    diff = sum(
+        value if to_alpha else -value
+        for value, to_alpha in zip(values, assignment))
+    # the change in the difference and the move count if a player switched
+    shifts = [
+        -2 * value if to_alpha else 2 * value
+        for value, to_alpha in zip(values, assignment)]
+    penalties = [
+        -move_penalty if to_alpha != old else move_penalty
+        for to_alpha, old in zip(assignment, on_alpha)]
+
+    while True:
+        best_cost = abs(diff)
+        best_change: List[int] = []
+        for i in range(count):
+            # a single move, only allowed if the teams stay even
+            new_alpha_count = alpha_count + (-1 if assignment[i] else 1)
+            if abs(2 * new_alpha_count - count) <= 1:
+                cost = abs(diff + shifts[i]) + penalties[i]
+                if cost < best_cost - 1e-9:
+                    best_cost = cost
+                    best_change = [i]
+            if not assignment[i]:
+                continue
+            for j in range(count):
+                if assignment[j]:
+                    continue
+                cost = (
+                    abs(diff + shifts[i] + shifts[j]) +
+                    penalties[i] + penalties[j])
+                if cost < best_cost - 1e-9:
+                    best_cost = cost
+                    best_change = [i, j]
+        if not best_change:
+            return assignment
+        for i in best_change:
+            alpha_count += -1 if assignment[i] else 1
+            diff += shifts[i]
+            assignment[i] = not assignment[i]
+            shifts[i] = -shifts[i]
+            penalties[i] = -penalties[i]
+
+
+def suggest_split(
+        players: Sequence[net.PlayerInfo],
+        ratings: Sequence[float],
+        move_penalty: float = DEFAULT_MOVE_PENALTY,
+        node_limit: int = DEFAULT_NODE_LIMIT) -> Split:
+    # branch and bound over alpha/bravo assignments of the playing players,
+    # minimizing the rating difference plus a penalty for every move. the
+    # hill climbing result is the split to beat, so balanced games are
+    # pruned almost immediately; the node limit caps the worst case.
+    order = sorted(range(len(players)), key=lambda i: -ratings[i])
+    values = [ratings[i] for i in order]
+    on_alpha = [players[i].team == net.PlayerTeam.ALPHA for i in order]
+    count = len(order)
+    max_team_size = (count + 1) // 2
+    # what the remaining players add to the difference if they stay put
+    staying = [0.0] * (count + 1)
+    for i in reversed(range(count)):
+        staying[i] = staying[i + 1] + (
+            values[i] if on_alpha[i] else -values[i])
+
+    best = _improve(values, on_alpha, move_penalty)
+    best_cost = abs(sum(
+        value if to_alpha else -value
+        for value, to_alpha in zip(values, best))) + move_penalty * sum(
+            a != b for a, b in zip(best, on_alpha))
+    assignment = [False] * count
+    nodes = 0
+
+    def lower_bound(i: int, diff: float) -> float:
+        # moving a player changes the difference by twice their rating, and
+        # the best the remaining players can do is moving the strongest ones
+        gap = abs(diff + staying[i])
+        bound = gap
+        moved = 0.0
+        for j in range(i, count):
+            moved += move_penalty
+            gap -= 2 * values[j]
+            cost = max(0.0, gap) + moved
+            if cost >= bound:
+                break
+            bound = cost
+        return bound
+
+    def search(i: int, alpha_count: int, diff: float, moves: int) -> None:
+        nonlocal best_cost, best, nodes
+        nodes += 1
+        if i == count:
+            cost = abs(diff) + move_penalty * moves
+            if cost < best_cost:
+                best_cost = cost
+                best = list(assignment)
+            return
+        if nodes > node_limit:
+            return
+        children = []
+        for to_alpha in (on_alpha[i], not on_alpha[i]):
+            new_alpha_count = alpha_count + to_alpha
+            if (
+                    new_alpha_count > max_team_size or
+                    i + 1 - new_alpha_count > max_team_size):
+                continue
+            new_diff = diff + (values[i] if to_alpha else -values[i])
+            new_moves = moves + (to_alpha != on_alpha[i])
+            bound = lower_bound(i + 1, new_diff) + move_penalty * new_moves
+            if bound < best_cost:
+                children.append((bound, to_alpha, new_diff, new_moves))
+        # the more promising branch first, so that a search cut short by
+        # the node limit still ends up with a good split
+        for bound, to_alpha, new_diff, new_moves in sorted(children):
+            if bound >= best_cost:
+                break
+            assignment[i] = to_alpha
+            search(i + 1, alpha_count + to_alpha, new_diff, new_moves)
+
+    search(0, 0, 0.0, 0)
+
+    moves = []
+    alpha_total = bravo_total = 0.0
+    for i, to_alpha in enumerate(best):
+        if to_alpha:
+            alpha_total += values[i]
+        else:
+            bravo_total += values[i]
+        if to_alpha != on_alpha[i]:
+            player = players[order[i]]
+            moves.append(Move(
+                player.id,
+                player.name,
+                net.PlayerTeam.ALPHA if to_alpha else net.PlayerTeam.BRAVO))
+    return Split(alpha_total, bravo_total, moves)
+
+
+class BalanceTracker:
+    # keeps the ratings up to date from kills and finished matches, and
+    # re-evaluates the team split on every refresh
+    def __init__(
+            self,
+            store: RatingStore,
+            move_penalty: float = DEFAULT_MOVE_PENALTY) -> None:
+        self.store = store
+        self.move_penalty = move_penalty
+        self.suggestion: Optional[Split] = None
+        self.on_action = event.EventHandler()
+        self._game_info: Optional[net.GameInfo] = None
+        self._key: Optional[Tuple[Tuple[int, int, int], ...]] = None
+        self._matches = MatchTracker('')
+        self._matches.on_match_end.append(self._on_match_end)
+
+    def attach(self, connection: net.Connection) -> None:
+        def send(command: str) -> None:
+            asyncio.ensure_future(connection.send(command))
+
+        self._game_info = connection.game_info
+        connection.on_event.append(self.process_event)
+        connection.on_refresh.append(
+            lambda: self._on_refresh(connection.game_info))
+        self.on_action.append(send)
+
+    def rating(self, player: net.PlayerInfo) -> float:
+        return self.store.get(player_key(player.name, player.hwid))
+
+    def process_event(self, game_event: parser.GameEvent) -> None:
+        if not isinstance(game_event, parser.Kill) or not self._game_info:
+            return
+        players = {player.id: player for player in self._game_info.players}
+        killer = players.get(game_event.killer_id)
+        victim = players.get(game_event.victim_id)
+        if not killer or not victim or killer is victim:
+            return
+        if killer.team == victim.team and killer.team in _TEAMS:
+            return
+        self.store.record_kill(
+            player_key(killer.name, killer.hwid),
+            player_key(victim.name, victim.hwid))
+
+    def update(self, game_info: net.GameInfo) -> None:
+        self._game_info = game_info
+        self._matches.update(game_info)
+        if game_info.game_mode not in _TWO_TEAM_MODES:
+            self.suggestion = None
+            self._key = None
+            return
+        players = [
+            player for player in game_info.players if player.team in _TEAMS]
+        ratings = [self.rating(player) for player in players]
+        # most refreshes change nothing that matters for the split
+        key = tuple(
+            (player.id, player.team, round(rating))
+            for player, rating in zip(players, ratings))
+        if key == self._key:
+            return
+        self._key = key
+        self.suggestion = suggest_split(players, ratings, self.move_penalty)
+
+    def apply(self) -> List[Move]:
+        if not self.suggestion:
+            return []
+        moves = self.suggestion.moves
+        for move in moves:
+            self.on_action(move.command)
+        # don't issue the same moves twice before the next refresh
+        self.suggestion = None
+        self._key = None
+        return moves
+
+    def _on_refresh(self, game_info: net.GameInfo) -> None:
+        with profiler.measure('balance'):
+            self.update(game_info)
+
+    def _on_match_end(self, summary: MatchSummary) -> None:
+        self.store.record_match(summary)
+        self.store.save()
@@ -0,0 +1,171 @@
+import asyncio
+import bisect
+import socket
+import string
+import time
+from pathlib import Path
+from typing import Callable, Iterable, List, Set, Tuple
+from soladm import event, net, parser, util
+
+
+DEFAULT_ACTION = '/kick {id}'
+DEFAULT_COOLDOWN = 10.0
+
+
+def parse_ip(text: str) -> int:
+    return int.from_bytes(socket.inet_aton(text.strip()), 'big')
+
+
+def parse_range(text: str) -> Tuple[int, int]:
+    # accepts 1.2.3.4, 1.2.3.0/24 and 1.2.3.4-1.2.3.8
+    text = text.strip()
+    if '/' in text:
+        address, prefix_text = text.split('/', 1)
+        prefix = int(prefix_text)
+        if not 0 <= prefix <= 32:
+            raise ValueError('Invalid prefix length: {}'.format(text))
+        mask = (0xFFFFFFFF << (32 - prefix)) & 0xFFFFFFFF
+        start = parse_ip(address) & mask
+        return (start, start | (~mask & 0xFFFFFFFF))
+    if '-' in text:
+        first, last = text.split('-', 1)
+        return (parse_ip(first), parse_ip(last))
+    address = parse_ip(text)
+    return (address, address)
+
+
+def _is_hwid(text: str) -> bool:
+    return len(text) == 11 and all(c in string.hexdigits for c in text)
+
+
+class IpRangeIndex:
+    def __init__(self) -> None:
+        self._pending: List[Tuple[int, int]] = []
+        self._starts: List[int] = []
+        self._ends: List[int] = []
+
+    def __len__(self) -> int:
+        self._build()
+        return len(self._starts)
+
+    def __contains__(self, address: int) -> bool:
+        self._build()
+        idx = bisect.bisect_right(self._starts, address) - 1
+        return idx >= 0 and self._ends[idx] >= address
+
+    def add(self, start: int, end: int) -> None:
+        self._pending.append((start, end))
+
+    def _build(self) -> None:
+        # merge everything into sorted, disjoint intervals once, so that
+        # lookups are a single binary search
+        if not self._pending:
+            return
+        ranges = sorted(
+            list(zip(self._starts, self._ends)) + self._pending)
+        self._pending = []
+        self._starts = []
+        self._ends = []
+        for start, end in ranges:
+            if self._ends and start <= self._ends[-1] + 1:
+                self._ends[-1] = max(self._ends[-1], end)
+            else:
+                self._starts.append(start)
+                self._ends.append(end)
+
+
+class AccessList:
+    def __init__(self) -> None:
+        self.ips = IpRangeIndex()
+        self.hwids: Set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self.ips) + len(self.hwids)
+
+    def add(self, entry: str) -> None:
+        entry = entry.strip()
+        if entry.lower().startswith('hwid:'):
+            entry = entry[5:].strip()
+            if not _is_hwid(entry):
+                raise ValueError('Invalid HWID: {}'.format(entry))
+        if _is_hwid(entry):
+            self.hwids.add(entry.upper())
+        else:
+            self.ips.add(*parse_range(entry))
+
+    def load(self, path: Path) -> None:
+        with path.open('r', encoding='utf-8', errors='replace') as handle:
+            for line in handle:
+                # allow comments, also after the entry
+                line = line.split('#', 1)[0].strip()
+                if line:
+                    self.add(line)
+
+    def matches(self, ip: str, hwid: str) -> bool:
+        if hwid and hwid.upper() in self.hwids:
+            return True
+        try:
+            return parse_ip(ip) in self.ips
+        except OSError:
+            return False
+
+
+class BanEnforcer:
+    def __init__(
+            self,
+            bans: AccessList,
+            whitelist: AccessList,
+            action: str = DEFAULT_ACTION,
+            cooldown: float = DEFAULT_COOLDOWN,
+            clock: Callable[[], float] = time.monotonic) -> None:
+        self.bans = bans
+        self.whitelist = whitelist
+        self.action = action
+        self.on_action = event.EventHandler()
+        self.on_refresh_request = event.EventHandler()
+        self._cooldown = util.Cooldown(cooldown, clock)
+
+    def is_banned(self, ip: str, hwid: str) -> bool:
+        return (
+            self.bans.matches(ip, hwid) and
+            not self.whitelist.matches(ip, hwid))
+
+    def attach(self, connection: net.Connection) -> None:
+        def send(command: str) -> None:
+            asyncio.ensure_future(connection.send(command))
+
+        def on_event(game_event: parser.GameEvent) -> None:
+            if isinstance(game_event, parser.JoinRequest):
+                self.process_join(game_event)
+
+        def refresh() -> None:
+            self.process_players(connection.game_info.players)
+
+        connection.on_event.append(on_event)
+        connection.on_refresh.append(refresh)
+        self.on_action.append(send)
+        self.on_refresh_request.append(connection.request_refresh)
+
+    def process_join(self, join_request: parser.JoinRequest) -> None:
+        # the player has no id yet, so ask for the roster right away rather
+        # than waiting for the next periodic refresh
+        if self.is_banned(join_request.ip, join_request.hwid):
+            self.on_refresh_request()
+
+    def process_players(self, players: Iterable[net.PlayerInfo]) -> None:
+        for player in players:
+            if not self.is_banned(player.ip, player.hwid):
+                continue
+            if self._cooldown.ready((player.id, player.ip, player.hwid)):
+                self.on_action(self.action.format(
+                    id=player.id,
+                    name=player.name,
+                    ip=player.ip,
+                    hwid=player.hwid))
+
+
+def load_access_list(paths: Iterable[str]) -> AccessList:
+    access_list = AccessList()
+    for path in paths:
+        access_list.load(Path(path).expanduser())
+    return access_list
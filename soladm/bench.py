@@ -0,0 +1,282 @@
+import argparse
+import asyncio
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+import urwid
+from soladm import net, parser
+from soladm.config import config
+from soladm.profiling import profiler
+from soladm.ui.ui import Ui
+
+
+DEFAULT_HOURS = 8.0
+DEFAULT_TOLERANCE = 0.25
+DEFAULT_SEED = 1
+SCREEN_SIZE = (160, 48)
+# one refresh and one frame per simulated second, like a live server
+MESSAGES_PER_SECOND = 2
+BURST_INTERVAL = 600
+BURST_SIZE = 500
+TEAM_SHUFFLE_INTERVAL = 900
+# frames don't hold on to memory, so the long run draws only now and then
+SESSION_FRAME_INTERVAL = 60
+WARMUP_SECONDS = 60
+TIMING_SECONDS = 300
+
+# metric name, whether higher values are better
+METRICS: Dict[str, bool] = {
+    'frames_per_second': True,
+    'render_us': False,
+    'refresh_us': False,
+    'game_stats_us': False,
+    'player_stats_us': False,
+    'message_us': False,
+    'log_to_ui_us': False,
+    'cpu_per_second_us': False,
+    'memory_growth_kib_per_hour': False,
+}
+# profiler stages that the timings are taken from
+_STAGES = {
+    'render_us': 'render',
+    'refresh_us': 'refresh',
+    'game_stats_us': 'refresh;game_stats',
+    'player_stats_us': 'refresh;player_stats',
+    'message_us': 'message',
+    'log_to_ui_us': 'message;log_to_ui',
+}
+
+_WEAPONS = ('Ak-74', 'Barrett M82A1', 'Desert Eagles', 'MP5', 'Steyr AUG')
+_CHAT = ('gg', 'nice one', 'who has the flag?', 'lag', 'rematch?', 'brb')
+
+
+class BenchScreen(urwid.BaseScreen):
+    # stands in for the terminal: walks every row of the canvas like the raw
+    # screen does, but doesn't output anything
+    def __init__(self, size: Tuple[int, int] = SCREEN_SIZE) -> None:
+        super().__init__()
+        self.size = size
+        self.frames = 0
+
+    def get_cols_rows(self) -> Tuple[int, int]:
+        return self.size
+
+    def set_terminal_properties(self, *args: Any, **kwargs: Any) -> None:
+        pass
+
+    def write(self, data: str) -> None:
+        pass
+
+    def hook_event_loop(self, event_loop: Any, callback: Any) -> None:
+        pass
+
+    def unhook_event_loop(self, event_loop: Any) -> None:
+        pass
+
+    def draw_screen(
+            self, size: Tuple[int, int], canvas: urwid.Canvas) -> None:
+        for row in canvas.content():
+            for _attr, _charset, _text in row:
+                pass
+        self.frames += 1
+
+
+class Session:
+    # a busy 32 player CTF server: stats change on every refresh, a couple
+    # of messages arrive every second with an occasional burst, and the
+    # teams are reshuffled every now and then
+    def __init__(self, ui: Ui, connection: net.Connection, seed: int) -> None:
+        self.ui = ui
+        self.connection = connection
+        self.elapsed = 0
+        self._random = random.Random(seed)
+        game_info = connection.game_info
+        game_info.map_name = 'ctf_Ash'
+        game_info.game_mode = net.GameMode.CaptureTheFlag
+        game_info.time_limit = 36000
+        game_info.score_limit = 10
+        for i, player in enumerate(game_info._players, 1):
+            player.id = i
+            player.name = 'Player{}'.format(i)
+            player.hwid = '{:011X}'.format(i)
+            player.ip = '10.0.{}.{}'.format(i // 256, i % 256)
+            player.team = (
+                net.PlayerTeam.ALPHA if i % 2 else net.PlayerTeam.BRAVO)
+
+    def step(self, draw: bool = True) -> None:
+        self.elapsed += 1
+        if self.elapsed % TEAM_SHUFFLE_INTERVAL == 0:
+            self._shuffle()
+        count = MESSAGES_PER_SECOND
+        if self.elapsed % BURST_INTERVAL == 0:
+            count += BURST_SIZE
+        for line in self._lines(count):
+            with profiler.measure('message'):
+                self.connection.dispatch_message(line, parser.parse(line))
+        self._update_players()
+        with profiler.measure('refresh'):
+            self.connection.dispatch_refresh()
+        if draw:
+            self.ui._loop.draw_screen()
+
+    def _lines(self, count: int) -> Iterable[str]:
+        players = self.connection.game_info.players
+        for _ in range(count):
+            killer, victim = self._random.sample(players, 2)
+            if self._random.random() < 0.8:
+                yield '({}) {} killed ({}) {} with {}'.format(
+                    killer.id,
+                    killer.name,
+                    victim.id,
+                    victim.name,
+                    self._random.choice(_WEAPONS))
+            else:
+                yield '[{}] {}'.format(
+                    killer.name, self._random.choice(_CHAT))
+
+    def _update_players(self) -> None:
+        game_info = self.connection.game_info
+        game_info.time_left = max(0, game_info.time_limit - self.elapsed * 60)
+        for player in game_info.players:
+            player.ping = max(10, player.ping + self._random.randint(-5, 5))
+            if self._random.random() < 0.1:
+                player.kills += 1
+            if self._random.random() < 0.1:
+                player.deaths += 1
+            player.pos.x = self._random.uniform(-1000, 1000)
+            player.pos.y = self._random.uniform(-1000, 1000)
+
+    def _shuffle(self) -> None:
+        game_info = self.connection.game_info
+        for player in game_info.players:
+            player.team = self._random.choice(
+                (net.PlayerTeam.ALPHA, net.PlayerTeam.BRAVO))
+            player.kills = player.deaths = player.caps = 0
+        # someone leaves and someone else takes the slot
+        player = self._random.choice(game_info.players)
+        player.name = 'Player{}'.format(self._random.randint(100, 999))
+
+
+def run(
+        hours: float = DEFAULT_HOURS,
+        seed: int = DEFAULT_SEED,
+        size: Tuple[int, int] = SCREEN_SIZE,
+        timing_seconds: int = TIMING_SECONDS) -> Dict[str, float]:
+    # the session is first played out with memory tracing on, then timed
+    # for a few more minutes with tracing off since it skews the timings
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    profiling_enabled = profiler.enabled
+    try:
+        screen = BenchScreen(size)
+        connection = net.Connection('localhost', 0, '')
+        ui = Ui(connection, None, screen=screen)
+        session = Session(ui, connection, seed)
+        for _ in range(WARMUP_SECONDS):
+            session.step()
+
+        seconds = int(hours * 3600)
+        gc.collect()
+        tracemalloc.start()
+        try:
+            memory_start = tracemalloc.get_traced_memory()[0]
+            for i in range(seconds):
+                session.step(draw=i % SESSION_FRAME_INTERVAL == 0)
+            gc.collect()
+            memory_end = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+
+        profiler.enabled = True
+        profiler.reset()
+        frames = screen.frames
+        start = time.process_time()
+        for _ in range(timing_seconds):
+            session.step()
+        cpu = time.process_time() - start
+
+        results = {
+            'frames_per_second': (screen.frames - frames) / max(
+                profiler.stats['render'].total, 1e-9),
+            'cpu_per_second_us': cpu / timing_seconds * 1e6,
+            'memory_growth_kib_per_hour': (
+                (memory_end - memory_start) / 1024 / max(hours, 1e-9)),
+        }
+        for name, stage in _STAGES.items():
+            stats = profiler.stats.get(stage)
+            results[name] = stats.average * 1e6 if stats else 0.0
+        return {name: round(results[name], 2) for name in METRICS}
+    finally:
+        profiler.enabled = profiling_enabled
+        profiler.reset()
+        loop.close()
+        asyncio.set_event_loop(None)
+
+
+def compare(
+        results: Dict[str, float],
+        baseline: Dict[str, float],
+        tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    # metrics that got worse than the baseline by more than the tolerance
+    regressions = []
+    for name, higher_is_better in METRICS.items():
+        if not baseline.get(name) or name not in results:
+            continue
+        change = (results[name] - baseline[name]) / abs(baseline[name])
+        if higher_is_better:
+            change = -change
+        if change > tolerance:
+            regressions.append('{}: {} (baseline: {}, {:+.0%})'.format(
+                name, results[name], baseline[name], change))
+    return regressions
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        'soladm benchmark',
+        description=(
+            'Drives the UI with a simulated session on a busy server, '
+            'without a terminal or a game server.'))
+    parser.add_argument(
+        '--hours', type=float, default=DEFAULT_HOURS,
+        help='length of the simulated session (default: {})'.format(
+            DEFAULT_HOURS))
+    parser.add_argument(
+        '--seed', type=int, default=DEFAULT_SEED,
+        help='seed for the simulated events')
+    parser.add_argument(
+        '-o', '--output', metavar='PATH', help='path to save results to')
+    parser.add_argument(
+        '-b', '--baseline', metavar='PATH',
+        help='path to earlier results to compare against')
+    parser.add_argument(
+        '--tolerance', type=float, default=DEFAULT_TOLERANCE,
+        help='how much worse than the baseline a metric may get '
+        '(default: {})'.format(DEFAULT_TOLERANCE))
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    config.read(Path(__file__).parent.joinpath('data', 'default_config.ini'))
+    results = run(args.hours, args.seed)
+    for name, value in results.items():
+        print('{:28} {}'.format(name, value))
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=4) + '\n')
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print('Regression: ' + regression)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+import asyncio
+import time
+from typing import Optional, Dict, Iterable, List
+from soladm import net
+from soladm.config import ServerConfig
+
+
+DEFAULT_TIMEOUT = 5.0
+DEFAULT_SETTLE_TIME = 1.0
+
+
+class BulkResult:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.error: Optional[str] = None
+        self.lines: List[str] = []
+        self.elapsed = 0.0
+
+
+def select_servers(
+        target: str, servers: Dict[str, ServerConfig]) -> List[str]:
+    # target is a comma separated list of server names, group names or "all"
+    names: List[str] = []
+    for item in target.split(','):
+        item = item.strip()
+        for server in servers.values():
+            if item in ('all', server.name) or item in server.groups:
+                if server.name not in names:
+                    names.append(server.name)
+    return names
+
+
+async def run_command(
+        name: str,
+        connection: net.Connection,
+        command: str,
+        timeout: float = DEFAULT_TIMEOUT,
+        settle_time: float = DEFAULT_SETTLE_TIME) -> BulkResult:
+    # the admin protocol has no replies as such, so everything the server
+    # says until it goes quiet for settle_time is considered the response
+    result = BulkResult(name)
+    start = time.monotonic()
+    last_line = asyncio.Event()
+
+    def on_message(line: str) -> None:
+        result.lines.append(line)
+        last_line.set()
+
+    connection.on_message.append(on_message)
+    try:
+        await asyncio.wait_for(connection.write(command), timeout)
+        deadline = start + timeout
+        while True:
+            last_line.clear()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(
+                    last_line.wait(), min(settle_time, remaining))
+            except asyncio.TimeoutError:
+                break
+    except asyncio.TimeoutError:
+        result.error = 'timeout'
+    except Exception as ex:
+        result.error = str(ex) or type(ex).__name__
+    finally:
+        connection.on_message.remove(on_message)
+    result.elapsed = time.monotonic() - start
+    return result
+
+
+async def broadcast(
+        connections: Dict[str, net.Connection],
+        names: Iterable[str],
+        command: str,
+        timeout: float = DEFAULT_TIMEOUT,
+        settle_time: float = DEFAULT_SETTLE_TIME) -> List[BulkResult]:
+    return list(await asyncio.gather(*(
+        run_command(name, connections[name], command, timeout, settle_time)
+        for name in names)))
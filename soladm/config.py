@@ -2,11 +2,23 @@ import configparser
 import re
 from typing import Any, Optional, Tuple, Sequence, List, Dict, Pattern
 from pathlib import Path
+from soladm.bans import DEFAULT_ACTION as DEFAULT_BAN_ACTION
+from soladm.history import DEFAULT_MAX_SIZE
+from soladm.latency import DEFAULT_WINDOW, STAT_NAMES
+from soladm.log_file import DEFAULT_SCROLLBACK
+from soladm import alerts, balance, matches, net, remote
+from soladm.rules import Rule, RuleTrigger, DEFAULT_COOLDOWN
 
 
 _UNUSED = object()
 Palette = Dict[str, Sequence[str]]
 
+PANE_CONSOLE = 'console'
+PANE_STATS = 'stats'
+PANE_PLAYERS = 'players'
+PANES = (PANE_CONSOLE, PANE_STATS, PANE_PLAYERS)
+DEFAULT_LAYOUT = ((PANE_CONSOLE,), (PANE_STATS, PANE_PLAYERS))
+
 
 def _make_pattern(text: str) -> Pattern:
     text = text.replace('%{PLAYER}', r'([ -~]{1,24})')
@@ -34,6 +46,50 @@ def _split_dict(text: str) -> List[Tuple[str, str]]:
     return ret
 
 
+class AlertsConfig:
+    def __init__(self) -> None:
+        # falls back to ui.bell_regexes
+        self.regexes: Optional[List[Pattern]] = None
+        self.command: Optional[str] = None
+        self.webhook: Optional[str] = None
+        self.path: Optional[str] = None
+        self.batch_window: float = alerts.DEFAULT_BATCH_WINDOW
+        self.cooldown: float = alerts.DEFAULT_COOLDOWN
+        self.queue_size: int = alerts.DEFAULT_QUEUE_SIZE
+
+    def read(self, ini: configparser.ConfigParser) -> None:
+        tmp: Any
+
+        tmp = ini.get('alerts', 'regexes', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.regexes = [
+                _make_pattern(line) for line in _split_lines(tmp)]
+
+        tmp = ini.get('alerts', 'command', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.command = tmp
+
+        tmp = ini.get('alerts', 'webhook', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.webhook = tmp
+
+        tmp = ini.get('alerts', 'path', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.path = tmp
+
+        tmp = ini.getfloat('alerts', 'batch_window', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.batch_window = tmp
+
+        tmp = ini.getfloat('alerts', 'cooldown', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.cooldown = tmp
+
+        tmp = ini.getint('alerts', 'queue_size', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.queue_size = tmp
+
+
 class AutoCompleteConfig:
     def __init__(self) -> None:
         self.server_commands: List[str] = []
@@ -56,6 +112,45 @@ class AutoCompleteConfig:
             self.bot_names = _split_lines(tmp)
 
 
+class BalanceConfig:
+    def __init__(self) -> None:
+        self.path: Optional[str] = None
+        self.move_penalty: float = balance.DEFAULT_MOVE_PENALTY
+
+    def read(self, ini: configparser.ConfigParser) -> None:
+        tmp: Any
+
+        tmp = ini.get('balance', 'path', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.path = tmp
+
+        tmp = ini.getfloat('balance', 'move_penalty', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.move_penalty = tmp
+
+
+class BansConfig:
+    def __init__(self) -> None:
+        self.ban_lists: List[str] = []
+        self.whitelists: List[str] = []
+        self.action: str = DEFAULT_BAN_ACTION
+
+    def read(self, ini: configparser.ConfigParser) -> None:
+        tmp: Any
+
+        tmp = ini.get('bans', 'ban_lists', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.ban_lists = _split_lines(tmp)
+
+        tmp = ini.get('bans', 'whitelists', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.whitelists = _split_lines(tmp)
+
+        tmp = ini.get('bans', 'action', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.action = tmp
+
+
 class ConnectionConfig:
     def __init__(self) -> None:
         self.host: Optional[str] = None
@@ -81,6 +176,192 @@ class ConnectionConfig:
             self.password = tmp
 
 
+class ServerConfig:
+    def __init__(
+            self,
+            name: str,
+            host: str,
+            port: Optional[int],
+            password: str,
+            groups: List[str]) -> None:
+        self.name = name
+        self.host = host
+        self.port = port
+        self.password = password
+        self.groups = groups
+
+
+class ExportConfig:
+    def __init__(self) -> None:
+        self.path: Optional[str] = None
+        self.format: str = 'jsonl'
+        self.compress: bool = False
+        self.snapshots: bool = True
+
+    def read(self, ini: configparser.ConfigParser) -> None:
+        tmp: Any
+
+        tmp = ini.get('export', 'path', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.path = tmp
+
+        tmp = ini.get('export', 'format', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.format = tmp
+
+        tmp = ini.getboolean('export', 'compress', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.compress = tmp
+
+        tmp = ini.getboolean('export', 'snapshots', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.snapshots = tmp
+
+
+class FleetConfig:
+    def __init__(self) -> None:
+        self.servers: Dict[str, ServerConfig] = {}
+
+    def read(self, ini: configparser.ConfigParser) -> None:
+        SERVER_PREFIX = 'server.'
+        for section_name, section in ini.items():
+            if not section_name.startswith(SERVER_PREFIX):
+                continue
+            name = section_name.replace(SERVER_PREFIX, '')
+            host = section.get('host', fallback=None)
+            password = (
+                section.get('pass', fallback=None) or
+                section.get('password', fallback=None))
+            if not host or not password:
+                raise ValueError(
+                    'Server {} needs a host and a password'.format(name))
+            self.servers[name] = ServerConfig(
+                name=name,
+                host=host,
+                port=section.getint('port', fallback=None),
+                password=password,
+                groups=_split_lines(
+                    section.get('groups', fallback='').replace(',', '\n')))
+
+
+class HealthConfig:
+    def __init__(self) -> None:
+        self.stall_timeout: float = net.DEFAULT_STALL_TIMEOUT
+        self.keepalive_idle: int = net.DEFAULT_KEEPALIVE_IDLE
+        self.outbox_ttl: float = net.DEFAULT_OUTBOX_TTL
+
+    def read(self, ini: configparser.ConfigParser) -> None:
+        tmp: Any
+
+        tmp = ini.getfloat('health', 'stall_timeout', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.stall_timeout = tmp
+
+        tmp = ini.getint('health', 'keepalive_idle', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.keepalive_idle = tmp
+
+        tmp = ini.getfloat('health', 'outbox_ttl', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.outbox_ttl = tmp
+
+
+class HistoryConfig:
+    def __init__(self) -> None:
+        self.path: Optional[str] = None
+        self.max_size: int = DEFAULT_MAX_SIZE
+
+    def read(self, ini: configparser.ConfigParser) -> None:
+        tmp: Any
+
+        tmp = ini.get('history', 'path', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.path = tmp
+
+        tmp = ini.getint('history', 'max_size', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.max_size = tmp
+
+
+class IdentityConfig:
+    def __init__(self) -> None:
+        self.path: Optional[str] = None
+
+    def read(self, ini: configparser.ConfigParser) -> None:
+        tmp: Any
+
+        tmp = ini.get('identity', 'path', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.path = tmp
+
+
+class LatencyConfig:
+    def __init__(self) -> None:
+        self.columns: List[str] = []
+        self.window: float = DEFAULT_WINDOW
+        self.p95_alert: int = 0
+        self.jitter_alert: int = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.columns or self.p95_alert or self.jitter_alert)
+
+    def read(self, ini: configparser.ConfigParser) -> None:
+        tmp: Any
+
+        tmp = ini.get('latency', 'columns', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.columns = _split_lines(tmp.replace(',', '\n'))
+            for column in self.columns:
+                if column not in STAT_NAMES:
+                    raise ValueError(
+                        'Unknown latency column: {}'.format(column))
+
+        tmp = ini.getfloat('latency', 'window', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.window = tmp
+
+        tmp = ini.getint('latency', 'p95_alert', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.p95_alert = tmp
+
+        tmp = ini.getint('latency', 'jitter_alert', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.jitter_alert = tmp
+
+
+class LayoutConfig:
+    def __init__(self) -> None:
+        self.columns: List[List[str]] = [
+            list(column) for column in DEFAULT_LAYOUT]
+        self.hidden: List[str] = []
+
+    def read(self, ini: configparser.ConfigParser) -> None:
+        tmp: Any
+
+        tmp = ini.get('layout', 'columns', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.columns = [
+                [name.strip() for name in line.split('+')]
+                for line in _split_lines(tmp)]
+            names = [name for column in self.columns for name in column]
+            for name in names:
+                if name not in PANES:
+                    raise ValueError('Unknown pane: {}'.format(name))
+            if names.count(PANE_CONSOLE) != 1:
+                raise ValueError('The layout needs exactly one console')
+            if len(set(names)) != len(names):
+                raise ValueError('Every pane can be used only once')
+
+        tmp = ini.get('layout', 'hidden', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.hidden = _split_lines(tmp.replace(',', '\n'))
+            for name in self.hidden:
+                if name not in PANES or name == PANE_CONSOLE:
+                    raise ValueError(
+                        'Pane cannot be hidden: {}'.format(name))
+
+
 class LogConfig:
     def __init__(self) -> None:
         self.path: Optional[str] = None
@@ -93,15 +374,118 @@ class LogConfig:
             self.path = tmp
 
 
+class MatchesConfig:
+    def __init__(self) -> None:
+        self.path: Optional[str] = None
+        self.max_size: int = matches.DEFAULT_MAX_SIZE
+        self.backups: int = matches.DEFAULT_BACKUPS
+
+    def read(self, ini: configparser.ConfigParser) -> None:
+        tmp: Any
+
+        tmp = ini.get('matches', 'path', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.path = tmp
+
+        tmp = ini.getint('matches', 'max_size', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.max_size = tmp
+
+        tmp = ini.getint('matches', 'backups', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.backups = tmp
+
+
+class PipelineConfig:
+    def __init__(self) -> None:
+        self.workers: int = 0
+
+    def read(self, ini: configparser.ConfigParser) -> None:
+        tmp: Any
+
+        tmp = ini.getint('pipeline', 'workers', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.workers = tmp
+
+
+class RemoteConfig:
+    def __init__(self) -> None:
+        self.listen: Optional[str] = None
+        self.token: Optional[str] = None
+        self.queue_size: int = remote.DEFAULT_QUEUE_SIZE
+
+    def read(self, ini: configparser.ConfigParser) -> None:
+        tmp: Any
+
+        tmp = ini.get('remote', 'listen', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.listen = tmp
+
+        tmp = ini.get('remote', 'token', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.token = tmp
+
+        tmp = ini.getint('remote', 'queue_size', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.queue_size = tmp
+
+
+class RulesConfig:
+    def __init__(self) -> None:
+        self.rules: List[Rule] = []
+
+    def read(self, ini: configparser.ConfigParser) -> None:
+        RULE_PREFIX = 'rule.'
+        for section_name, section in ini.items():
+            if not section_name.startswith(RULE_PREFIX):
+                continue
+            triggers = [trigger.value for trigger in RuleTrigger]
+            if section.get('trigger') not in triggers:
+                raise ValueError('Rule {} needs a trigger (one of {})'.format(
+                    section_name, ', '.join(triggers)))
+            trigger = RuleTrigger(section['trigger'])
+            pattern: Optional[Pattern] = None
+            field: Optional[str] = None
+            if trigger == RuleTrigger.MESSAGE:
+                pattern = _make_pattern(section['regex'])
+            elif trigger == RuleTrigger.PLAYER:
+                for field in ('name', 'hwid', 'ip'):
+                    if field in section:
+                        pattern = _make_pattern(section[field])
+                        break
+                else:
+                    raise ValueError(
+                        'Rule {} needs one of name, hwid or ip'.format(
+                            section_name))
+            self.rules.append(Rule(
+                name=section_name.replace(RULE_PREFIX, ''),
+                trigger=trigger,
+                action=section['action'],
+                cooldown=section.getfloat('cooldown', DEFAULT_COOLDOWN),
+                pattern=pattern,
+                field=field,
+                threshold=section.getint('threshold', 0),
+                refreshes=section.getint('refreshes', 1)))
+
+
 class UiConfig:
     def __init__(self) -> None:
         self.last_log: int = 0
+        self.scrollback: int = DEFAULT_SCROLLBACK
         self.filter_regexes: List[Pattern] = []
         self.bell_regexes: List[Pattern] = []
         self.color_assignment_regexes: List[Tuple[str, Pattern]] = {}
         self.color_schemes: Dict[str, Palette] = {}
         self.colors: Palette = {}
 
+    def classify(self, text: str) -> str:
+        # the last matching regex wins
+        text_class = 'default'
+        for key, pattern in self.color_assignment_regexes:
+            if pattern.match(text):
+                text_class = key
+        return text_class
+
     def read(self, ini: configparser.ConfigParser) -> None:
         tmp: Any
 
@@ -109,6 +493,10 @@ class UiConfig:
         if tmp != _UNUSED:
             self.last_log = tmp
 
+        tmp = ini.getint('ui', 'scrollback', fallback=_UNUSED)
+        if tmp != _UNUSED:
+            self.scrollback = tmp
+
         tmp = ini.get('ui', 'filter_regexes', fallback=_UNUSED)
         if tmp != _UNUSED:
             self.filter_regexes = [
@@ -141,17 +529,45 @@ class UiConfig:
 
 class Config:
     def __init__(self) -> None:
+        self.alerts = AlertsConfig()
         self.autocomplete = AutoCompleteConfig()
+        self.balance = BalanceConfig()
+        self.bans = BansConfig()
         self.connection = ConnectionConfig()
+        self.export = ExportConfig()
+        self.fleet = FleetConfig()
+        self.health = HealthConfig()
+        self.history = HistoryConfig()
+        self.identity = IdentityConfig()
+        self.latency = LatencyConfig()
+        self.layout = LayoutConfig()
         self.log = LogConfig()
+        self.matches = MatchesConfig()
+        self.pipeline = PipelineConfig()
+        self.remote = RemoteConfig()
+        self.rules = RulesConfig()
         self.ui = UiConfig()
 
     def read(self, path: Path) -> None:
         ini = configparser.ConfigParser(interpolation=None)
         ini.read_string(path.read_text())
+        self.alerts.read(ini)
         self.autocomplete.read(ini)
+        self.balance.read(ini)
+        self.bans.read(ini)
         self.connection.read(ini)
+        self.export.read(ini)
+        self.fleet.read(ini)
+        self.health.read(ini)
+        self.history.read(ini)
+        self.identity.read(ini)
+        self.latency.read(ini)
+        self.layout.read(ini)
         self.log.read(ini)
+        self.matches.read(ini)
+        self.pipeline.read(ini)
+        self.remote.read(ini)
+        self.rules.read(ini)
         self.ui.read(ini)
 
 
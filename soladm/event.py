@@ -8,6 +8,9 @@ class EventHandler:
     def append(self, func: Callable) -> None:
         self.funcs.append(func)
 
+    def remove(self, func: Callable) -> None:
+        self.funcs.remove(func)
+
     def __call__(self, *args: Any, **kwargs: Any) -> None:
         for func in self.funcs:
             func(*args, **kwargs)
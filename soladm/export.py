@@ -0,0 +1,185 @@
+import csv
+import gzip
+import io
+import json
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, IO, List, Optional
+from soladm import event, net
+
+
+FORMAT_JSONL = 'jsonl'
+FORMAT_CSV = 'csv'
+FORMATS = (FORMAT_JSONL, FORMAT_CSV)
+
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_INTERVAL = 1.0
+# how long closing waits for room in the queue of a thread that's stuck
+CLOSE_TIMEOUT = 5.0
+
+CSV_COLUMNS = ('server', 'time', 'monotonic', 'type', 'class', 'text', 'data')
+
+Record = Dict[str, Any]
+
+
+def _no_class(text: str) -> str:
+    return 'default'
+
+
+class ExportSink:
+    # records are serialized, compressed and written by a background thread;
+    # when it can't keep up, new records are dropped and the number of lost
+    # records is written once there's room again, rather than blocking the
+    # event loop. errors of the thread are reported by the next write.
+    def __init__(
+            self,
+            path: Path,
+            fmt: str = FORMAT_JSONL,
+            compress: bool = False,
+            queue_size: int = DEFAULT_QUEUE_SIZE,
+            batch_size: int = DEFAULT_BATCH_SIZE,
+            flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+            classify: Callable[[str], str] = _no_class) -> None:
+        if fmt not in FORMATS:
+            raise ValueError('Unknown export format: {}'.format(fmt))
+        self.path = path
+        self.fmt = fmt
+        self.compress = compress
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.classify = classify
+        self.dropped = 0
+        self.on_exception = event.EventHandler()
+        self._queue: 'queue.Queue[Optional[Record]]' = queue.Queue(
+            queue_size)
+        self._pending_drops = 0
+        self._thread: Optional[threading.Thread] = None
+        self._error: Optional[Exception] = None
+
+    def attach(
+            self,
+            connection: net.Connection,
+            server: str,
+            snapshots: bool = True) -> None:
+        connection.on_message.append(
+            lambda text: self.write_message(server, text))
+        if snapshots:
+            connection.on_refresh.append(
+                lambda: self.write_snapshot(server, connection.game_info))
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name='export', daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        if not self._thread:
+            return
+        # a thread that died leaves a queue that might never have room again
+        if self._thread.is_alive():
+            try:
+                self._queue.put(None, timeout=CLOSE_TIMEOUT)
+                self._thread.join()
+            except queue.Full:
+                pass
+        self._thread = None
+        self._report_error()
+
+    def write_message(self, server: str, text: str) -> None:
+        self.write(self._make_record(
+            server, 'message', self.classify(text), text, None))
+
+    def write_snapshot(self, server: str, game_info: net.GameInfo) -> None:
+        self.write(self._make_record(
+            server, 'refresh', None, None, game_info.to_dict()))
+
+    def write(self, record: Record) -> None:
+        self._report_error()
+        try:
+            if self._pending_drops:
+                self._queue.put_nowait(self._make_record(
+                    record['server'], 'dropped', None, None,
+                    {'count': self._pending_drops}))
+                self._pending_drops = 0
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self._pending_drops += 1
+            self.dropped += 1
+
+    def _report_error(self) -> None:
+        if self._error:
+            error, self._error = self._error, None
+            self.on_exception(error)
+
+    def _make_record(
+            self,
+            server: str,
+            record_type: str,
+            text_class: Optional[str],
+            text: Optional[str],
+            data: Optional[Dict[str, Any]]) -> Record:
+        return {
+            'server': server,
+            'time': round(time.time(), 3),
+            'monotonic': round(time.monotonic(), 3),
+            'type': record_type,
+            'class': text_class,
+            'text': text,
+            'data': data,
+        }
+
+    def _open(self) -> IO[str]:
+        new_file = not self.path.exists() or not self.path.stat().st_size
+        if self.compress:
+            # appending starts a new gzip member, which readers handle fine
+            handle: IO[str] = gzip.open(
+                self.path, 'at', encoding='utf-8', newline='')
+        else:
+            handle = self.path.open('a', encoding='utf-8', newline='')
+        if new_file and self.fmt == FORMAT_CSV:
+            csv.writer(handle).writerow(CSV_COLUMNS)
+        return handle
+
+    def _serialize(self, records: List[Record]) -> str:
+        if self.fmt == FORMAT_JSONL:
+            return ''.join(
+                json.dumps(record, separators=(',', ':')) + '\n'
+                for record in records)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for record in records:
+            writer.writerow([
+                json.dumps(record[column], separators=(',', ':'))
+                if column == 'data' and record[column] is not None
+                else record[column]
+                for column in CSV_COLUMNS])
+        return buffer.getvalue()
+
+    def _run(self) -> None:
+        try:
+            self._write_batches()
+        except Exception as ex:
+            self._error = ex
+
+    def _write_batches(self) -> None:
+        with self._open() as handle:
+            done = False
+            while not done:
+                batch: List[Record] = []
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    try:
+                        record = self._queue.get(
+                            timeout=max(0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if record is None:
+                        done = True
+                        break
+                    batch.append(record)
+                if batch:
+                    handle.write(self._serialize(batch))
+                    handle.flush()
@@ -0,0 +1,182 @@
+import collections
+import math
+from array import array
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from soladm import net
+
+
+GRID_WIDTH = 128
+GRID_HEIGHT = 64
+# world units per cell to start with; the cells get coarser as the map
+# turns out to be bigger
+INITIAL_CELL_SIZE = 8.0
+MAX_CELL_SIZE = 2.0 ** 20
+DEFAULT_MAX_MAPS = 32
+
+SHADES = ' ░▒▓█'
+
+LAYER_PLAYERS = 'players'
+LAYER_RED_FLAG = 'red_flag'
+LAYER_BLUE_FLAG = 'blue_flag'
+LAYERS = (LAYER_PLAYERS, LAYER_RED_FLAG, LAYER_BLUE_FLAG)
+
+FLAG_GAME_MODES = {
+    net.GameMode.CaptureTheFlag,
+    net.GameMode.Infiltration,
+    net.GameMode.HoldTheFlag,
+}
+
+
+class Grid:
+    def __init__(
+            self,
+            width: int = GRID_WIDTH,
+            height: int = GRID_HEIGHT,
+            cell_size: float = INITIAL_CELL_SIZE) -> None:
+        assert width % 2 == 0 and height % 2 == 0
+        self.width = width
+        self.height = height
+        self.cell_size = cell_size
+        self.counts = array('I', [0]) * (width * height)
+        self.total = 0
+        self._left = 0.0
+        self._top = 0.0
+        self._empty = True
+
+    def add(self, x: float, y: float) -> None:
+        if not (math.isfinite(x) and math.isfinite(y)):
+            return
+        if self._empty:
+            # start centered on the first point
+            self._left = x - self.width * self.cell_size / 2
+            self._top = y - self.height * self.cell_size / 2
+            self._empty = False
+        col = int((x - self._left) // self.cell_size)
+        row = int((y - self._top) // self.cell_size)
+        while not (0 <= col < self.width and 0 <= row < self.height):
+            if not self._grow(col < 0, row < 0):
+                return
+            col = int((x - self._left) // self.cell_size)
+            row = int((y - self._top) // self.cell_size)
+        self.counts[row * self.width + col] += 1
+        self.total += 1
+
+    def render(self, columns: int) -> List[str]:
+        # crops the grid to the visited area and scales it to the given
+        # width; terminal cells are about twice as tall as they're wide
+        box = self._get_bounding_box()
+        if not box or columns <= 0:
+            return []
+        min_col, min_row, max_col, max_row = box
+        box_width = max_col - min_col + 1
+        box_height = max_row - min_row + 1
+        columns = min(columns, box_width)
+        rows = max(1, round(columns * box_height / box_width / 2))
+        out = [0] * (columns * rows)
+        for row in range(min_row, max_row + 1):
+            out_row = (row - min_row) * rows // box_height
+            offset = row * self.width
+            for col in range(min_col, max_col + 1):
+                count = self.counts[offset + col]
+                if count:
+                    out_col = (col - min_col) * columns // box_width
+                    out[out_row * columns + out_col] += count
+        scale = _make_scale(max(out), len(SHADES) - 1)
+        return [
+            ''.join(
+                SHADES[scale(count)]
+                for count in out[row * columns:(row + 1) * columns])
+            for row in range(rows)]
+
+    def to_pgm(self) -> bytes:
+        scale = _make_scale(max(self.counts), 255)
+        header = 'P5\n{} {}\n255\n'.format(self.width, self.height)
+        return header.encode() + bytes(scale(count) for count in self.counts)
+
+    def _get_bounding_box(self) -> Optional[List[int]]:
+        rows = [
+            row
+            for row in range(self.height)
+            if any(self.counts[
+                row * self.width:(row + 1) * self.width])]
+        if not rows:
+            return None
+        cols = [
+            col
+            for col in range(self.width)
+            if any(self.counts[col::self.width])]
+        return [cols[0], rows[0], cols[-1], rows[-1]]
+
+    def _grow(self, left: bool, up: bool) -> bool:
+        # doubles the covered area towards the point that didn't fit,
+        # merging every 2x2 block of cells into one
+        if self.cell_size >= MAX_CELL_SIZE:
+            return False
+        col_shift = self.width if left else 0
+        row_shift = self.height if up else 0
+        if left:
+            self._left -= self.width * self.cell_size
+        if up:
+            self._top -= self.height * self.cell_size
+        self.cell_size *= 2
+        counts = array('I', [0]) * (self.width * self.height)
+        for idx, count in enumerate(self.counts):
+            if count:
+                row, col = divmod(idx, self.width)
+                new_row = (row + row_shift) // 2
+                new_col = (col + col_shift) // 2
+                counts[new_row * self.width + new_col] += count
+        self.counts = counts
+        return True
+
+
+def _make_scale(max_count: int, levels: int) -> Callable[[int], int]:
+    # logarithmic, so that rarely visited spots don't disappear next to the
+    # spawn points
+    if not max_count:
+        return lambda count: 0
+    factor = levels / math.log1p(max_count)
+    return lambda count: (
+        max(1, min(levels, round(math.log1p(count) * factor)))
+        if count else 0)
+
+
+class HeatmapTracker:
+    def __init__(self, max_maps: int = DEFAULT_MAX_MAPS) -> None:
+        self.max_maps = max_maps
+        self.maps: 'collections.OrderedDict[str, Dict[str, Grid]]' = (
+            collections.OrderedDict())
+
+    def update(self, game_info: net.GameInfo) -> None:
+        layers = self._get_layers(game_info.map_name)
+        grid = layers[LAYER_PLAYERS]
+        for player in game_info.players:
+            if player.team != net.PlayerTeam.SPECTATOR:
+                grid.add(player.pos.x, player.pos.y)
+        if game_info.game_mode in FLAG_GAME_MODES:
+            layers[LAYER_RED_FLAG].add(
+                game_info.red_flag_pos.x, game_info.red_flag_pos.y)
+            layers[LAYER_BLUE_FLAG].add(
+                game_info.blue_flag_pos.x, game_info.blue_flag_pos.y)
+
+    def get(self, map_name: str, layer: str) -> Optional[Grid]:
+        layers = self.maps.get(map_name)
+        return layers[layer] if layers else None
+
+    def export(self, map_name: str, layer: str, path: Path) -> None:
+        grid = self.get(map_name, layer)
+        if not grid:
+            raise ValueError('No data for {}'.format(map_name))
+        path.write_bytes(grid.to_pgm())
+
+    def _get_layers(self, map_name: str) -> Dict[str, Grid]:
+        layers = self.maps.get(map_name)
+        if layers is None:
+            layers = self.maps[map_name] = {
+                layer: Grid() for layer in LAYERS}
+            if len(self.maps) > self.max_maps:
+                self.maps.popitem(last=False)
+        else:
+            self.maps.move_to_end(map_name)
+        return layers
@@ -0,0 +1,135 @@
+import collections
+import itertools
+from pathlib import Path
+from typing import Optional, Dict, Iterable, List, Set
+
+
+DEFAULT_MAX_SIZE = 10000
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class CommandHistory:
+    def __init__(
+            self,
+            path: Optional[Path] = None,
+            max_size: int = DEFAULT_MAX_SIZE) -> None:
+        self.path = path
+        self.max_size = max_size
+        self._loaded = False
+        self._next_seq = 0
+        # oldest first
+        self._texts: 'collections.OrderedDict[int, str]' = (
+            collections.OrderedDict())
+        self._seqs: Dict[str, int] = {}
+        self._index: Dict[str, Set[int]] = {}
+
+    def __len__(self) -> int:
+        self._load()
+        return len(self._texts)
+
+    def __getitem__(self, idx: int) -> str:
+        self._load()
+        size = len(self._texts)
+        if idx < 0:
+            idx += size
+        if not 0 <= idx < size:
+            raise IndexError(idx)
+        # browsing starts at the newest entries, so count from the closer end
+        if idx >= size // 2:
+            seqs = itertools.islice(
+                reversed(self._texts), size - 1 - idx, None)
+        else:
+            seqs = itertools.islice(self._texts, idx, None)
+        return self._texts[next(seqs)]
+
+    def append(self, text: str) -> None:
+        self._load()
+        text = text.replace('\n', ' ')
+        self._add(text)
+        if self.path:
+            with self.path.open('a', encoding='utf-8') as handle:
+                handle.write(text + '\n')
+
+    def get(self, seq: int) -> str:
+        return self._texts[seq]
+
+    def search(
+            self,
+            query: str,
+            candidates: Optional[Iterable[int]] = None) -> List[int]:
+        # returns matching entries, newest first. when the query extends the
+        # previous one, its results can be passed as candidates.
+        self._load()
+        query = query.lower()
+        if candidates is None:
+            if len(query) >= 3:
+                postings = sorted(
+                    (self._index.get(trigram, set())
+                     for trigram in _trigrams(query)),
+                    key=len)
+                candidates = set.intersection(*postings)
+            else:
+                candidates = self._texts.keys()
+        return sorted(
+            (
+                seq
+                for seq in candidates
+                if seq in self._texts and query in self._texts[seq].lower()
+            ),
+            reverse=True)
+
+    def _add(self, text: str) -> None:
+        old_seq = self._seqs.get(text)
+        if old_seq is not None:
+            self._remove(old_seq)
+        seq = self._next_seq
+        self._next_seq += 1
+        self._texts[seq] = text
+        self._seqs[text] = seq
+        for trigram in _trigrams(text.lower()):
+            self._index.setdefault(trigram, set()).add(seq)
+        while len(self._texts) > self.max_size:
+            self._remove(next(iter(self._texts)))
+
+    def _remove(self, seq: int) -> None:
+        text = self._texts.pop(seq)
+        del self._seqs[text]
+        for trigram in _trigrams(text.lower()):
+            postings = self._index[trigram]
+            postings.discard(seq)
+            if not postings:
+                del self._index[trigram]
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.path or not self.path.exists():
+            return
+        lines = [
+            line
+            for line in self.path.read_text(
+                encoding='utf-8', errors='replace').split('\n')
+            if line]
+        # keep only the last occurrence of every command
+        unique: Dict[str, None] = {}
+        for line in reversed(lines):
+            if line not in unique:
+                unique[line] = None
+                if len(unique) == self.max_size:
+                    break
+        for line in reversed(list(unique)):
+            self._add(line)
+        if len(lines) > 2 * self.max_size:
+            self._compact()
+
+    def _compact(self) -> None:
+        assert self.path
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        tmp_path.write_text(
+            ''.join(text + '\n' for text in self._texts.values()),
+            encoding='utf-8')
+        tmp_path.replace(self.path)
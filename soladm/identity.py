@@ -0,0 +1,187 @@
+import asyncio
+import bisect
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import (
+    Any, Optional, Iterable, List, NamedTuple, Set, Tuple)
+from soladm import event, net
+
+
+FLUSH_INTERVAL = 5
+TOUCH_INTERVAL = 60
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS sightings (
+    name TEXT NOT NULL,
+    hwid TEXT NOT NULL,
+    ip TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    PRIMARY KEY (name, hwid, ip)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS sightings_name ON sightings (name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS sightings_hwid ON sightings (hwid);
+CREATE INDEX IF NOT EXISTS sightings_ip ON sightings (ip);
+'''
+
+_UPSERT = '''
+INSERT INTO sightings (name, hwid, ip, first_seen, last_seen)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (name, hwid, ip) DO UPDATE SET last_seen = excluded.last_seen
+'''
+
+Key = Tuple[str, str, str]
+
+
+class Identity(NamedTuple):
+    name: str
+    hwid: str
+    ip: str
+    first_seen: float
+    last_seen: float
+
+
+class IdentityStore:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.on_known_player = event.EventHandler()
+        self._queue: 'queue.Queue[Any]' = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reader: Optional[sqlite3.Connection] = None
+        self._present: Set[Key] = set()
+        self._last_touch = 0.0
+        self._names: List[Tuple[str, str]] = []
+        self._loaded_names: Optional[List[str]] = None
+
+    def start(self) -> None:
+        self._loop = asyncio.get_event_loop()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        if self._thread:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        if self._reader:
+            self._reader.close()
+            self._reader = None
+
+    def update(self, players: Iterable[net.PlayerInfo]) -> None:
+        # called on every refresh, so only the differences are queued
+        self._merge_loaded_names()
+        now = time.time()
+        present = {
+            (player.name, player.hwid, player.ip) for player in players}
+        new = present - self._present
+        gone = self._present - present
+        if new:
+            self._queue.put(('new', list(new), now))
+            for key in new:
+                self._add_name(key[0])
+        if gone:
+            self._queue.put(('touch', list(gone), now))
+        if now - self._last_touch >= TOUCH_INTERVAL:
+            self._last_touch = now
+            self._queue.put(('touch', list(present), now))
+        self._present = present
+
+    def names_starting_with(self, prefix: str) -> Iterable[str]:
+        prefix = prefix.lower()
+        idx = bisect.bisect_left(self._names, (prefix, ''))
+        names = self._names
+        while idx < len(names) and names[idx][0].startswith(prefix):
+            yield names[idx][1]
+            idx += 1
+
+    def lookup(self, term: str) -> List[Identity]:
+        # returns every sighting sharing HWID or IP with the given term
+        if not self._reader:
+            self._reader = sqlite3.connect(str(self.path))
+        try:
+            cursor = self._reader.execute(
+                'SELECT DISTINCT hwid, ip FROM sightings '
+                'WHERE name = ? COLLATE NOCASE OR hwid = ? OR ip = ?',
+                (term, term.upper(), term))
+        except sqlite3.OperationalError:
+            # the writer thread didn't create the schema yet
+            return []
+        hwids: Set[str] = set()
+        ips: Set[str] = set()
+        for hwid, ip in cursor:
+            if hwid:
+                hwids.add(hwid)
+            ips.add(ip)
+        if not hwids and not ips:
+            return []
+        cursor = self._reader.execute(
+            'SELECT name, hwid, ip, first_seen, last_seen FROM sightings '
+            'WHERE hwid IN ({}) OR ip IN ({}) ORDER BY last_seen DESC'.format(
+                ','.join('?' * len(hwids)), ','.join('?' * len(ips))),
+            list(hwids) + list(ips))
+        return [Identity(*row) for row in cursor]
+
+    def _add_name(self, name: str) -> None:
+        item = (name.lower(), name)
+        idx = bisect.bisect_left(self._names, item)
+        if idx == len(self._names) or self._names[idx] != item:
+            self._names.insert(idx, item)
+
+    def _merge_loaded_names(self) -> None:
+        loaded_names = self._loaded_names
+        if loaded_names is None:
+            return
+        self._loaded_names = None
+        self._names = sorted(
+            set(self._names) | {(name.lower(), name) for name in loaded_names})
+
+    def _notify(self, name: str, hwid: str, names: List[str]) -> None:
+        assert self._loop
+        self._loop.call_soon_threadsafe(
+            self.on_known_player, name, hwid, names)
+
+    def _run(self) -> None:
+        db = sqlite3.connect(str(self.path))
+        db.execute('PRAGMA journal_mode=WAL')
+        db.executescript(_SCHEMA)
+        self._loaded_names = [
+            row[0]
+            for row in db.execute('SELECT DISTINCT name FROM sightings')]
+
+        running = True
+        while running:
+            # batch everything that arrives within the flush interval
+            items = [self._queue.get()]
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while items[-1] is not None:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            running = items[-1] is not None
+            self._flush(db, [item for item in items if item is not None])
+        db.close()
+
+    def _flush(self, db: sqlite3.Connection, items: List[Any]) -> None:
+        rows: List[Tuple[str, str, str, float, float]] = []
+        for kind, keys, now in items:
+            for name, hwid, ip in keys:
+                if kind == 'new' and hwid:
+                    names = [
+                        row[0]
+                        for row in db.execute(
+                            'SELECT DISTINCT name FROM sightings '
+                            'WHERE hwid = ? AND name != ?',
+                            (hwid, name))]
+                    if names:
+                        self._notify(name, hwid, names)
+                rows.append((name, hwid, ip, now, now))
+        with db:
+            db.executemany(_UPSERT, rows)
@@ -0,0 +1,179 @@
+import bisect
+import time
+from array import array
+from typing import (
+    Callable, Dict, Hashable, Iterable, List, NamedTuple, Optional)
+from soladm import event, net, util
+
+
+DEFAULT_WINDOW = 60.0
+DEFAULT_SLICES = 6
+MIN_ALERT_SAMPLES = 10
+
+# upper bounds of the histogram buckets in milliseconds; fine-grained where
+# the pings usually are, coarse above that. anything higher than the last
+# bound ends up in the last bucket.
+BUCKET_BOUNDS: List[int] = (
+    list(range(5, 200, 5)) +
+    list(range(200, 500, 10)) +
+    list(range(500, 1000, 25)) +
+    list(range(1000, 3001, 100)))
+
+STAT_NAMES = ('p50', 'p95', 'p99', 'jitter')
+
+
+class PingSummary(NamedTuple):
+    samples: int
+    p50: int
+    p95: int
+    p99: int
+    jitter: float
+
+    def get(self, name: str) -> int:
+        return int(round(getattr(self, name)))
+
+
+def _bucket(ping: int) -> int:
+    return min(bisect.bisect_left(BUCKET_BOUNDS, ping), len(BUCKET_BOUNDS) - 1)
+
+
+class _Slice:
+    __slots__ = ('counts', 'samples', 'jitter_total', 'jitter_samples')
+
+    def __init__(self) -> None:
+        self.counts = array('I', [0] * len(BUCKET_BOUNDS))
+        self.clear()
+
+    def clear(self) -> None:
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+        self.samples = 0
+        self.jitter_total = 0.0
+        self.jitter_samples = 0
+
+
+class PingWindow:
+    # sliding window made of a ring of fixed histograms, so that both the
+    # memory and the cost of expiring old samples are constant
+    def __init__(
+            self,
+            window: float = DEFAULT_WINDOW,
+            slices: int = DEFAULT_SLICES,
+            clock: Callable[[], float] = time.monotonic) -> None:
+        self._slice_length = window / slices
+        self._slices = [_Slice() for _ in range(slices)]
+        self._clock = clock
+        self._epoch = self._get_epoch()
+        self._last_ping: Optional[int] = None
+
+    def add(self, ping: int) -> Optional[int]:
+        delta = (
+            abs(ping - self._last_ping)
+            if self._last_ping is not None else None)
+        self._last_ping = ping
+        self.record(ping, delta)
+        return delta
+
+    def record(self, ping: int, delta: Optional[int]) -> None:
+        # delta is the change from the previous ping of the same player
+        self._rotate()
+        current = self._slices[self._epoch % len(self._slices)]
+        current.counts[_bucket(ping)] += 1
+        current.samples += 1
+        if delta is not None:
+            current.jitter_total += delta
+            current.jitter_samples += 1
+
+    def summary(self) -> Optional[PingSummary]:
+        self._rotate()
+        samples = sum(item.samples for item in self._slices)
+        if not samples:
+            return None
+        counts = [sum(column) for column in zip(*(
+            item.counts for item in self._slices if item.samples))]
+        jitter_samples = sum(item.jitter_samples for item in self._slices)
+        jitter_total = sum(item.jitter_total for item in self._slices)
+        p50, p95, p99 = self._percentiles(counts, samples, (0.5, 0.95, 0.99))
+        return PingSummary(
+            samples=samples,
+            p50=p50,
+            p95=p95,
+            p99=p99,
+            jitter=jitter_total / jitter_samples if jitter_samples else 0.0)
+
+    def _percentiles(
+            self,
+            counts: List[int],
+            samples: int,
+            quantiles: Iterable[float]) -> List[int]:
+        ret: List[int] = []
+        cumulative = 0
+        idx = 0
+        for quantile in quantiles:
+            rank = quantile * samples
+            while idx < len(counts) - 1 and cumulative + counts[idx] < rank:
+                cumulative += counts[idx]
+                idx += 1
+            ret.append(BUCKET_BOUNDS[idx])
+        return ret
+
+    def _get_epoch(self) -> int:
+        return int(self._clock() // self._slice_length)
+
+    def _rotate(self) -> None:
+        epoch = self._get_epoch()
+        for i in range(
+                max(self._epoch, epoch - len(self._slices)) + 1, epoch + 1):
+            self._slices[i % len(self._slices)].clear()
+        self._epoch = max(epoch, self._epoch)
+
+
+class LatencyTracker:
+    def __init__(
+            self,
+            window: float = DEFAULT_WINDOW,
+            slices: int = DEFAULT_SLICES,
+            p95_alert: int = 0,
+            jitter_alert: int = 0,
+            clock: Callable[[], float] = time.monotonic) -> None:
+        self.server = PingWindow(window, slices, clock)
+        self.p95_alert = p95_alert
+        self.jitter_alert = jitter_alert
+        self.on_alert = event.EventHandler()
+        self._window = window
+        self._slices = slices
+        self._clock = clock
+        self._players: Dict[Hashable, PingWindow] = {}
+        self._alert_cooldown = util.Cooldown(window, clock)
+
+    def update(self, players: Iterable[net.PlayerInfo]) -> None:
+        seen: Dict[Hashable, PingWindow] = {}
+        for player in players:
+            key = (player.id, player.hwid)
+            window = self._players.get(key)
+            if window is None:
+                window = PingWindow(self._window, self._slices, self._clock)
+            self.server.record(player.ping, window.add(player.ping))
+            seen[key] = window
+            if self.p95_alert or self.jitter_alert:
+                self._check_alert(player, key, window)
+        # players who left take their windows with them
+        self._players = seen
+
+    def get(self, player: net.PlayerInfo) -> Optional[PingSummary]:
+        window = self._players.get((player.id, player.hwid))
+        return window.summary() if window else None
+
+    def _check_alert(
+            self,
+            player: net.PlayerInfo,
+            key: Hashable,
+            window: PingWindow) -> None:
+        summary = window.summary()
+        if not summary or summary.samples < MIN_ALERT_SAMPLES:
+            return
+        if (
+                (self.p95_alert and summary.p95 >= self.p95_alert) or
+                (self.jitter_alert and summary.jitter >= self.jitter_alert)):
+            if self._alert_cooldown.ready(key):
+                self.on_alert(player, summary)
@@ -0,0 +1,139 @@
+import bisect
+import mmap
+from pathlib import Path
+from typing import List, Optional
+
+
+# the index holds the number of lines before every block of this many
+# bytes, so finding a line by its number only has to search a single block
+INDEX_BLOCK = 1 << 20
+# lines start with "[YYYY-mm-dd HH:MM:SS] ", which sorts the same as bytes
+TIMESTAMP_LENGTH = len('[YYYY-mm-dd HH:MM:SS]')
+# how many lines of the log the console keeps in memory
+DEFAULT_SCROLLBACK = 100000
+
+
+def _has_timestamp(line: bytes) -> bool:
+    return (
+        len(line) >= TIMESTAMP_LENGTH and
+        line[0:1] == b'[' and
+        line[TIMESTAMP_LENGTH - 1:TIMESTAMP_LENGTH] == b']' and
+        line[1:5].isdigit())
+
+
+class MappedLog:
+    # read-only view of a log file of any size. lines are addressed by the
+    # byte offset they start at, so moving around never has to read more
+    # than the lines in question.
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._handle = path.open('rb')
+        self.size = path.stat().st_size
+        # empty files can't be mapped
+        self._map: Optional[mmap.mmap] = None
+        if self.size:
+            self._map = mmap.mmap(
+                self._handle.fileno(), self.size, access=mmap.ACCESS_READ)
+        # built only as far into the file as it has been needed
+        self._index: List[int] = [0]
+
+    def close(self) -> None:
+        if self._map:
+            self._map.close()
+            self._map = None
+        self._handle.close()
+
+    @property
+    def last_line(self) -> int:
+        if not self._map:
+            return 0
+        end = self.size - 1 if self._map[-1:] == b'\n' else self.size
+        return self._map.rfind(b'\n', 0, end) + 1
+
+    def line_start(self, offset: int) -> int:
+        if not self._map or offset <= 0:
+            return 0
+        offset = min(offset, self.last_line)
+        return self._map.rfind(b'\n', 0, offset) + 1
+
+    def next_line(self, offset: int) -> Optional[int]:
+        if not self._map:
+            return None
+        end = self._map.find(b'\n', offset)
+        if end < 0 or end + 1 >= self.size:
+            return None
+        return end + 1
+
+    def prev_line(self, offset: int) -> Optional[int]:
+        if not self._map or offset <= 0:
+            return None
+        return self._map.rfind(b'\n', 0, offset - 1) + 1
+
+    def read_line(self, offset: int) -> str:
+        return self._read(offset).decode('utf-8', 'replace').rstrip('\r\n')
+
+    def line_offset(self, number: int) -> int:
+        # offset of the given (0-based) line, or of the last one
+        if number <= 0 or not self._map:
+            return 0
+        while self._index[-1] < number and not self._index_complete:
+            self._index_block()
+        if self._index[-1] < number:
+            return self.last_line
+        # the line starts after the newline in this block
+        block = bisect.bisect_left(self._index, number) - 1
+        start = block * INDEX_BLOCK
+        count = number - self._index[block]
+        parts = self._map[start:start + INDEX_BLOCK].split(b'\n', count)
+        offset = start + sum(map(len, parts[:count])) + count
+        return min(offset, self.last_line)
+
+    def line_number(self, offset: int) -> int:
+        if not self._map:
+            return 0
+        offset = self.line_start(offset)
+        block = offset // INDEX_BLOCK
+        while len(self._index) <= block:
+            self._index_block()
+        return self._index[block] + self._map[
+            block * INDEX_BLOCK:offset].count(b'\n')
+
+    def find_timestamp(self, timestamp: str) -> int:
+        # offset of the first line logged at or after the given time, which
+        # can be just a prefix such as "2024-05-01 13". lines without a
+        # timestamp are attributed to the closest timestamped one after them.
+        target = b'[' + timestamp.encode()
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            offset = self._timestamped_line(self.line_start(middle))
+            if offset is None or self._read(offset) >= target:
+                high = middle
+            else:
+                # the lines up to the one found are all earlier
+                low = max(middle, offset) + 1
+        return self.line_start(low) if low < self.size else self.last_line
+
+    def _timestamped_line(self, offset: int) -> Optional[int]:
+        current: Optional[int] = offset
+        while current is not None:
+            if _has_timestamp(self._read(current)):
+                return current
+            current = self.next_line(current)
+        return None
+
+    def _read(self, offset: int) -> bytes:
+        if not self._map:
+            return b''
+        end = self._map.find(b'\n', offset)
+        return self._map[offset:end if end >= 0 else self.size]
+
+    @property
+    def _index_complete(self) -> bool:
+        return (len(self._index) - 1) * INDEX_BLOCK >= self.size
+
+    def _index_block(self) -> None:
+        assert self._map
+        start = (len(self._index) - 1) * INDEX_BLOCK
+        self._index.append(self._index[-1] + self._map[
+            start:start + INDEX_BLOCK].count(b'\n'))
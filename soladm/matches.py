@@ -0,0 +1,204 @@
+import json
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from soladm import event, net, util
+
+
+DEFAULT_MAX_SIZE = 1024 * 1024
+DEFAULT_BACKUPS = 5
+# the timer ticks 60 times a second; anything that goes up by more than a
+# few seconds is a restart rather than jitter
+TIMER_RESET_TOLERANCE = 5 * 60
+
+REASON_MAP_CHANGE = 'map change'
+REASON_TIMER_RESET = 'timer reset'
+REASON_SCORE_RESET = 'score reset'
+
+
+class PlayerSummary(NamedTuple):
+    name: str
+    hwid: str
+    team: int
+    kills: int
+    deaths: int
+    caps: int
+
+
+class MatchSummary(NamedTuple):
+    server: str
+    map_name: str
+    game_mode: int
+    started: float
+    ended: float
+    reason: str
+    scores: List[int]
+    peak_players: int
+    players: List[PlayerSummary]
+
+    @property
+    def duration(self) -> float:
+        return self.ended - self.started
+
+    def to_json(self) -> str:
+        # plain lists rather than objects keep the lines short
+        return json.dumps(
+            [
+                self.server,
+                self.map_name,
+                self.game_mode,
+                round(self.started, 1),
+                round(self.ended, 1),
+                self.reason,
+                self.scores,
+                self.peak_players,
+                [list(player) for player in self.players],
+            ],
+            separators=(',', ':'))
+
+    @staticmethod
+    def from_json(text: str) -> 'MatchSummary':
+        values = json.loads(text)
+        values[-1] = [PlayerSummary(*player) for player in values[-1]]
+        return MatchSummary(*values)
+
+
+class MatchLog:
+    def __init__(
+            self,
+            path: Path,
+            max_size: int = DEFAULT_MAX_SIZE,
+            backups: int = DEFAULT_BACKUPS) -> None:
+        self.path = path
+        self.max_size = max_size
+        self.backups = backups
+
+    def append(self, summary: MatchSummary) -> None:
+        if self.path.exists() and self.path.stat().st_size > self.max_size:
+            self._rotate()
+        with self.path.open('a', encoding='utf-8') as handle:
+            handle.write(summary.to_json() + '\n')
+
+    def recent(self, count: int) -> List[MatchSummary]:
+        # newest first; only reads as much of the files as needed
+        ret: List[MatchSummary] = []
+        for path in self._paths():
+            if not path.exists():
+                continue
+            with path.open('rb') as handle:
+                lines = util.tail(handle, count - len(ret))
+            for line in reversed(lines):
+                try:
+                    ret.append(MatchSummary.from_json(line.decode('utf-8')))
+                except (ValueError, TypeError, UnicodeDecodeError):
+                    continue
+            if len(ret) >= count:
+                break
+        return ret[:count]
+
+    def _paths(self) -> List[Path]:
+        return [self.path] + [
+            self.path.with_name('{}.{}'.format(self.path.name, i))
+            for i in range(1, self.backups + 1)]
+
+    def _rotate(self) -> None:
+        paths = self._paths()
+        for src, dst in reversed(list(zip(paths, paths[1:]))):
+            if src.exists():
+                src.replace(dst)
+        if not self.backups:
+            self.path.unlink()
+
+
+class _Match:
+    def __init__(self, game_info: net.GameInfo, started: float) -> None:
+        self.map_name = game_info.map_name
+        self.game_mode = game_info.game_mode
+        self.started = started
+        self.scores: List[int] = []
+        self.peak_players = 0
+        self.players: Dict[Tuple[str, str], PlayerSummary] = {}
+
+    def update(self, game_info: net.GameInfo) -> None:
+        players = game_info.players
+        self.scores = list(game_info.scores.values())
+        self.peak_players = max(self.peak_players, len(players))
+        # players who left are remembered with their last known stats
+        for player in players:
+            self.players[player.name, player.hwid] = PlayerSummary(
+                name=player.name,
+                hwid=player.hwid,
+                team=int(player.team),
+                kills=player.kills,
+                deaths=player.deaths,
+                caps=player.caps)
+
+
+class MatchTracker:
+    def __init__(
+            self,
+            server: str,
+            clock: Callable[[], float] = time.time) -> None:
+        self.server = server
+        self.on_match_end = event.EventHandler()
+        self._clock = clock
+        self._match: Optional[_Match] = None
+        self._time_left = 0
+        self._total_score = 0
+        self._total_kills = 0
+
+    def attach(self, connection: net.Connection) -> None:
+        connection.on_refresh.append(
+            lambda: self.update(connection.game_info))
+
+    def update(self, game_info: net.GameInfo) -> None:
+        total_score = sum(game_info.scores.values())
+        total_kills = sum(player.kills for player in game_info.players)
+        reason = self._get_boundary(game_info, total_score, total_kills)
+        if reason:
+            self._finish(reason)
+        if not self._match:
+            self._match = _Match(game_info, self._clock())
+        self._match.update(game_info)
+        self._time_left = game_info.time_left
+        self._total_score = total_score
+        self._total_kills = total_kills
+
+    def _get_boundary(
+            self,
+            game_info: net.GameInfo,
+            total_score: int,
+            total_kills: int) -> Optional[str]:
+        if not self._match:
+            return None
+        if game_info.map_name != self._match.map_name:
+            return REASON_MAP_CHANGE
+        if game_info.time_left > self._time_left + TIMER_RESET_TOLERANCE:
+            return REASON_TIMER_RESET
+        if total_score < self._total_score or total_kills < self._total_kills:
+            # players leaving take their kills with them, so only a drop
+            # to zero with players still in the game counts
+            if not total_score and game_info.players and not any(
+                    player.kills or player.deaths
+                    for player in game_info.players):
+                return REASON_SCORE_RESET
+        return None
+
+    def _finish(self, reason: str) -> None:
+        match = self._match
+        assert match
+        self._match = None
+        if not match.peak_players:
+            return
+        self.on_match_end(MatchSummary(
+            server=self.server,
+            map_name=match.map_name,
+            game_mode=int(match.game_mode),
+            started=match.started,
+            ended=self._clock(),
+            reason=reason,
+            scores=match.scores,
+            peak_players=match.peak_players,
+            players=sorted(
+                match.players.values(),
+                key=lambda player: (-player.kills, player.deaths))))
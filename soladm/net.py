@@ -1,14 +1,31 @@
 import asyncio
+import collections
+import functools
 import io
+import socket
 import struct
-from typing import Optional, List, Callable, Awaitable
+import time
+from typing import (
+    Any, Optional, Deque, Dict, List, Callable, Awaitable, Tuple)
 from enum import IntEnum
-from soladm import event
+from soladm import event, parser
+from soladm.profiling import profiler
 
 
 MAX_PLAYERS = 32
 SHORT_POLL_INTERVAL = 0.1
 LONG_POLL_INTERVAL = 1
+RTT_HISTORY = 60
+DEFAULT_STALL_TIMEOUT = 10.0
+DEFAULT_KEEPALIVE_IDLE = 30
+DEFAULT_OUTBOX_TTL = 30.0
+OUTBOX_SIZE = 100
+REFRESH_INTERVAL = 1
+# fraction of the stall timeout after which a standby connection is opened
+STANDBY_THRESHOLD = 0.5
+
+Streams = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+FIELD_CACHE_SIZE = 4096
 
 
 def _encode(text: str) -> bytes:
@@ -38,10 +55,22 @@ def _read_f32(stream: io.BytesIO) -> int:
     return struct.unpack('<f', stream.read(4))[0]
 
 
+# names, HWIDs, IPs and map names rarely change between two refreshes, so
+# unchanged fields decode to the very same string objects
+@functools.lru_cache(maxsize=FIELD_CACHE_SIZE)
+def _decode_field(raw: bytes) -> str:
+    return _decode(raw)
+
+
+@functools.lru_cache(maxsize=FIELD_CACHE_SIZE)
+def _decode_ip(raw: bytes) -> str:
+    return '.'.join(str(octet) for octet in raw)
+
+
 def _read_var_str(stream: io.BytesIO, size: int) -> str:
     length = _read_u8(stream)
     assert length <= size, 'String is too long ({} vs {})'.format(length, size)
-    return _decode(stream.read(size)[0:length])
+    return _decode_field(stream.read(size)[0:length])
 
 
 class Point:
@@ -136,8 +165,7 @@ class GameInfo:
         for i in range(MAX_PLAYERS):
             self._players[i].id = _read_u8(stream)
         for i in range(MAX_PLAYERS):
-            self._players[i].ip = '.'.join(
-                str(octet) for octet in [_read_u8(stream) for i in range(4)])
+            self._players[i].ip = _decode_ip(stream.read(4))
         for i in range(MAX_PLAYERS):
             self._players[i].pos.x = _read_f32(stream)
         for i in range(MAX_PLAYERS):
@@ -163,6 +191,101 @@ class GameInfo:
         self.game_passworded = bool(_read_u8(stream))
         self.next_map_name = _read_var_str(stream, 16)
 
+    def to_snapshot(self) -> Tuple[Any, ...]:
+        # plain tuples are cheap to pickle across processes
+        return (
+            tuple(
+                (
+                    player.id, player.hwid, player.name, int(player.team),
+                    player.kills, player.caps, player.deaths, player.ping,
+                    player.ip, player.pos.x, player.pos.y,
+                )
+                for player in self._players),
+            tuple(self.scores.values()),
+            self.map_name,
+            int(self.game_mode),
+            self.time_left,
+            self.time_limit,
+            self.score_limit,
+            self.red_flag_pos.x,
+            self.red_flag_pos.y,
+            self.blue_flag_pos.x,
+            self.blue_flag_pos.y,
+            self.max_players,
+            self.max_spectators,
+            self.game_passworded,
+            self.next_map_name,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        # JSON-friendly version of the current state
+        return {
+            'map': self.map_name,
+            'next_map': self.next_map_name,
+            'game_mode': self.game_mode.name,
+            'time_left': self.time_left // 60,
+            'time_limit': self.time_limit // 60,
+            'score_limit': self.score_limit,
+            'scores': {
+                team.name.lower(): score
+                for team, score in self.scores.items()},
+            'red_flag': [self.red_flag_pos.x, self.red_flag_pos.y],
+            'blue_flag': [self.blue_flag_pos.x, self.blue_flag_pos.y],
+            'players': [
+                {
+                    'id': player.id,
+                    'name': player.name,
+                    'hwid': player.hwid,
+                    'ip': player.ip,
+                    'team': player.team.name.lower(),
+                    'kills': player.kills,
+                    'deaths': player.deaths,
+                    'caps': player.caps,
+                    'ping': player.ping,
+                    'pos': [player.pos.x, player.pos.y],
+                }
+                for player in self.players],
+        }
+
+    def apply_snapshot(self, snapshot: Tuple[Any, ...]) -> None:
+        players, scores, *rest = snapshot
+        for player, values in zip(self._players, players):
+            (
+                player.id, player.hwid, player.name, team,
+                player.kills, player.caps, player.deaths, player.ping,
+                player.ip, player.pos.x, player.pos.y,
+            ) = values
+            player.team = PlayerTeam(team)
+        for team, score in zip(list(self.scores), scores):
+            self.scores[team] = score
+        (
+            self.map_name,
+            game_mode,
+            self.time_left,
+            self.time_limit,
+            self.score_limit,
+            self.red_flag_pos.x,
+            self.red_flag_pos.y,
+            self.blue_flag_pos.x,
+            self.blue_flag_pos.y,
+            self.max_players,
+            self.max_spectators,
+            self.game_passworded,
+            self.next_map_name,
+        ) = rest
+        self.game_mode = GameMode(game_mode)
+
+
+def _enable_keepalive(sock: socket.socket, idle: int) -> None:
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    # the fine-tuning options aren't available everywhere
+    for name, value in (
+            ('TCP_KEEPIDLE', idle),
+            ('TCP_KEEPINTVL', max(1, idle // 3)),
+            ('TCP_KEEPCNT', 3)):
+        if hasattr(socket, name):
+            sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, name), value)
+
 
 class ConnectionState(IntEnum):
     DISCONNECTED = 0
@@ -171,37 +294,67 @@ class ConnectionState(IntEnum):
 
 
 class Connection:
-    def __init__(self, host: str, port: int, password: str) -> None:
+    def __init__(
+            self,
+            host: str,
+            port: int,
+            password: str,
+            stall_timeout: float = DEFAULT_STALL_TIMEOUT,
+            keepalive_idle: int = DEFAULT_KEEPALIVE_IDLE,
+            outbox_ttl: float = DEFAULT_OUTBOX_TTL) -> None:
         self.host = host
         self.port = port
         self.password = password
+        self.stall_timeout = stall_timeout
+        self.keepalive_idle = keepalive_idle
+        self.outbox_ttl = outbox_ttl
+
+        # round trip times of REFRESHX requests in seconds, oldest first
+        self.rtt: Deque[float] = collections.deque(maxlen=RTT_HISTORY)
+        self._refresh_requests: Deque[float] = collections.deque(
+            maxlen=RTT_HISTORY)
+        self._last_refresh_request = 0.0
+
+        # commands sent while disconnected, with the time they were sent
+        self._outbox: Deque[Tuple[float, str]] = collections.deque(
+            maxlen=OUTBOX_SIZE)
 
         self.game_info = GameInfo()
         self._connected = ConnectionState.DISCONNECTED
         self._reader: Optional[asyncio.StreamReader] = None
         self._writer: Optional[asyncio.StreamWriter] = None
+        self._standby: Optional[asyncio.Future] = None
         self._tasks: List[asyncio.Future] = []
 
+        # optional soladm.pipeline.DecodePipeline to offload decoding to
+        self.pipeline: Any = None
+
         self.on_connecting = event.EventHandler()
         self.on_connect = event.EventHandler()
         self.on_disconnect = event.EventHandler()
         self.on_message = event.EventHandler()
+        self.on_event = event.EventHandler()
         self.on_refresh = event.EventHandler()
         self.on_exception = event.EventHandler()
+        self.on_outbox_expired = event.EventHandler()
 
     async def open(self) -> None:
         try:
             if self._connected != ConnectionState.DISCONNECTED:
                 raise RuntimeError('Already connected!')
             self._tasks = [
-                asyncio.ensure_future(self._looped(self._connect)),
-                asyncio.ensure_future(self._looped(self._refresh)),
-                asyncio.ensure_future(self._looped(self._read)),
+                asyncio.ensure_future(
+                    self._looped(self._connect, LONG_POLL_INTERVAL)),
+                asyncio.ensure_future(
+                    self._looped(self._refresh, SHORT_POLL_INTERVAL)),
+                asyncio.ensure_future(
+                    self._looped(self._read, SHORT_POLL_INTERVAL)),
             ]
         except Exception as ex:
             self.on_exception(ex)
 
     async def close(self) -> None:
+        self._discard_standby()
         if self._connected in (
                 ConnectionState.CONNECTED,
                 ConnectionState.CONNECTING):
@@ -209,17 +362,45 @@ class Connection:
                 task.cancel()
                 await task
 
+    @property
+    def state(self) -> ConnectionState:
+        return self._connected
+
+    @property
+    def last_rtt(self) -> Optional[float]:
+        return self.rtt[-1] if self.rtt else None
+
     async def send(self, text: str) -> None:
+        # commands sent while disconnected are kept until the connection is
+        # back, unless that takes longer than outbox_ttl
+        if self._connected != ConnectionState.CONNECTED:
+            self._outbox.append((time.monotonic(), text))
+            return
         try:
-            if self._connected != ConnectionState.CONNECTED:
-                raise RuntimeError('Not connected.')
-            assert self._writer
-            self._writer.write(_encode(text) + b'\r\n')
-            await self._writer.drain()
+            await self.write(text)
+        except ConnectionError:
+            self._outbox.append((time.monotonic(), text))
         except Exception as ex:
             self.on_exception(ex)
 
-    async def _looped(self, func: Callable[[], Awaitable[None]]) -> None:
+    def request_refresh(self) -> None:
+        # asks for the game state before the next periodic refresh; unlike a
+        # REFRESHX sent as a command, the round trip is tracked
+        if self._connected == ConnectionState.CONNECTED:
+            self._request_refresh()
+
+    async def write(self, text: str) -> None:
+        # like send(), but leaves the errors to the caller
+        if self._connected != ConnectionState.CONNECTED:
+            raise RuntimeError('Not connected.')
+        assert self._writer
+        self._writer.write(_encode(text) + b'\r\n')
+        await self._writer.drain()
+
+    async def _looped(
+            self,
+            func: Callable[[], Awaitable[None]],
+            retry_delay: float) -> None:
         def disconnect(reason: str) -> None:
             # notify only once
             if self._connected != ConnectionState.DISCONNECTED:
@@ -232,13 +413,13 @@ class Connection:
                 await func()
             except TimeoutError:
                 disconnect('Connection timeout')
-                await asyncio.sleep(LONG_POLL_INTERVAL)
+                await asyncio.sleep(retry_delay)
             except ConnectionRefusedError:
                 disconnect('Connection refused')
-                await asyncio.sleep(LONG_POLL_INTERVAL)
+                await asyncio.sleep(retry_delay)
             except ConnectionResetError:
                 disconnect('Connection reset')
-                await asyncio.sleep(LONG_POLL_INTERVAL)
+                await asyncio.sleep(retry_delay)
             except asyncio.CancelledError:
                 disconnect('User exit')
                 break
@@ -247,40 +428,155 @@ class Connection:
 
     async def _connect(self) -> None:
         if self._connected == ConnectionState.CONNECTED:
-            await asyncio.sleep(LONG_POLL_INTERVAL)
+            await asyncio.sleep(SHORT_POLL_INTERVAL)
             return
         self._connected = ConnectionState.CONNECTING
         self.on_connecting()
-        self._reader, self._writer = (
-            await asyncio.open_connection(self.host, self.port))
-        self._writer.write('{}\r\n'.format(self.password).encode())
-        await self._writer.drain()
+        streams = await self._take_standby()
+        if not streams:
+            streams = await self._open_streams()
+        self._reader, self._writer = streams
+        self._refresh_requests.clear()
         self.on_connect()
         self._connected = ConnectionState.CONNECTED
+        # don't leave the UI without data until the next periodic refresh
+        self._request_refresh()
+        self._flush_outbox()
+        await self._writer.drain()
+
+    async def _open_streams(self) -> Streams:
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        sock = writer.get_extra_info('socket')
+        if self.keepalive_idle and sock:
+            _enable_keepalive(sock, self.keepalive_idle)
+        writer.write('{}\r\n'.format(self.password).encode())
+        await writer.drain()
+        return (reader, writer)
+
+    async def _take_standby(self) -> Optional[Streams]:
+        standby, self._standby = self._standby, None
+        if not standby:
+            return None
+        try:
+            return await standby
+        except (OSError, asyncio.CancelledError):
+            return None
+
+    def _prepare_standby(self) -> None:
+        # opened while the current connection merely looks unhealthy, so that
+        # if it does die, the handover doesn't have to wait for a new login
+        if not self._standby:
+            self._standby = asyncio.ensure_future(self._open_streams())
+
+    def _discard_standby(self) -> None:
+        standby, self._standby = self._standby, None
+        if not standby:
+            return
+        if not standby.done():
+            standby.cancel()
+        elif not standby.cancelled() and not standby.exception():
+            _reader, writer = standby.result()
+            writer.close()
+
+    def _flush_outbox(self) -> None:
+        assert self._writer
+        now = time.monotonic()
+        expired: List[str] = []
+        while self._outbox:
+            sent, text = self._outbox.popleft()
+            if now - sent > self.outbox_ttl:
+                expired.append(text)
+            else:
+                self._writer.write(_encode(text) + b'\r\n')
+        if expired:
+            self.on_outbox_expired(expired)
+
+    def _request_refresh(self) -> None:
+        assert self._writer
+        now = time.monotonic()
+        self._refresh_requests.append(now)
+        self._last_refresh_request = now
+        self._writer.write('REFRESHX\r\n'.encode())
 
     async def _refresh(self) -> None:
         if self._connected != ConnectionState.CONNECTED:
             await asyncio.sleep(SHORT_POLL_INTERVAL)
             return
-        assert self._writer
-        self._writer.write('REFRESHX\r\n'.encode())
-        await self._writer.drain()
-        await asyncio.sleep(1)
+        writer = self._writer
+        assert writer
+        now = time.monotonic()
+        if self.stall_timeout and self._refresh_requests:
+            waiting = now - self._refresh_requests[0]
+            if waiting > self.stall_timeout:
+                # the connection may be half-open, in which case nothing
+                # would ever notice; closing it wakes up the reader too
+                writer.close()
+                raise TimeoutError()
+            if waiting > self.stall_timeout * STANDBY_THRESHOLD:
+                self._prepare_standby()
+        wake_up = self._last_refresh_request + REFRESH_INTERVAL
+        if wake_up > now:
+            if self.stall_timeout and self._refresh_requests:
+                first = self._refresh_requests[0]
+                for deadline in (
+                        first + self.stall_timeout * STANDBY_THRESHOLD,
+                        first + self.stall_timeout):
+                    if deadline > now:
+                        wake_up = min(wake_up, deadline)
+            await asyncio.sleep(wake_up - now)
+            return
+        self._request_refresh()
+        await writer.drain()
 
     async def _read(self) -> None:
         if self._connected != ConnectionState.CONNECTED:
             await asyncio.sleep(SHORT_POLL_INTERVAL)
             return
-        assert self._reader
-        line = _decode(await self._reader.readline()).rstrip()
-        if not line:
+        reader = self._reader
+        assert reader
+        header = (await reader.readline()).rstrip()
+        if reader is not self._reader:
+            # reconnected in the meantime; this belongs to the old connection
+            return
+        if not header:
             raise ConnectionResetError()
-        if line == 'REFRESH':
+        if header == b'REFRESH':
             # we're not interested in insufficient data
-            _ = await self._reader.readexactly(1188)
-        elif line == 'REFRESHX':
-            data = await self._reader.readexactly(1992)
-            self.game_info.update_from_refreshx_packet(data)
-            self.on_refresh()
+            _ = await reader.readexactly(1188)
+        elif header == b'REFRESHX':
+            if self._refresh_requests:
+                self.rtt.append(
+                    time.monotonic() - self._refresh_requests.popleft())
+            if self._standby and not self._refresh_requests:
+                # recovered after all
+                self._discard_standby()
+            start = time.perf_counter()
+            data = await reader.readexactly(1992)
+            profiler.record('net_read', time.perf_counter() - start)
+            if self.pipeline:
+                self.pipeline.submit_refreshx(self, data)
+                return
+            with profiler.measure('refresh'):
+                with profiler.measure('decode'):
+                    self.game_info.update_from_refreshx_packet(data)
+                self.dispatch_refresh()
         else:
-            self.on_message(line)
+            if self.pipeline:
+                self.pipeline.submit_message(self, header)
+                return
+            line = _decode(header)
+            with profiler.measure('message'):
+                with profiler.measure('parse'):
+                    game_event = parser.parse(line)
+                self.dispatch_message(line, game_event)
+
+    def dispatch_refresh(self) -> None:
+        self.on_refresh()
+
+    def dispatch_message(
+            self,
+            line: str,
+            game_event: Optional[parser.GameEvent]) -> None:
+        self.on_message(line)
+        if game_event:
+            self.on_event(game_event)
@@ -0,0 +1,258 @@
+import re
+from typing import Optional, Callable, Dict, List, NamedTuple, Union
+from soladm import net
+
+
+class Kill(NamedTuple):
+    killer_id: int
+    killer: str
+    victim_id: int
+    victim: str
+    weapon: str
+
+
+class JoinRequest(NamedTuple):
+    ip: str
+    port: int
+    hwid: str
+
+
+class Joining(NamedTuple):
+    name: str
+
+
+class Join(NamedTuple):
+    name: str
+    team: 'net.PlayerTeam'
+
+
+class Leave(NamedTuple):
+    name: str
+    team: 'net.PlayerTeam'
+
+
+class FlagGrab(NamedTuple):
+    name: str
+    flag: str
+
+
+class FlagReturn(NamedTuple):
+    name: str
+    flag: str
+
+
+class FlagCapture(NamedTuple):
+    name: str
+    team: 'net.PlayerTeam'
+
+
+class AdminAdded(NamedTuple):
+    name: str
+
+
+class Chat(NamedTuple):
+    name: str
+    text: str
+    channel: str  # 'all', 'team' or 'radio'
+
+
+class TimeLeft(NamedTuple):
+    minutes: int
+
+
+class NextMap(NamedTuple):
+    map_name: str
+
+
+GameEvent = Union[
+    Kill, JoinRequest, Joining, Join, Leave, FlagGrab, FlagReturn,
+    FlagCapture, AdminAdded, Chat, TimeLeft, NextMap]
+Parser = Callable[[str], Optional[GameEvent]]
+
+
+_PLAYER = r'([ -~]{1,24})'
+
+_KILL_RE = re.compile(
+    r'^\((\d+)\) ' + _PLAYER + r' killed \((\d+)\) ' + _PLAYER +
+    r' with (.*)$')
+_CHAT_RE = re.compile(r'^\[' + _PLAYER + r'\] (.*)$')
+_TEAM_CHAT_RE = re.compile(r'^\(TEAM\)\[' + _PLAYER + r'\] (.*)$')
+_RADIO_RE = re.compile(r'^\(RADIO\)\[' + _PLAYER + r'\] (.*)$')
+_JOIN_REQUEST_RE = re.compile(
+    r'^(\d{1,3}(?:\.\d{1,3}){3}):(\d{1,5})\|([0-9A-Fa-f]{11}) '
+    r'requesting game\.\.\.$')
+_JOINING_RE = re.compile('^' + _PLAYER + r' joining game.*?$')
+_JOINED_RE = re.compile(
+    '^' + _PLAYER +
+    r' has joined (?:(alpha|bravo|charlie|delta) team|as (spectator))\.?$')
+_LEFT_RE = re.compile(
+    '^' + _PLAYER +
+    r' has left (?:(alpha|bravo|charlie|delta) team|(spectators))\.?$')
+_FLAG_GRAB_RE = re.compile(
+    '^' + _PLAYER + r' (?:captured|got) the (yellow|red|blue) flag$')
+_FLAG_RETURN_RE = re.compile(
+    '^' + _PLAYER + r' returned the (red|blue) flag$')
+_FLAG_SCORE_RE = re.compile(
+    '^' + _PLAYER + r' scores for (alpha|bravo) team$')
+_ADMIN_RE = re.compile('^' + _PLAYER + r' added to Game Admins$')
+_TIME_LEFT_RE = re.compile(r'^Time Left: (\d+) minutes$')
+_NEXT_MAP_RE = re.compile(r'^Next map: (.*)$')
+
+
+def _get_team(name: str) -> 'net.PlayerTeam':
+    # net imports this module, so its members are only looked up at runtime
+    if name.startswith('spectator'):
+        return net.PlayerTeam.SPECTATOR
+    return net.PlayerTeam[name.upper()]
+
+
+def _parse_kill(line: str) -> Optional[GameEvent]:
+    match = _KILL_RE.match(line)
+    if not match:
+        return None
+    return Kill(
+        killer_id=int(match.group(1)),
+        killer=match.group(2),
+        victim_id=int(match.group(3)),
+        victim=match.group(4),
+        weapon=match.group(5))
+
+
+def _parse_bracketed(line: str) -> Optional[GameEvent]:
+    if line.startswith('(TEAM)['):
+        match = _TEAM_CHAT_RE.match(line)
+        channel = 'team'
+    elif line.startswith('(RADIO)['):
+        match = _RADIO_RE.match(line)
+        channel = 'radio'
+    else:
+        return _parse_kill(line)
+    if not match:
+        return None
+    return Chat(name=match.group(1), text=match.group(2), channel=channel)
+
+
+def _parse_chat(line: str) -> Optional[GameEvent]:
+    match = _CHAT_RE.match(line)
+    if not match:
+        return None
+    return Chat(name=match.group(1), text=match.group(2), channel='all')
+
+
+def _parse_time_left(line: str) -> Optional[GameEvent]:
+    match = _TIME_LEFT_RE.match(line)
+    if not match:
+        return None
+    return TimeLeft(minutes=int(match.group(1)))
+
+
+def _parse_next_map(line: str) -> Optional[GameEvent]:
+    match = _NEXT_MAP_RE.match(line)
+    if not match:
+        return None
+    return NextMap(map_name=match.group(1))
+
+
+def _parse_join_request(line: str) -> Optional[GameEvent]:
+    match = _JOIN_REQUEST_RE.match(line)
+    if not match:
+        return None
+    return JoinRequest(
+        ip=match.group(1), port=int(match.group(2)), hwid=match.group(3))
+
+
+def _parse_joining(line: str) -> Optional[GameEvent]:
+    match = _JOINING_RE.match(line)
+    if not match:
+        return None
+    return Joining(name=match.group(1))
+
+
+def _parse_team(line: str) -> Optional[GameEvent]:
+    match = _JOINED_RE.match(line)
+    if match:
+        return Join(
+            name=match.group(1),
+            team=_get_team(match.group(2) or match.group(3)))
+    match = _LEFT_RE.match(line)
+    if match:
+        return Leave(
+            name=match.group(1),
+            team=_get_team(match.group(2) or match.group(3)))
+    match = _FLAG_SCORE_RE.match(line)
+    if match:
+        return FlagCapture(name=match.group(1), team=_get_team(match.group(2)))
+    return None
+
+
+def _parse_flag(line: str) -> Optional[GameEvent]:
+    match = _FLAG_GRAB_RE.match(line)
+    if match:
+        return FlagGrab(name=match.group(1), flag=match.group(2))
+    match = _FLAG_RETURN_RE.match(line)
+    if match:
+        return FlagReturn(name=match.group(1), flag=match.group(2))
+    return None
+
+
+def _parse_admin(line: str) -> Optional[GameEvent]:
+    match = _ADMIN_RE.match(line)
+    if not match:
+        return None
+    return AdminAdded(name=match.group(1))
+
+
+# Server messages with a fixed prefix, keyed by their first character.
+_LEADING_PARSERS: Dict[str, Parser] = {
+    '(': _parse_bracketed,
+    '[': _parse_chat,
+}
+
+# Server messages with a fixed prefix, keyed by their first word.
+_LEADING_WORD_PARSERS: Dict[str, Parser] = {
+    'Time': _parse_time_left,
+    'Next': _parse_next_map,
+}
+
+# Messages starting with a player name (which can contain spaces), keyed by
+# their last word instead.
+_TRAILING_WORD_PARSERS: Dict[str, List[Parser]] = {
+    'game...': [_parse_join_request, _parse_joining],
+    'game': [_parse_joining],
+    'team': [_parse_team],
+    'team.': [_parse_team],
+    'spectator': [_parse_team],
+    'spectator.': [_parse_team],
+    'spectators': [_parse_team],
+    'spectators.': [_parse_team],
+    'flag': [_parse_flag],
+    'Admins': [_parse_admin],
+}
+
+
+def parse(line: str) -> Optional[GameEvent]:
+    if not line:
+        return None
+
+    func = _LEADING_PARSERS.get(line[0])
+    if func:
+        game_event = func(line)
+        if game_event:
+            return game_event
+
+    func = _LEADING_WORD_PARSERS.get(line.split(' ', 1)[0])
+    if func:
+        game_event = func(line)
+        if game_event:
+            return game_event
+
+    for func in _TRAILING_WORD_PARSERS.get(line.rsplit(' ', 1)[-1], []):
+        game_event = func(line)
+        if game_event:
+            return game_event
+
+    # "joining game" can be followed by arbitrary connection details
+    if ' joining game' in line:
+        return _parse_joining(line)
+
+    return None
@@ -0,0 +1,171 @@
+import asyncio
+import collections
+import concurrent.futures
+import struct
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Optional, Deque, Dict, List, Tuple
+from soladm import net, parser
+from soladm.profiling import profiler
+
+
+DEFAULT_BATCH_INTERVAL = 0.02
+SEGMENT_SIZE = 256 * 1024
+
+ITEM_MESSAGE = 0
+ITEM_REFRESHX = 1
+
+# kind, connection index, payload length
+_ITEM_HEADER = struct.Struct('<BHI')
+
+Result = Tuple[int, int, Any]
+
+# shared memory segments attached by the current worker process
+_worker_segments: Dict[str, shared_memory.SharedMemory] = {}
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    segment = _worker_segments.get(name)
+    if segment is None:
+        segment = shared_memory.SharedMemory(name)
+        # the parent process owns the segment; without this the worker's
+        # resource tracker would unlink it when the worker exits
+        resource_tracker.unregister(
+            segment._name, 'shared_memory')  # type: ignore
+        _worker_segments[name] = segment
+    return segment
+
+
+def process_batch(name: str, size: int) -> List[Result]:
+    buffer = _attach(name).buf
+    results: List[Result] = []
+    game_info = net.GameInfo()
+    offset = 0
+    while offset < size:
+        kind, index, length = _ITEM_HEADER.unpack_from(buffer, offset)
+        offset += _ITEM_HEADER.size
+        payload = bytes(buffer[offset:offset + length])
+        offset += length
+        if kind == ITEM_REFRESHX:
+            game_info.update_from_refreshx_packet(payload)
+            results.append((kind, index, game_info.to_snapshot()))
+        else:
+            line = net._decode(payload)
+            results.append((kind, index, (line, parser.parse(line))))
+    return results
+
+
+class _Batch:
+    def __init__(self, segment: shared_memory.SharedMemory) -> None:
+        self.segment = segment
+        self.size = 0
+        self.future: Optional[asyncio.Future] = None
+
+
+class DecodePipeline:
+    def __init__(
+            self,
+            workers: int,
+            batch_interval: float = DEFAULT_BATCH_INTERVAL) -> None:
+        self.batch_interval = batch_interval
+        self._executor = concurrent.futures.ProcessPoolExecutor(workers)
+        self._connections: List[net.Connection] = []
+        self._indexes: Dict[int, int] = {}
+        self._free_segments: List[shared_memory.SharedMemory] = []
+        self._all_segments: List[shared_memory.SharedMemory] = []
+        self._batch: Optional[_Batch] = None
+        self._flush_handle: Optional[asyncio.Handle] = None
+        # batches can finish out of order, results are applied in order
+        self._in_flight: Deque[_Batch] = collections.deque()
+
+    def register(self, connection: net.Connection) -> None:
+        self._indexes[id(connection)] = len(self._connections)
+        self._connections.append(connection)
+        connection.pipeline = self
+
+    def close(self) -> None:
+        if self._flush_handle:
+            self._flush_handle.cancel()
+        self._executor.shutdown()
+        for segment in self._all_segments:
+            segment.close()
+            segment.unlink()
+        self._all_segments.clear()
+        self._free_segments.clear()
+
+    def submit_refreshx(self, connection: net.Connection, data: bytes) -> None:
+        self._submit(ITEM_REFRESHX, connection, data)
+
+    def submit_message(self, connection: net.Connection, raw: bytes) -> None:
+        self._submit(ITEM_MESSAGE, connection, raw)
+
+    def _submit(
+            self,
+            kind: int,
+            connection: net.Connection,
+            payload: bytes) -> None:
+        item_size = _ITEM_HEADER.size + len(payload)
+        if self._batch and self._batch.size + item_size > SEGMENT_SIZE:
+            self.flush()
+        if not self._batch:
+            self._batch = _Batch(self._get_segment())
+            self._flush_handle = asyncio.get_event_loop().call_later(
+                self.batch_interval, self.flush)
+        batch = self._batch
+        _ITEM_HEADER.pack_into(
+            batch.segment.buf,
+            batch.size,
+            kind,
+            self._indexes[id(connection)],
+            len(payload))
+        start = batch.size + _ITEM_HEADER.size
+        batch.segment.buf[start:start + len(payload)] = payload
+        batch.size += item_size
+
+    def flush(self) -> None:
+        if self._flush_handle:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch = self._batch
+        if not batch:
+            return
+        self._batch = None
+        loop = asyncio.get_event_loop()
+        batch.future = loop.run_in_executor(
+            self._executor, process_batch, batch.segment.name, batch.size)
+        batch.future.add_done_callback(self._on_batch_done)
+        self._in_flight.append(batch)
+
+    def _get_segment(self) -> shared_memory.SharedMemory:
+        if self._free_segments:
+            return self._free_segments.pop()
+        segment = shared_memory.SharedMemory(create=True, size=SEGMENT_SIZE)
+        self._all_segments.append(segment)
+        return segment
+
+    def _on_batch_done(self, _future: asyncio.Future) -> None:
+        while self._in_flight:
+            batch = self._in_flight[0]
+            assert batch.future
+            if not batch.future.done():
+                break
+            self._in_flight.popleft()
+            self._free_segments.append(batch.segment)
+            self._apply(batch.future)
+
+    def _apply(self, future: asyncio.Future) -> None:
+        try:
+            results = future.result()
+        except Exception as ex:
+            for connection in self._connections:
+                connection.on_exception(ex)
+            return
+        for kind, index, payload in results:
+            connection = self._connections[index]
+            if kind == ITEM_REFRESHX:
+                with profiler.measure('refresh'):
+                    with profiler.measure('apply_snapshot'):
+                        connection.game_info.apply_snapshot(payload)
+                    connection.dispatch_refresh()
+            else:
+                with profiler.measure('message'):
+                    connection.dispatch_message(*payload)
@@ -0,0 +1,95 @@
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Union
+
+
+class StageStats:
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.last = 0.0
+        self.max = 0.0
+
+    @property
+    def average(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+
+class _NullStage:
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, *args: Any) -> None:
+        pass
+
+
+class _Stage:
+    __slots__ = ('_profiler', '_name', '_start')
+
+    def __init__(self, profiler: 'Profiler', name: str) -> None:
+        self._profiler = profiler
+        self._name = name
+        self._start = 0.0
+
+    def __enter__(self) -> None:
+        self._profiler._stack.append(self._name)
+        self._start = time.perf_counter()
+
+    def __exit__(self, *args: Any) -> None:
+        elapsed = time.perf_counter() - self._start
+        self._profiler._add(';'.join(self._profiler._stack), elapsed)
+        self._profiler._stack.pop()
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Profiler:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.stats: Dict[str, StageStats] = {}
+        self._stack: List[str] = []
+
+    def measure(self, name: str) -> Union[_Stage, _NullStage]:
+        # meant for synchronous code only: a stage must not span an await,
+        # otherwise unrelated stages would nest inside of it
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def record(self, name: str, seconds: float) -> None:
+        if self.enabled:
+            self._add(';'.join(self._stack + [name]), seconds)
+
+    def reset(self) -> None:
+        self.stats.clear()
+
+    def dump(self, path: Path) -> None:
+        # folded stacks as consumed by flamegraph.pl, in microseconds of
+        # self time
+        with path.open('w') as handle:
+            for stack in sorted(self.stats):
+                child_total = sum(
+                    stats.total
+                    for child_stack, stats in self.stats.items()
+                    if child_stack.startswith(stack + ';')
+                    and ';' not in child_stack[len(stack) + 1:])
+                self_time = max(0.0, self.stats[stack].total - child_total)
+                handle.write('{} {}\n'.format(
+                    stack, int(self_time * 1e6)))
+
+    def _add(self, stack: str, seconds: float) -> None:
+        stats = self.stats.get(stack)
+        if stats is None:
+            stats = self.stats[stack] = StageStats()
+        stats.add(seconds)
+
+
+profiler = Profiler()
@@ -0,0 +1,204 @@
+import asyncio
+import json
+import os
+from typing import Any, Dict, List, Optional, Set
+from soladm import net
+
+
+DEFAULT_QUEUE_SIZE = 1000
+
+TOPIC_MESSAGES = 'messages'
+TOPIC_REFRESH = 'refresh'
+TOPICS = (TOPIC_MESSAGES, TOPIC_REFRESH)
+
+
+def _encode(record: Dict[str, Any]) -> bytes:
+    return (json.dumps(record, separators=(',', ':')) + '\n').encode()
+
+
+class _Subscriber:
+    def __init__(
+            self,
+            writer: asyncio.StreamWriter,
+            queue_size: int) -> None:
+        self.writer = writer
+        self.topics: Set[str] = set()
+        self.authenticated = False
+        self.queue: 'asyncio.Queue[bytes]' = asyncio.Queue(queue_size)
+        self.dropped = 0
+
+    def push(self, data: bytes) -> None:
+        # a slow client loses records instead of slowing everyone down; it's
+        # told how many once it catches up
+        try:
+            if self.dropped:
+                self.queue.put_nowait(_encode(
+                    {'type': 'dropped', 'count': self.dropped}))
+                self.dropped = 0
+            self.queue.put_nowait(data)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+
+class RemoteServer:
+    # JSON lines API multiplexing many local clients over the existing admin
+    # connections. requests:
+    #   {"op": "auth", "token": "..."}
+    #   {"op": "servers"}
+    #   {"op": "send", "server": "name", "text": "/say hi"}
+    #   {"op": "subscribe", "topics": ["messages", "refresh"]}
+    def __init__(
+            self,
+            connections: Dict[str, net.Connection],
+            token: Optional[str] = None,
+            queue_size: int = DEFAULT_QUEUE_SIZE) -> None:
+        self.connections = connections
+        self.token = token
+        self.queue_size = queue_size
+        self._subscribers: List[_Subscriber] = []
+        self._tasks: Set['asyncio.Task[None]'] = set()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._unix_path: Optional[str] = None
+        for name, connection in connections.items():
+            self._attach(name, connection)
+
+    async def start(self, address: str) -> None:
+        # unix:/path/to/socket or tcp:host:port
+        kind, _, location = address.partition(':')
+        if kind == 'unix':
+            if os.path.exists(location):
+                os.unlink(location)
+            self._server = await asyncio.start_unix_server(
+                self._handle, location)
+            os.chmod(location, 0o600)
+            self._unix_path = location
+        elif kind == 'tcp':
+            host, _, port = location.rpartition(':')
+            self._server = await asyncio.start_server(
+                self._handle, host or '127.0.0.1', int(port))
+        else:
+            raise ValueError('Invalid address: {}'.format(address))
+
+    async def close(self) -> None:
+        # the clients are disconnected before the event loop goes away
+        if self._server:
+            self._server.close()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._server:
+            await self._server.wait_closed()
+            self._server = None
+        if self._unix_path and os.path.exists(self._unix_path):
+            os.unlink(self._unix_path)
+            self._unix_path = None
+
+    def _attach(self, name: str, connection: net.Connection) -> None:
+        def on_message(text: str) -> None:
+            self._publish(TOPIC_MESSAGES, lambda: {
+                'type': 'message', 'server': name, 'text': text})
+
+        def on_refresh() -> None:
+            self._publish(TOPIC_REFRESH, lambda: {
+                'type': 'refresh',
+                'server': name,
+                'data': connection.game_info.to_dict()})
+
+        connection.on_message.append(on_message)
+        connection.on_refresh.append(on_refresh)
+
+    def _publish(self, topic: str, make_record: Any) -> None:
+        data: Optional[bytes] = None
+        for subscriber in self._subscribers:
+            if topic in subscriber.topics:
+                # serialized only if someone's interested, and only once
+                if data is None:
+                    data = _encode(make_record())
+                subscriber.push(data)
+
+    async def _handle(
+            self,
+            reader: asyncio.StreamReader,
+            writer: asyncio.StreamWriter) -> None:
+        subscriber = _Subscriber(writer, self.queue_size)
+        subscriber.authenticated = not self.token
+        self._subscribers.append(subscriber)
+        task = asyncio.current_task()
+        assert task
+        self._tasks.add(task)
+        writer_task = asyncio.ensure_future(self._write_loop(subscriber))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError('Request must be an object')
+                    reply = await self._process(subscriber, request)
+                except Exception as ex:
+                    reply = {'type': 'error', 'error': str(ex)}
+                # replies don't go through the queue, so that they can't be
+                # dropped
+                writer.write(_encode(reply))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._subscribers.remove(subscriber)
+            self._tasks.discard(task)
+            writer_task.cancel()
+            await asyncio.gather(writer_task, return_exceptions=True)
+            writer.close()
+
+    async def _write_loop(self, subscriber: _Subscriber) -> None:
+        try:
+            while True:
+                data = await subscriber.queue.get()
+                subscriber.writer.write(data)
+                await subscriber.writer.drain()
+        except (asyncio.CancelledError, ConnectionError):
+            pass
+
+    async def _process(
+            self,
+            subscriber: _Subscriber,
+            request: Dict[str, Any]) -> Dict[str, Any]:
+        op = request.get('op')
+        if op == 'auth':
+            subscriber.authenticated = (
+                not self.token or request.get('token') == self.token)
+            if not subscriber.authenticated:
+                raise ValueError('Invalid token')
+            return {'type': 'ok'}
+        if not subscriber.authenticated:
+            raise ValueError('Not authenticated')
+
+        if op == 'servers':
+            return {
+                'type': 'servers',
+                'servers': {
+                    name: connection.state.name.lower()
+                    for name, connection in self.connections.items()}}
+
+        if op == 'subscribe':
+            topics = request.get('topics', list(TOPICS))
+            unknown = set(topics) - set(TOPICS)
+            if unknown:
+                raise ValueError(
+                    'Unknown topics: {}'.format(', '.join(sorted(unknown))))
+            subscriber.topics = set(topics)
+            return {'type': 'ok'}
+
+        if op == 'send':
+            name = request.get('server')
+            if name is None and len(self.connections) == 1:
+                name = next(iter(self.connections))
+            connection = self.connections.get(name or '')
+            if not connection:
+                raise ValueError('Unknown server: {}'.format(name))
+            await connection.write(str(request['text']))
+            return {'type': 'ok'}
+
+        raise ValueError('Unknown op: {}'.format(op))
@@ -0,0 +1,213 @@
+import asyncio
+import enum
+import re
+import time
+from typing import (
+    Any, Optional, Callable, Dict, Iterable, List, Match, Pattern, Tuple)
+from soladm import event, net, util
+
+
+DEFAULT_COOLDOWN = 10.0
+
+_TEAM_MODES = {
+    net.GameMode.TeamMatch: (
+        net.PlayerTeam.ALPHA,
+        net.PlayerTeam.BRAVO,
+        net.PlayerTeam.CHARLIE,
+        net.PlayerTeam.DELTA),
+    net.GameMode.CaptureTheFlag: (net.PlayerTeam.ALPHA, net.PlayerTeam.BRAVO),
+    net.GameMode.Infiltration: (net.PlayerTeam.ALPHA, net.PlayerTeam.BRAVO),
+    net.GameMode.HoldTheFlag: (net.PlayerTeam.ALPHA, net.PlayerTeam.BRAVO),
+}
+
+
+class RuleTrigger(enum.Enum):
+    MESSAGE = 'message'
+    PLAYER = 'player'
+    PING = 'ping'
+    SCORE_DIFFERENCE = 'score_difference'
+
+
+class Rule:
+    def __init__(
+            self,
+            name: str,
+            trigger: RuleTrigger,
+            action: str,
+            cooldown: float = DEFAULT_COOLDOWN,
+            pattern: Optional[Pattern] = None,
+            field: Optional[str] = None,
+            threshold: int = 0,
+            refreshes: int = 1) -> None:
+        self.name = name
+        self.trigger = trigger
+        self.action = action
+        self.cooldown = cooldown
+        self.pattern = pattern
+        self.field = field
+        self.threshold = threshold
+        self.refreshes = refreshes
+
+
+def _combine(rules: List[Rule]) -> Optional[Pattern]:
+    # a single alternation lets the regex engine find the rule that matches,
+    # or reject lines that no rule is interested in, without looping over
+    # the rules in Python. every rule's pattern is followed by an empty
+    # group named after its index, which is the last group to match; unlike
+    # a group around the pattern, it leaves the common prefix of the rules
+    # visible to the regex compiler.
+    if not rules:
+        return None
+    try:
+        return re.compile(
+            '|'.join(
+                '(?:{})(?P<_rule{}>)'.format(rule.pattern.pattern, i)
+                for i, rule in enumerate(rules)
+                if rule.pattern),
+            re.I)
+    except re.error:
+        # e.g. the same group name used by two different rules
+        return None
+
+
+def _find_rule(
+        combined: Optional[Pattern],
+        rules: List[Rule],
+        text: str) -> Optional[Tuple[Rule, Match]]:
+    # the first rule matching the text, with the match of its own pattern
+    if combined:
+        match = combined.match(text)
+        if not match or not match.lastgroup:
+            return None
+        candidates = [rules[int(match.lastgroup[len('_rule'):])]]
+    else:
+        candidates = rules
+    for rule in candidates:
+        assert rule.pattern
+        match = rule.pattern.match(text)
+        if match:
+            return (rule, match)
+    return None
+
+
+def _player_fields(player: net.PlayerInfo) -> Dict[str, Any]:
+    return {
+        'id': player.id,
+        'name': player.name,
+        'hwid': player.hwid,
+        'ip': player.ip,
+        'ping': player.ping,
+        'team': player.team.name.lower(),
+    }
+
+
+class RuleEngine:
+    def __init__(
+            self,
+            rules: Iterable[Rule],
+            clock: Callable[[], float] = time.monotonic) -> None:
+        self.on_action = event.EventHandler()
+
+        rules = list(rules)
+        self._cooldowns = {
+            rule.name: util.Cooldown(rule.cooldown, clock) for rule in rules}
+
+        self._message_rules = [
+            rule
+            for rule in rules
+            if rule.trigger == RuleTrigger.MESSAGE and rule.pattern]
+        self._message_filter = _combine(self._message_rules)
+
+        self._player_rules: Dict[str, List[Rule]] = {}
+        self._player_filters: Dict[str, Optional[Pattern]] = {}
+        for rule in rules:
+            if (
+                    rule.trigger == RuleTrigger.PLAYER and
+                    rule.field and
+                    rule.pattern):
+                self._player_rules.setdefault(rule.field, []).append(rule)
+        for field, field_rules in self._player_rules.items():
+            self._player_filters[field] = _combine(field_rules)
+
+        self._ping_rules = sorted(
+            (rule for rule in rules if rule.trigger == RuleTrigger.PING),
+            key=lambda rule: rule.threshold)
+        self._ping_counters: Dict[Tuple[int, int, str], int] = {}
+
+        self._score_rules = [
+            rule
+            for rule in rules
+            if rule.trigger == RuleTrigger.SCORE_DIFFERENCE]
+
+    def attach(self, connection: net.Connection) -> None:
+        def send(rule: Rule, command: str) -> None:
+            asyncio.ensure_future(connection.send(command))
+
+        def refresh() -> None:
+            self.process_refresh(connection.game_info)
+
+        connection.on_message.append(self.process_message)
+        connection.on_refresh.append(refresh)
+        self.on_action.append(send)
+
+    def process_message(self, line: str) -> None:
+        if not self._message_rules:
+            return
+        found = _find_rule(self._message_filter, self._message_rules, line)
+        if found:
+            rule, match = found
+            groups = [match.group(0)] + [
+                group or '' for group in match.groups()]
+            self._fire(rule, rule.action.format(*groups))
+
+    def process_refresh(self, game_info: net.GameInfo) -> None:
+        players = game_info.players
+        if self._player_rules:
+            self._process_players(players)
+        if self._ping_rules:
+            self._process_pings(players)
+        if self._score_rules:
+            self._process_scores(game_info)
+
+    def _process_players(self, players: List[net.PlayerInfo]) -> None:
+        for player in players:
+            for field, field_rules in self._player_rules.items():
+                found = _find_rule(
+                    self._player_filters[field],
+                    field_rules,
+                    getattr(player, field))
+                if found:
+                    rule, _match = found
+                    self._fire(
+                        rule, rule.action.format(**_player_fields(player)))
+
+    def _process_pings(self, players: List[net.PlayerInfo]) -> None:
+        counters: Dict[Tuple[int, int, str], int] = {}
+        for player in players:
+            for i, rule in enumerate(self._ping_rules):
+                if player.ping <= rule.threshold:
+                    # rules are sorted by threshold
+                    break
+                key = (i, player.id, player.name)
+                counters[key] = self._ping_counters.get(key, 0) + 1
+                if counters[key] >= rule.refreshes:
+                    self._fire(
+                        rule, rule.action.format(**_player_fields(player)))
+        self._ping_counters = counters
+
+    def _process_scores(self, game_info: net.GameInfo) -> None:
+        teams = _TEAM_MODES.get(game_info.game_mode)
+        if not teams:
+            return
+        scores = [game_info.scores[team] for team in teams]
+        difference = max(scores) - min(scores)
+        for rule in self._score_rules:
+            if difference > rule.threshold:
+                self._fire(rule, rule.action.format(
+                    difference=difference,
+                    alpha=game_info.scores[net.PlayerTeam.ALPHA],
+                    bravo=game_info.scores[net.PlayerTeam.BRAVO]))
+
+    def _fire(self, rule: Rule, command: str) -> None:
+        if self._cooldowns[rule.name].ready(command):
+            self.on_action(rule, command)
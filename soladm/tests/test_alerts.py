@@ -0,0 +1,186 @@
+import asyncio
+import json
+import re
+import shlex
+import sys
+import time
+from pathlib import Path
+from typing import Any, List
+import pytest
+from soladm.alerts import (
+    Alert, AlertDispatcher, AlertSink, CommandSink, FileSink, WebhookSink)
+from soladm.tests.util import run_async
+
+
+class RecordingSink(AlertSink):
+    def __init__(self) -> None:
+        self.batches: List[List[Alert]] = []
+
+    async def send(self, alerts: List[Alert]) -> None:
+        self.batches.append(alerts)
+
+
+class StuckSink(AlertSink):
+    async def send(self, alerts: List[Alert]) -> None:
+        await asyncio.Event().wait()
+
+
+class WebhookStandIn:
+    # just enough of an HTTP server to take POSTs
+    def __init__(self) -> None:
+        self.bodies: List[Any] = []
+        self.port = 0
+        self._server: Any = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(
+            self._handle, '127.0.0.1', 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    def close(self) -> None:
+        self._server.close()
+
+    async def _handle(
+            self,
+            reader: asyncio.StreamReader,
+            writer: asyncio.StreamWriter) -> None:
+        length = 0
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode().partition(':')
+            if name.lower() == 'content-length':
+                length = int(value)
+        self.bodies.append(json.loads(await reader.readexactly(length)))
+        writer.write(
+            b'HTTP/1.1 200 OK\r\nContent-Length: 0\r\n'
+            b'Connection: close\r\n\r\n')
+        await writer.drain()
+        writer.close()
+
+
+def test_flood() -> None:
+    sink = RecordingSink()
+
+    async def scenario() -> None:
+        dispatcher = AlertDispatcher(
+            [sink],
+            [re.compile('.*!admin$')],
+            batch_window=0.05,
+            cooldown=0.3)
+        for i in range(300):
+            dispatcher.check('a', '[Player{}] !admin'.format(i))
+        dispatcher.check('a', '[Player1] hello')
+        dispatcher.check('b', '[Player1] !admin')
+        await asyncio.sleep(0.15)
+        assert len(sink.batches) == 1
+        alerts = sorted(sink.batches[0])
+        assert [(alert.server, alert.count) for alert in alerts] == [
+            ('a', 300), ('b', 1)]
+        assert alerts[0].text == '[Player0] !admin (and 299 more)'
+        assert len(alerts[0].texts) == 5
+
+        # during the cooldown matches are only counted
+        for i in range(50):
+            dispatcher.check('a', '[Player{}] !admin'.format(i))
+        await asyncio.sleep(0.1)
+        assert len(sink.batches) == 1
+        await asyncio.sleep(0.2)
+        assert len(sink.batches) == 2
+        assert sink.batches[1][0].count == 50
+        await dispatcher.close()
+
+    run_async(scenario())
+
+
+def test_slow_sink() -> None:
+    fast_sink = RecordingSink()
+
+    async def scenario() -> None:
+        dispatcher = AlertDispatcher(
+            [StuckSink(), fast_sink], batch_window=0, queue_size=2)
+        errors: List[Exception] = []
+        dispatcher.on_error.append(errors.append)
+        start = time.monotonic()
+        for i in range(10):
+            dispatcher.notify('a', str(i), 'text')
+            dispatcher.flush(force=True)
+            await asyncio.sleep(0)
+        assert time.monotonic() - start < 0.5
+        await asyncio.sleep(0.01)
+        assert len(fast_sink.batches) == 10
+        # one being sent and two waiting
+        assert dispatcher.dropped == 7
+        assert [str(error) for error in errors] == [
+            'StuckSink is falling behind, dropping alerts']
+
+        # the stuck sink doesn't hold up closing for long
+        start = time.monotonic()
+        await dispatcher.close(timeout=0.1)
+        assert time.monotonic() - start < 0.5
+
+    run_async(scenario())
+
+
+def test_sink_needs_send() -> None:
+    class IncompleteSink(AlertSink):
+        pass
+
+    with pytest.raises(TypeError):
+        IncompleteSink()  # type: ignore
+
+
+def test_sinks(tmp_path: Path) -> None:
+    webhook = WebhookStandIn()
+    command_output = tmp_path / 'command.txt'
+    command = '{} -c {} {{server}} {{text}} {{count}}'.format(
+        shlex.quote(sys.executable),
+        shlex.quote(
+            'import sys; open({!r}, "a").write(" ".join(sys.argv[1:]))'.format(
+                str(command_output))))
+    errors: List[Exception] = []
+
+    async def scenario() -> None:
+        await webhook.start()
+        dispatcher = AlertDispatcher([
+            CommandSink(command),
+            WebhookSink('http://127.0.0.1:{}/'.format(webhook.port)),
+            FileSink(tmp_path / 'alerts.txt'),
+        ])
+        dispatcher.on_error.append(errors.append)
+        dispatcher.notify('a', 'key', 'first')
+        dispatcher.notify('a', 'key', 'second')
+        await dispatcher.drain()
+        await dispatcher.close()
+        webhook.close()
+
+        dispatcher = AlertDispatcher([WebhookSink('http://127.0.0.1:1/')])
+        dispatcher.on_error.append(errors.append)
+        dispatcher.notify('a', 'key', 'text')
+        await dispatcher.drain()
+        await dispatcher.close()
+
+    run_async(scenario())
+    assert command_output.read_text() == 'a first (and 1 more) 2'
+    assert webhook.bodies[0]['alerts'][0]['texts'] == ['first', 'second']
+    assert (tmp_path / 'alerts.txt').read_text().endswith(
+        '] a: first (and 1 more)\n')
+    # the second webhook is unreachable
+    assert len(errors) == 1
+
+
+def test_close_sends_pending() -> None:
+    sink = RecordingSink()
+
+    async def scenario() -> None:
+        dispatcher = AlertDispatcher([sink], batch_window=60)
+        dispatcher.notify('a', 'key', 'text')
+        await asyncio.sleep(0)
+        assert not sink.batches
+        await dispatcher.close()
+        assert len(sink.batches) == 1
+        # nothing is left running when the loop closes
+        assert len(asyncio.all_tasks()) == 1
+
+    run_async(scenario())
@@ -0,0 +1,94 @@
+import random
+import time
+from typing import List
+from pathlib import Path
+from soladm import net, parser
+from soladm.balance import (
+    BalanceTracker, RatingStore, suggest_split, DEFAULT_RATING)
+from soladm.matches import MatchSummary, PlayerSummary
+from soladm.tests.util import make_game_info, make_player
+
+
+def test_ratings(tmp_path: Path) -> None:
+    store = RatingStore(tmp_path / 'ratings.json')
+    store.record_kill('a', 'b')
+    assert store.get('a') == DEFAULT_RATING + 2
+    assert store.get('b') == DEFAULT_RATING - 2
+    store.record_kill('a', 'a')
+    assert store.get('a') == DEFAULT_RATING + 2
+
+    store.record_match(MatchSummary(
+        server='', map_name='ctf_Ash', game_mode=3, started=0, ended=1,
+        reason='', scores=[0, 5, 0, 0], peak_players=2,
+        players=[
+            PlayerSummary('A', 'a', 1, 0, 0, 0),
+            PlayerSummary('B', 'b', 2, 0, 0, 0),
+        ]))
+    assert store.get('b') > DEFAULT_RATING > store.get('a')
+
+    store.save()
+    loaded = RatingStore(tmp_path / 'ratings.json')
+    loaded.load()
+    assert loaded.get('a') == round(store.get('a'), 1)
+    assert len(loaded) == 2
+
+
+def test_split() -> None:
+    alpha, bravo = net.PlayerTeam.ALPHA, net.PlayerTeam.BRAVO
+    players = [
+        make_player(id=i, team=team)
+        for i, team in enumerate([alpha, alpha, bravo, bravo], 1)]
+    split = suggest_split(players, [2000, 1900, 1500, 1400])
+    # a single swap evens it out exactly
+    assert split.difference == 0
+    assert len(split.moves) == 2
+    assert {move.team for move in split.moves} == {alpha, bravo}
+
+    # not worth moving anyone over a few points
+    split = suggest_split(players, [1510, 1500, 1500, 1500])
+    assert not split.moves
+
+
+def test_split_is_fast() -> None:
+    rng = random.Random(1)
+    teams = [net.PlayerTeam.ALPHA] * 16 + [net.PlayerTeam.BRAVO] * 16
+    players = [
+        make_player(id=i, team=team) for i, team in enumerate(teams, 1)]
+    ratings = sorted(rng.gauss(1500, 200) for i in range(32))
+    start = time.perf_counter()
+    split = suggest_split(players, ratings)
+    assert time.perf_counter() - start < 0.5
+    assert split.difference < 50
+    counts = {
+        team: sum(player.team == team for player in players)
+        for team in (net.PlayerTeam.ALPHA, net.PlayerTeam.BRAVO)}
+    for move in split.moves:
+        counts[move.team] += 1
+        counts[net.PlayerTeam(3 - move.team)] -= 1
+    assert list(counts.values()) == [16, 16]
+
+
+def test_tracker() -> None:
+    alpha, bravo = net.PlayerTeam.ALPHA, net.PlayerTeam.BRAVO
+    store = RatingStore()
+    store.ratings = {'Player1': 2000, 'Player2': 1900}
+    tracker = BalanceTracker(store)
+    game_info = make_game_info(
+        [
+            make_player(id=i, team=team)
+            for i, team in enumerate([alpha, alpha, bravo, bravo], 1)],
+        game_mode=net.GameMode.CaptureTheFlag)
+    tracker.update(game_info)
+    assert tracker.suggestion and tracker.suggestion.moves
+
+    tracker.process_event(parser.Kill(3, 'Player3', 1, 'Player1', 'Ak-74'))
+    assert store.get('Player3') > DEFAULT_RATING
+    # team kills don't count
+    tracker.process_event(parser.Kill(4, 'Player4', 3, 'Player3', 'Ak-74'))
+    assert store.get('Player4') == DEFAULT_RATING
+
+    commands: List[str] = []
+    tracker.on_action.append(commands.append)
+    assert tracker.apply()
+    assert len(commands) == 2
+    assert not tracker.apply()
@@ -0,0 +1,103 @@
+import random
+import time
+from pathlib import Path
+from typing import List
+import pytest
+from soladm import parser
+from soladm.bans import AccessList, BanEnforcer, parse_ip, parse_range
+from soladm.tests.util import FakeClock, make_player
+
+
+@pytest.mark.parametrize('text,expected', [
+    ('1.2.3.4', ('1.2.3.4', '1.2.3.4')),
+    ('1.2.3.77/24', ('1.2.3.0', '1.2.3.255')),
+    ('10.0.0.0/8', ('10.0.0.0', '10.255.255.255')),
+    ('0.0.0.0/0', ('0.0.0.0', '255.255.255.255')),
+    ('1.2.3.4-1.2.4.0', ('1.2.3.4', '1.2.4.0')),
+])
+def test_parse_range(text: str, expected: List[str]) -> None:
+    assert parse_range(text) == (parse_ip(expected[0]), parse_ip(expected[1]))
+
+
+def test_ip_ranges_are_merged() -> None:
+    access_list = AccessList()
+    access_list.add('1.2.3.0/25')
+    access_list.add('1.2.3.128/25')
+    access_list.add('1.2.3.5')
+    access_list.add('8.8.8.8')
+    assert len(access_list.ips) == 2
+    assert access_list.matches('1.2.3.0', '')
+    assert access_list.matches('1.2.3.255', '')
+    assert access_list.matches('8.8.8.8', '')
+    assert not access_list.matches('1.2.4.0', '')
+    assert not access_list.matches('8.8.8.7', '')
+    assert not access_list.matches('0.0.0.0', '')
+
+
+def test_hwids(tmp_path: Path) -> None:
+    path = tmp_path / 'bans.txt'
+    path.write_text(
+        '# comment\n'
+        '\n'
+        '0123456789a  # cheater\n'
+        'hwid:FFFFFFFFFFF\n'
+        '5.6.7.8\n')
+    access_list = AccessList()
+    access_list.load(path)
+    assert len(access_list) == 3
+    assert access_list.matches('0.0.0.0', '0123456789A')
+    assert access_list.matches('0.0.0.0', 'fffffffffff')
+    assert access_list.matches('5.6.7.8', '')
+    assert not access_list.matches('0.0.0.0', '00000000000')
+
+
+def test_enforcer() -> None:
+    bans = AccessList()
+    bans.add('1.2.3.0/24')
+    bans.add('AAAAAAAAAAA')
+    whitelist = AccessList()
+    whitelist.add('1.2.3.4')
+    clock = FakeClock()
+    enforcer = BanEnforcer(bans, whitelist, '/kick {id}', 10, clock=clock)
+    actions: List[str] = []
+    enforcer.on_action.append(actions.append)
+    enforcer.on_refresh_request.append(lambda: actions.append('refresh'))
+
+    enforcer.process_join(parser.JoinRequest('9.9.9.9', 23073, '00000000000'))
+    assert actions == []
+    enforcer.process_join(parser.JoinRequest('1.2.3.5', 23073, '00000000000'))
+    assert actions == ['refresh']
+    actions.clear()
+
+    players = [
+        make_player(id=1, ip='1.2.3.4'),
+        make_player(id=2, ip='1.2.3.5'),
+        make_player(id=3, ip='9.9.9.9', hwid='AAAAAAAAAAA'),
+        make_player(id=4, ip='9.9.9.9', hwid='BBBBBBBBBBB'),
+    ]
+    enforcer.process_players(players)
+    assert actions == ['/kick 2', '/kick 3']
+    enforcer.process_players(players)
+    assert actions == ['/kick 2', '/kick 3']
+    clock.now += 10
+    enforcer.process_players(players)
+    assert actions == ['/kick 2', '/kick 3', '/kick 2', '/kick 3']
+
+
+def test_benchmark() -> None:
+    rng = random.Random(0)
+    access_list = AccessList()
+    for _ in range(100000):
+        address = rng.getrandbits(32)
+        access_list.ips.add(address, address + rng.randrange(256))
+        access_list.hwids.add('{:011X}'.format(rng.getrandbits(44)))
+
+    lookups = [
+        '.'.join(str(rng.randrange(256)) for _ in range(4))
+        for _ in range(10000)]
+    access_list.matches('0.0.0.0', '')
+    start = time.perf_counter()
+    for ip in lookups:
+        access_list.matches(ip, '00000000000')
+    elapsed = time.perf_counter() - start
+    assert elapsed / len(lookups) < 20e-6
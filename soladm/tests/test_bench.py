@@ -0,0 +1,41 @@
+import json
+from pathlib import Path
+from soladm import bench
+
+
+# memory growth of the default seed over the session below; unlike the
+# timings it does not depend on the machine, but allocation sizes vary a bit
+# between python versions, hence the generous tolerance
+BASELINE_PATH = Path(__file__).parent / 'bench_baseline.json'
+BASELINE_TOLERANCE = 0.5
+
+
+def test_bench() -> None:
+    results = bench.run(hours=0.01, timing_seconds=20)
+    assert list(results) == list(bench.METRICS)
+    assert results['frames_per_second'] > 0
+    assert results['render_us'] > 0
+    assert results['player_stats_us'] > 0
+    assert results['log_to_ui_us'] > 0
+    assert not bench.compare(results, results)
+    baseline = json.loads(BASELINE_PATH.read_text())
+    assert not bench.compare(results, baseline, BASELINE_TOLERANCE)
+
+    # a baseline twice as fast makes every timing a regression
+    baseline = {
+        name: value * 2 if bench.METRICS[name] else value / 2
+        for name, value in results.items()}
+    regressions = bench.compare(results, baseline)
+    assert len(regressions) == sum(1 for value in results.values() if value)
+    assert regressions[0].startswith('frames_per_second: ')
+
+
+def test_compare() -> None:
+    baseline = {'frames_per_second': 100.0, 'render_us': 1000.0}
+    assert not bench.compare(
+        {'frames_per_second': 90.0, 'render_us': 1200.0}, baseline)
+    assert bench.compare(
+        {'frames_per_second': 70.0, 'render_us': 1000.0}, baseline) == [
+            'frames_per_second: 70.0 (baseline: 100.0, +30%)']
+    # metrics missing from the baseline are skipped
+    assert not bench.compare({'log_to_ui_us': 5.0}, baseline)
@@ -0,0 +1,50 @@
+import configparser
+import time
+from typing import Any, Dict
+import pytest
+from soladm import bulk
+from soladm.config import FleetConfig, ServerConfig
+from soladm.tests.util import FakeConnection, run_async
+
+
+def test_config() -> None:
+    ini = configparser.ConfigParser()
+    ini.read_string(
+        '[server.a]\nhost=a.example.com\npassword=secret\ngroups=eu, ctf\n')
+    fleet = FleetConfig()
+    fleet.read(ini)
+    assert fleet.servers['a'].password == 'secret'
+    assert fleet.servers['a'].groups == ['eu', 'ctf']
+
+    ini.read_string('[server.b]\nhost=b.example.com\n')
+    with pytest.raises(ValueError, match='Server b needs'):
+        FleetConfig().read(ini)
+
+
+def test_select_servers() -> None:
+    servers = {
+        name: ServerConfig(name, 'host', None, 'pass', groups)
+        for name, groups in [
+            ('a', ['eu', 'ctf']), ('b', ['eu']), ('c', ['us'])]
+    }
+    assert bulk.select_servers('all', servers) == ['a', 'b', 'c']
+    assert bulk.select_servers('eu', servers) == ['a', 'b']
+    assert bulk.select_servers('ctf,c', servers) == ['a', 'c']
+    assert bulk.select_servers('nothing', servers) == []
+
+
+def test_broadcast_is_concurrent() -> None:
+    connections: Dict[str, Any] = {
+        'srv{}'.format(i): FakeConnection(0.2) for i in range(20)}
+    connections['broken'] = FakeConnection(0, fail=True)
+
+    start = time.monotonic()
+    results = run_async(bulk.broadcast(
+        connections, list(connections), '/say hi',
+        timeout=2, settle_time=0.3))
+    elapsed = time.monotonic() - start
+
+    assert elapsed < 1.5
+    assert [result.lines for result in results[:-1]] == [
+        ['echo /say hi']] * 20
+    assert results[-1].error == 'Not connected.'
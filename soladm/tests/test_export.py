@@ -0,0 +1,87 @@
+import csv
+import gzip
+import json
+import time
+from pathlib import Path
+from typing import List
+import pytest
+from soladm import net
+from soladm.export import ExportSink, FORMAT_CSV
+from soladm.tests.util import make_game_info, make_player
+
+
+def test_jsonl(tmp_path: Path) -> None:
+    path = tmp_path / 'export.jsonl'
+    sink = ExportSink(
+        path, classify=lambda text: 'command' if text[0] == '/' else 'x')
+    sink.start()
+    sink.write_message('srv', '/say hi')
+    sink.write_snapshot('srv', make_game_info(
+        [make_player(id=1, name='Foo', team=net.PlayerTeam.ALPHA)],
+        map_name='ctf_Ash'))
+    sink.close()
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(records) == 2
+    assert records[0]['server'] == 'srv'
+    assert records[0]['type'] == 'message'
+    assert records[0]['class'] == 'command'
+    assert records[0]['text'] == '/say hi'
+    assert records[1]['type'] == 'refresh'
+    assert records[1]['data']['map'] == 'ctf_Ash'
+    assert records[1]['data']['players'][0]['name'] == 'Foo'
+    assert records[1]['data']['players'][0]['team'] == 'alpha'
+
+
+def test_gzipped_csv_appends(tmp_path: Path) -> None:
+    path = tmp_path / 'export.csv.gz'
+    for text in ('first', 'second'):
+        sink = ExportSink(path, FORMAT_CSV, compress=True)
+        sink.start()
+        sink.write_message('srv', text)
+        sink.close()
+
+    with gzip.open(path, 'rt', newline='') as handle:
+        rows = list(csv.DictReader(handle))
+    assert [row['text'] for row in rows] == ['first', 'second']
+    assert rows[0]['class'] == 'default'
+
+
+def test_backpressure(tmp_path: Path) -> None:
+    path = tmp_path / 'export.jsonl'
+    sink = ExportSink(path, queue_size=3)
+    # not started, so nothing drains the queue
+    for i in range(5):
+        sink.write_message('srv', str(i))
+    assert sink.dropped == 2
+    sink.start()
+    sink.close()
+    sink.start()
+    sink.write_message('srv', '5')
+    sink.close()
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [record['text'] for record in records] == ['0', '1', '2', None, '5']
+    assert records[3]['type'] == 'dropped'
+    assert records[3]['data'] == {'count': 2}
+
+
+def test_bad_format(tmp_path: Path) -> None:
+    with pytest.raises(ValueError):
+        ExportSink(tmp_path / 'export.xml', 'xml')
+
+
+def test_writer_error(tmp_path: Path) -> None:
+    errors: List[Exception] = []
+    sink = ExportSink(tmp_path / 'missing' / 'export.jsonl', queue_size=5)
+    sink.on_exception.append(errors.append)
+    sink.start()
+    for i in range(10):
+        sink.write_message('srv', str(i))
+        time.sleep(0.01)
+    start = time.monotonic()
+    sink.close()
+    assert time.monotonic() - start < 1
+    assert len(errors) == 1
+    assert isinstance(errors[0], FileNotFoundError)
+    assert sink.dropped > 0
@@ -0,0 +1,83 @@
+import random
+import time
+from pathlib import Path
+from soladm import net
+from soladm.heatmap import Grid, HeatmapTracker, LAYER_PLAYERS, SHADES
+from soladm.tests.util import make_refreshx_packet
+
+
+def test_grid_grows_without_losing_counts() -> None:
+    grid = Grid(8, 4, cell_size=1.0)
+    grid.add(0, 0)
+    grid.add(0, 0)
+    grid.add(3.5, 1.5)
+    assert grid.cell_size == 1.0
+    assert sum(grid.counts) == 3
+
+    grid.add(-100, -100)
+    grid.add(100, 50)
+    assert grid.cell_size > 1.0
+    assert sum(grid.counts) == grid.total == 5
+    # the points near the origin ended up in a single cell
+    assert max(grid.counts) == 3
+
+
+def test_grid_ignores_garbage() -> None:
+    grid = Grid(8, 4)
+    grid.add(float('nan'), 0)
+    grid.add(float('inf'), 0)
+    grid.add(0, 0)
+    grid.add(1e300, 0)
+    assert grid.total == 1
+
+
+def test_render() -> None:
+    grid = Grid(8, 4, cell_size=1.0)
+    assert grid.render(10) == []
+    for _ in range(100):
+        grid.add(-2, 0)
+    grid.add(2, 0)
+    lines = grid.render(10)
+    # cropped to the visited area
+    assert lines == [SHADES[-1] + ' ' + SHADES[1]]
+
+
+def test_pgm() -> None:
+    grid = Grid(4, 2, cell_size=1.0)
+    grid.add(0, 0)
+    assert grid.to_pgm() == (
+        b'P5\n4 2\n255\n' + bytes([0, 0, 0, 0, 0, 0, 255, 0]))
+
+
+def test_tracker(tmp_path: Path) -> None:
+    game_info = net.GameInfo()
+    game_info.update_from_refreshx_packet(make_refreshx_packet(
+        [{'name': 'Foo'}, {'name': 'Bar'}], map_name='ctf_Ash'))
+    tracker = HeatmapTracker(max_maps=1)
+    tracker.update(game_info)
+    grid = tracker.get('ctf_Ash', LAYER_PLAYERS)
+    assert grid and grid.total == 2
+    tracker.export('ctf_Ash', LAYER_PLAYERS, tmp_path / 'ash.pgm')
+    assert (tmp_path / 'ash.pgm').read_bytes().startswith(b'P5\n')
+
+    game_info.map_name = 'ctf_Laos'
+    tracker.update(game_info)
+    assert tracker.get('ctf_Ash', LAYER_PLAYERS) is None
+
+
+def test_benchmark() -> None:
+    rng = random.Random(0)
+    game_info = net.GameInfo()
+    for player in game_info._players:
+        player.team = net.PlayerTeam.ALPHA
+    tracker = HeatmapTracker()
+    refreshes = 1000
+    start = time.perf_counter()
+    for _ in range(refreshes):
+        for player in game_info._players:
+            player.pos.x = rng.uniform(-3000, 3000)
+            player.pos.y = rng.uniform(-1500, 1500)
+        tracker.update(game_info)
+    elapsed = time.perf_counter() - start
+    # includes moving the players around
+    assert elapsed / refreshes < 200e-6
@@ -0,0 +1,52 @@
+from pathlib import Path
+from typing import List
+import urwid
+from soladm import net
+from soladm.history import CommandHistory
+from soladm.ui.command_input import CommandInput
+
+
+def test_duplicates_and_cap(tmp_path: Path) -> None:
+    history = CommandHistory(tmp_path / 'history.txt', max_size=3)
+    for text in ['/kick 1', '/map Aero', '/kick 1', '/restart', '/pause']:
+        history.append(text)
+    assert [history[i] for i in range(len(history))] == [
+        '/kick 1', '/restart', '/pause']
+
+
+def test_persistence(tmp_path: Path) -> None:
+    path = tmp_path / 'history.txt'
+    history = CommandHistory(path, max_size=2)
+    for i in range(10):
+        history.append('/say {}'.format(i % 3))
+
+    history = CommandHistory(path, max_size=2)
+    assert [history[i] for i in range(len(history))] == ['/say 2', '/say 0']
+    assert len(path.read_text().splitlines()) == 2
+
+
+def test_search() -> None:
+    history = CommandHistory()
+    for text in ['/map ctf_Ash', '/kick 3', '/map ctf_Laos', '/say hi']:
+        history.append(text)
+
+    matches = history.search('ctf')
+    assert [history.get(seq) for seq in matches] == [
+        '/map ctf_Laos', '/map ctf_Ash']
+    matches = history.search('ctf_a', matches)
+    assert [history.get(seq) for seq in matches] == ['/map ctf_Ash']
+    assert [history.get(seq) for seq in history.search('K')] == ['/kick 3']
+    assert history.search('nothing') == []
+
+
+def test_search_and_run() -> None:
+    command_input = CommandInput(net.GameInfo())
+    for text in ['/map ctf_Ash', '/kick 3']:
+        command_input._history.append(text)
+    commands: List[str] = []
+    urwid.signals.connect_signal(command_input, 'command', commands.append)
+    for key in ['ctrl r', 'a', 's', 'h', 'enter']:
+        command_input.keypress((80,), key)
+    assert commands == ['/map ctf_Ash']
+    assert command_input.edit_text == ''
+    assert command_input._history[-1] == '/map ctf_Ash'
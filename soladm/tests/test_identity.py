@@ -0,0 +1,54 @@
+import asyncio
+from pathlib import Path
+from typing import List, Tuple
+import pytest
+from soladm import identity
+from soladm.tests.util import make_player
+
+
+@pytest.fixture
+def loop() -> asyncio.AbstractEventLoop:
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    asyncio.set_event_loop(None)
+    loop.close()
+
+
+def test_identity_store(
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+        loop: asyncio.AbstractEventLoop) -> None:
+    monkeypatch.setattr(identity, 'FLUSH_INTERVAL', 0)
+    path = tmp_path / 'players.sqlite'
+
+    store = identity.IdentityStore(path)
+    store.start()
+    store.update([
+        make_player(name='Major', hwid='0123456789A', ip='1.2.3.4')])
+    store.update([
+        make_player(name='Sgt. Mac', hwid='0123456789A', ip='1.2.3.5')])
+    store.update([
+        make_player(name='Roach', hwid='0000000000B', ip='5.6.7.8')])
+    store.close()
+    assert list(store.names_starting_with('m')) == ['Major']
+
+    known: List[Tuple[str, str, List[str]]] = []
+    store = identity.IdentityStore(path)
+    store.on_known_player.append(
+        lambda *args: known.append(args))
+    store.start()
+    store.update([
+        make_player(name='Tom', hwid='0123456789A', ip='9.9.9.9')])
+    store.close()
+    loop.run_until_complete(asyncio.sleep(0))
+    assert sorted(known[0][2]) == ['Major', 'Sgt. Mac']
+
+    store.update([])
+    assert list(store.names_starting_with('')) == [
+        'Major', 'Roach', 'Sgt. Mac', 'Tom']
+    assert sorted(item.name for item in store.lookup('major')) == [
+        'Major', 'Sgt. Mac', 'Tom']
+    assert [item.name for item in store.lookup('5.6.7.8')] == ['Roach']
+    assert store.lookup('nobody') == []
+    store.close()
@@ -0,0 +1,84 @@
+from typing import List, Tuple
+from soladm.latency import LatencyTracker, PingSummary, PingWindow
+from soladm.tests.util import FakeClock, make_player
+
+
+def test_percentiles() -> None:
+    window = PingWindow(60, 6, clock=FakeClock())
+    assert window.summary() is None
+    for ping in range(1, 101):
+        window.add(ping)
+    summary = window.summary()
+    assert summary
+    assert summary.samples == 100
+    assert summary.p50 == 50
+    assert summary.p95 == 95
+    assert summary.p99 == 100
+    assert summary.jitter == 1.0
+
+
+def test_huge_pings_are_clamped() -> None:
+    window = PingWindow(60, 6, clock=FakeClock())
+    window.add(100000)
+    summary = window.summary()
+    assert summary
+    assert summary.p99 == 3000
+
+
+def test_window_slides() -> None:
+    clock = FakeClock()
+    window = PingWindow(60, 6, clock=clock)
+    for _ in range(10):
+        window.add(300)
+    clock.now += 30
+    for _ in range(10):
+        window.add(50)
+    summary = window.summary()
+    assert summary
+    assert summary.samples == 20
+    assert summary.p99 == 300
+
+    clock.now += 35
+    summary = window.summary()
+    assert summary
+    assert summary.samples == 10
+    assert summary.p99 == 50
+
+    clock.now += 1000
+    assert window.summary() is None
+
+
+def test_tracker() -> None:
+    clock = FakeClock()
+    tracker = LatencyTracker(60, 6, p95_alert=200, clock=clock)
+    alerts: List[Tuple[str, PingSummary]] = []
+    tracker.on_alert.append(
+        lambda player, summary: alerts.append((player.name, summary)))
+
+    stable = make_player(id=1, hwid='00000000001', ping=50)
+    laggy = make_player(id=2, hwid='00000000002', ping=50)
+    for i in range(20):
+        laggy.ping = 50 if i % 2 else 400
+        tracker.update([stable, laggy])
+        clock.now += 1
+
+    stable_summary = tracker.get(stable)
+    assert stable_summary
+    assert stable_summary.p95 == 50
+    assert stable_summary.jitter == 0
+    laggy_summary = tracker.get(laggy)
+    assert laggy_summary
+    assert laggy_summary.p95 == 400
+    assert laggy_summary.jitter == 350
+
+    server_summary = tracker.server.summary()
+    assert server_summary
+    assert server_summary.samples == 40
+    assert server_summary.p50 == 50
+    assert server_summary.jitter == 175
+
+    # only once per window
+    assert [name for name, _ in alerts] == ['Player2']
+
+    tracker.update([stable])
+    assert tracker.get(laggy) is None
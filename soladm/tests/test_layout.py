@@ -0,0 +1,41 @@
+import configparser
+import pytest
+from soladm import net
+from soladm.config import LayoutConfig
+from soladm.ui.ui import MainWidget
+
+
+def _read(text: str) -> LayoutConfig:
+    ini = configparser.ConfigParser()
+    ini.read_string(text)
+    layout = LayoutConfig()
+    layout.read(ini)
+    return layout
+
+
+def test_config() -> None:
+    layout = _read('[layout]\ncolumns=\n  stats + console\n  players\n')
+    assert layout.columns == [['stats', 'console'], ['players']]
+    with pytest.raises(ValueError):
+        _read('[layout]\ncolumns=stats + players\n')
+    with pytest.raises(ValueError):
+        _read('[layout]\ncolumns=console + chat\n')
+    with pytest.raises(ValueError):
+        _read('[layout]\nhidden=console\n')
+
+
+def test_lazy_panes() -> None:
+    widget = MainWidget(net.GameInfo(), hidden=['players'])
+    assert widget.stats_table
+    assert not widget.players_table
+    assert not widget.is_shown('players')
+    widget.set_shown('players', True)
+    assert widget.players_table
+    assert widget.is_shown('players')
+    widget.set_shown('stats', False)
+    assert len(widget.contents) == 2
+    with pytest.raises(ValueError):
+        widget.set_shown('console', False)
+    # the console keeps the keyboard focus
+    widget.keypress((120, 20), 'x')
+    assert widget.console.input_box.edit_text == 'x'
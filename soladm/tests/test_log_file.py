@@ -0,0 +1,115 @@
+from pathlib import Path
+import pytest
+from soladm import log_file
+from soladm.log_file import MappedLog
+from soladm.ui.log_viewer import LogViewer
+
+LINES = [
+    'Start of last log',
+    '[2024-05-01 12:00:00] first',
+    '[2024-05-01 12:30:00] second',
+    '  continued without a timestamp',
+    '[2024-05-01 13:00:00] third',
+    '[2024-05-02 09:15:00] fourth',
+]
+
+
+def _write(path: Path, lines: list, end: str = '\n') -> Path:
+    path.write_text('\n'.join(lines) + end)
+    return path
+
+
+def test_navigation(tmp_path: Path) -> None:
+    log = MappedLog(_write(tmp_path / 'log.txt', LINES))
+    offsets = [0]
+    while True:
+        offset = log.next_line(offsets[-1])
+        if offset is None:
+            break
+        offsets.append(offset)
+    assert [log.read_line(offset) for offset in offsets] == LINES
+    assert log.last_line == offsets[-1]
+    assert [log.prev_line(offset) for offset in offsets] == (
+        [None] + offsets[:-1])
+    assert log.line_start(offsets[2] + 5) == offsets[2]
+    log.close()
+
+    # same without the trailing newline
+    log = MappedLog(_write(tmp_path / 'log.txt', LINES, end=''))
+    assert log.read_line(log.last_line) == LINES[-1]
+    assert log.next_line(log.last_line) is None
+    log.close()
+
+
+def test_empty(tmp_path: Path) -> None:
+    log = MappedLog(_write(tmp_path / 'log.txt', [], end=''))
+    assert log.next_line(0) is None
+    assert log.last_line == 0
+    assert log.find_timestamp('2024') == 0
+    assert log.line_number(0) == 0
+    log.close()
+
+
+def test_line_index(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(log_file, 'INDEX_BLOCK', 64)
+    lines = ['line {}'.format(i) for i in range(100)]
+    log = MappedLog(_write(tmp_path / 'log.txt', lines))
+    assert log.read_line(log.line_offset(0)) == 'line 0'
+    assert log.read_line(log.line_offset(7)) == 'line 7'
+    assert log.read_line(log.line_offset(50)) == 'line 50'
+    # built only as far as needed
+    assert not log._index_complete
+    assert log.read_line(log.line_offset(1000)) == 'line 99'
+    for number in range(100):
+        assert log.line_number(log.line_offset(number)) == number
+    log.close()
+
+
+def test_find_timestamp(tmp_path: Path) -> None:
+    log = MappedLog(_write(tmp_path / 'log.txt', LINES))
+
+    def find(timestamp: str) -> str:
+        return log.read_line(log.find_timestamp(timestamp))
+
+    assert find('2000-01-01') == LINES[0]
+    assert find('2024-05-01 12:00:00') == LINES[0]
+    assert find('2024-05-01 12:00:01') == LINES[2]
+    assert find('2024-05-01 12:45') == LINES[3]
+    assert find('2024-05-01 13') == LINES[3]
+    assert find('2024-05-02') == LINES[5]
+    # past the end
+    assert find('2025') == LINES[5]
+    log.close()
+
+
+def test_viewer(tmp_path: Path) -> None:
+    viewer = LogViewer(_write(tmp_path / 'log.txt', LINES))
+    viewer.go_to_end()
+    assert viewer.log.read_line(viewer.walker.focus) == LINES[-1]
+    viewer.go_to_time('2024-05-01 12:30')
+    assert viewer.log.read_line(viewer.walker.focus) == LINES[2]
+    # a bare time is looked up on the day shown
+    viewer.go_to_time('12:45')
+    assert viewer.log.read_line(viewer.walker.focus) == LINES[3]
+    viewer.go_to_end()
+    viewer.go_to_time('9:00')
+    assert viewer.log.read_line(viewer.walker.focus) == LINES[5]
+    viewer.go_to_line(2)
+    assert viewer.log.read_line(viewer.walker.focus) == LINES[1]
+
+    canvas = viewer.render((60, 4), focus=True)
+    assert canvas.text[0].decode().startswith('[2024-05-01 12:00:00] first')
+    assert canvas.text[-1].decode().startswith(str(tmp_path))
+    viewer.close()
+
+
+def test_viewer_empty(tmp_path: Path) -> None:
+    viewer = LogViewer(_write(tmp_path / 'log.txt', [], end=''))
+    viewer.go_to_end()
+    viewer.go_to_time('12:00')
+    viewer.go_to_line(5)
+    for key in ('g', 'G', 'down', 'page up'):
+        viewer.keypress((200, 4), key)
+    canvas = viewer.render((200, 4), focus=True)
+    assert '(empty file)' in canvas.text[-1].decode()
+    viewer.close()
@@ -0,0 +1,65 @@
+import time
+from typing import List
+from soladm import net
+from soladm.ui.console import Console
+from soladm.ui.log_walker import LogWalker
+
+
+def _texts(walker: LogWalker) -> List[str]:
+    return [walker.get_line(i)[2] for i in range(len(walker))]
+
+
+def test_filter() -> None:
+    walker = LogWalker()
+    for text in ('Foo joined', 'Bar joined', 'Foo: hello', 'Bar: hi'):
+        walker.append('[x] ', 'default', text)
+    walker.set_filter('foo')
+    assert _texts(walker) == ['Foo joined', 'Foo: hello']
+    walker.set_filter('foo:')
+    assert _texts(walker) == ['Foo: hello']
+    walker.append('[x] ', 'default', 'Foo: bye')
+    walker.append('[x] ', 'default', 'Bar: bye')
+    assert _texts(walker) == ['Foo: hello', 'Foo: bye']
+    walker.set_focus(10)
+    assert walker.get_focus()[1] == 1
+    widget, position = walker.get_prev(1)
+    assert position == 0
+    assert widget.text == '[x] Foo: hello'
+    walker.set_filter('')
+    assert len(walker) == 6
+
+
+def test_trim() -> None:
+    walker = LogWalker(max_lines=10)
+    walker.set_filter('1')
+    for i in range(12):
+        walker.append('', 'default', str(i))
+    assert walker.line_count == 10
+    assert _texts(walker) == ['10', '11']
+    walker.set_filter('')
+    assert _texts(walker) == [str(i) for i in range(2, 12)]
+
+
+def test_large_scrollback() -> None:
+    walker = LogWalker()
+    for i in range(100000):
+        walker.append('[2020-01-01 00:00:00] ', 'default', 'line {}'.format(i))
+    start = time.perf_counter()
+    for query in ('l', 'li', 'lin', 'line 9', 'line 99', 'line 999'):
+        walker.set_filter(query)
+    assert len(walker) == 111
+    assert time.perf_counter() - start < 1
+
+
+def test_console_filter_without_matches() -> None:
+    console = Console(net.GameInfo())
+    console.append('[x] ', 'default', 'Foo joined')
+    for key in ('meta /', 'q'):
+        console.keypress((80, 10), key)
+    assert len(console.log) == 0
+    console.render((80, 10), focus=True)
+    console.append('[x] ', 'default', 'Bar joined')
+    assert len(console.log) == 0
+    console.append('[x] ', 'default', 'Quux joined')
+    assert len(console.log) == 1
+    assert console.log_box.get_focus()[1] == 0
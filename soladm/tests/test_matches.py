@@ -0,0 +1,126 @@
+from pathlib import Path
+from typing import List, Tuple
+from soladm import net
+from soladm.matches import (
+    MatchLog, MatchSummary, MatchTracker, PlayerSummary,
+    REASON_MAP_CHANGE, REASON_SCORE_RESET, REASON_TIMER_RESET)
+from soladm.tests.util import FakeClock, make_game_info, make_player
+
+
+def _make_game_info(player_count: int) -> net.GameInfo:
+    return make_game_info(
+        [
+            make_player(id=i, team=net.PlayerTeam.ALPHA)
+            for i in range(1, player_count + 1)],
+        map_name='ctf_Ash',
+        game_mode=net.GameMode.CaptureTheFlag,
+        time_limit=36000,
+        time_left=36000)
+
+
+def _make_tracker() -> Tuple[MatchTracker, FakeClock, List[MatchSummary]]:
+    clock = FakeClock(1000.0)
+    tracker = MatchTracker('server', clock=clock)
+    summaries: List[MatchSummary] = []
+    tracker.on_match_end.append(summaries.append)
+    return tracker, clock, summaries
+
+
+def test_map_change() -> None:
+    tracker, clock, summaries = _make_tracker()
+    game_info = _make_game_info(2)
+    tracker.update(game_info)
+    game_info._players[0].kills = 5
+    game_info._players[0].caps = 1
+    game_info.scores[net.PlayerTeam.ALPHA] = 1
+    clock.now += 60
+    tracker.update(game_info)
+
+    # a player who left still counts
+    game_info._players[2].name = 'Player3'
+    game_info._players[2].team = net.PlayerTeam.BRAVO
+    tracker.update(game_info)
+    game_info._players[2].team = net.PlayerTeam.UNASSIGNED
+    tracker.update(game_info)
+    assert summaries == []
+
+    clock.now += 600
+    game_info.map_name = 'ctf_Laos'
+    tracker.update(game_info)
+    assert len(summaries) == 1
+    summary = summaries[0]
+    assert summary.map_name == 'ctf_Ash'
+    assert summary.reason == REASON_MAP_CHANGE
+    assert summary.duration == 660
+    assert summary.scores == [1, 0, 0, 0]
+    assert summary.peak_players == 3
+    assert [player.name for player in summary.players] == [
+        'Player1', 'Player2', 'Player3']
+    assert summary.players[0] == PlayerSummary(
+        name='Player1', hwid='', team=1, kills=5, deaths=0, caps=1)
+
+
+def test_timer_and_score_reset() -> None:
+    tracker, clock, summaries = _make_tracker()
+    game_info = _make_game_info(2)
+    tracker.update(game_info)
+    game_info.time_left -= 6000
+    tracker.update(game_info)
+    game_info.time_left = game_info.time_limit
+    tracker.update(game_info)
+    assert [summary.reason for summary in summaries] == [REASON_TIMER_RESET]
+
+    game_info._players[0].kills = 3
+    tracker.update(game_info)
+    game_info._players[0].kills = 0
+    tracker.update(game_info)
+    assert [summary.reason for summary in summaries] == [
+        REASON_TIMER_RESET, REASON_SCORE_RESET]
+
+
+def test_player_leaving_is_not_a_reset() -> None:
+    tracker, clock, summaries = _make_tracker()
+    game_info = _make_game_info(2)
+    game_info._players[0].kills = 3
+    game_info._players[1].deaths = 3
+    tracker.update(game_info)
+    game_info._players[0].team = net.PlayerTeam.UNASSIGNED
+    tracker.update(game_info)
+    assert summaries == []
+
+
+def test_empty_matches_are_dropped() -> None:
+    tracker, clock, summaries = _make_tracker()
+    game_info = _make_game_info(0)
+    tracker.update(game_info)
+    game_info.map_name = 'ctf_Laos'
+    tracker.update(game_info)
+    assert summaries == []
+
+
+def test_log(tmp_path: Path) -> None:
+    path = tmp_path / 'matches.jsonl'
+    log = MatchLog(path, max_size=500, backups=2)
+    assert log.recent(10) == []
+    summaries = [
+        MatchSummary(
+            server='server',
+            map_name='map{}'.format(i),
+            game_mode=3,
+            started=i * 100.0,
+            ended=i * 100.0 + 60,
+            reason=REASON_MAP_CHANGE,
+            scores=[i, 0, 0, 0],
+            peak_players=1,
+            players=[PlayerSummary('Player', '0123456789A', 1, i, 0, 0)])
+        for i in range(20)]
+    for summary in summaries:
+        log.append(summary)
+
+    assert path.with_name('matches.jsonl.1').exists()
+    assert path.with_name('matches.jsonl.2').exists()
+    assert not path.with_name('matches.jsonl.3').exists()
+    assert log.recent(3) == summaries[:-4:-1]
+    recent = log.recent(100)
+    assert 3 < len(recent) < 20
+    assert recent == summaries[:-len(recent) - 1:-1]
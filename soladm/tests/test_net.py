@@ -0,0 +1,144 @@
+import asyncio
+from typing import Callable, List, Optional, Sequence, Tuple
+from soladm import net
+from soladm.tests.util import make_refreshx_packet
+
+
+class FakeServer:
+    def __init__(self, answer: bool, answer_from: int = 1) -> None:
+        self.answer = answer
+        self.answer_from = answer_from
+        self.connections = 0
+        self.lines: List[bytes] = []
+        self.events: List[str] = []
+
+    async def handle(
+            self,
+            reader: asyncio.StreamReader,
+            writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        self.events.append('accepted')
+        number = self.connections
+        await reader.readline()  # password
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            self.lines.append(line.strip())
+            if (
+                    line.strip() == b'REFRESHX' and self.answer and
+                    number >= self.answer_from):
+                writer.write(
+                    b'REFRESHX\r\n' + make_refreshx_packet([{'name': 'Foo'}]))
+                await writer.drain()
+
+
+def _run(
+        server: FakeServer,
+        seconds: float,
+        outbox: Sequence[str] = (),
+        setup: Optional[Callable[[net.Connection], None]] = None,
+        **kwargs: float) -> Tuple[net.Connection, List[str]]:
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    tcp_server = loop.run_until_complete(
+        asyncio.start_server(server.handle, '127.0.0.1', 0))
+    port = tcp_server.sockets[0].getsockname()[1]
+    connection = net.Connection('127.0.0.1', port, 'pass', **kwargs)
+    events = server.events
+    connection.on_connect.append(lambda: events.append('connect'))
+    connection.on_disconnect.append(events.append)
+    connection.on_refresh.append(lambda: events.append('refresh'))
+    connection.on_outbox_expired.append(
+        lambda texts: events.append('expired: ' + ', '.join(texts)))
+    if setup:
+        setup(connection)
+    for text in outbox:
+        loop.run_until_complete(connection.send(text))
+    loop.run_until_complete(connection.open())
+    loop.run_until_complete(asyncio.sleep(seconds))
+    loop.run_until_complete(connection.close())
+    tcp_server.close()
+    loop.run_until_complete(tcp_server.wait_closed())
+    loop.close()
+    asyncio.set_event_loop(None)
+    return connection, [event for event in events if event != 'accepted']
+
+
+def test_rtt() -> None:
+    connection, events = _run(FakeServer(answer=True), 1.5)
+    assert events[0] == 'connect'
+    assert 'refresh' in events
+    assert 'Connection timeout' not in events
+    assert connection.rtt
+    assert connection.last_rtt is not None
+    assert 0 <= connection.last_rtt < 0.5
+
+
+def test_requested_refresh() -> None:
+    def setup(connection: net.Connection) -> None:
+        def on_refresh() -> None:
+            if len(connection.rtt) == 1:
+                connection.request_refresh()
+
+        # not connected yet, so this does nothing
+        connection.request_refresh()
+        connection.on_refresh.append(on_refresh)
+
+    server = FakeServer(answer=True)
+    connection, events = _run(server, 0.5, setup=setup)
+    # every answer is matched with its own request
+    assert server.lines == [b'REFRESHX', b'REFRESHX']
+    assert len(connection.rtt) == 2
+
+
+def test_stall_forces_reconnect() -> None:
+    server = FakeServer(answer=False)
+    connection, events = _run(server, 2.5, stall_timeout=0.5)
+    assert 'Connection timeout' in events
+    assert 'refresh' not in events
+    assert server.connections >= 2
+    assert not connection.rtt
+
+
+def test_standby_handover() -> None:
+    # the first connection never answers; the second one is opened while the
+    # first one is still waiting and takes over once it's declared dead
+    server = FakeServer(answer=True, answer_from=2)
+    _connection, events = _run(server, 1.5, stall_timeout=0.6)
+    assert events[:3] == ['connect', 'Connection timeout', 'connect']
+    assert 'refresh' in events
+    assert server.connections == 2
+    # the standby connection was there before the timeout
+    assert server.events.index('Connection timeout') > [
+        i for i, event in enumerate(server.events) if event == 'accepted'][1]
+
+
+def test_outbox() -> None:
+    server = FakeServer(answer=True)
+    _connection, events = _run(server, 0.5, outbox=['/say hi'])
+    assert server.lines[:2] == [b'REFRESHX', b'/say hi']
+    assert 'refresh' in events
+
+    server = FakeServer(answer=True)
+    _connection, events = _run(
+        server, 0.5, outbox=['/say hi'], outbox_ttl=-1)
+    assert b'/say hi' not in server.lines
+    assert 'expired: /say hi' in events
+
+
+def test_unchanged_fields_reuse_strings() -> None:
+    players = [
+        {'name': 'Foo', 'hwid': '0123456789A', 'ip': '1.2.3.4'},
+        {'name': 'Bar'},
+    ]
+    first = net.GameInfo()
+    first.update_from_refreshx_packet(make_refreshx_packet(players))
+    second = net.GameInfo()
+    second.update_from_refreshx_packet(make_refreshx_packet(players))
+    for player1, player2 in zip(first.players, second.players):
+        assert player1.name is player2.name
+        assert player1.hwid is player2.hwid
+        assert player1.ip is player2.ip
+    assert first.map_name is second.map_name
+    assert first.players[0].ip == '1.2.3.4'
@@ -0,0 +1,56 @@
+from typing import Optional
+import pytest
+from soladm import net, parser
+
+
+@pytest.mark.parametrize('line,expected', [
+    ('', None),
+    ('Some random text', None),
+    (
+        '(1) Major killed (2) Sgt. Mac with Desert Eagles',
+        parser.Kill(1, 'Major', 2, 'Sgt. Mac', 'Desert Eagles'),
+    ),
+    ('(3) no kill here', None),
+    (
+        '1.2.3.4:23073|0123456789A requesting game...',
+        parser.JoinRequest('1.2.3.4', 23073, '0123456789A'),
+    ),
+    ('Major Tom joining game', parser.Joining('Major Tom')),
+    (
+        'Major Tom joining game (1.2.3.4:23073) HWID:[0123456789A]',
+        parser.Joining('Major Tom'),
+    ),
+    (
+        'Major Tom has joined bravo team.',
+        parser.Join('Major Tom', net.PlayerTeam.BRAVO),
+    ),
+    (
+        'Major has joined as spectator.',
+        parser.Join('Major', net.PlayerTeam.SPECTATOR),
+    ),
+    (
+        'Major has left alpha team',
+        parser.Leave('Major', net.PlayerTeam.ALPHA),
+    ),
+    (
+        'Major has left spectators',
+        parser.Leave('Major', net.PlayerTeam.SPECTATOR),
+    ),
+    ('Major captured the red flag', parser.FlagGrab('Major', 'red')),
+    ('Major got the yellow flag', parser.FlagGrab('Major', 'yellow')),
+    ('Major returned the blue flag', parser.FlagReturn('Major', 'blue')),
+    (
+        'Major scores for alpha team',
+        parser.FlagCapture('Major', net.PlayerTeam.ALPHA),
+    ),
+    ('Major added to Game Admins', parser.AdminAdded('Major')),
+    ('[Major] hello there', parser.Chat('Major', 'hello there', 'all')),
+    ('(TEAM)[Major] go go', parser.Chat('Major', 'go go', 'team')),
+    ('(RADIO)[Major] Cover me', parser.Chat('Major', 'Cover me', 'radio')),
+    ('Time Left: 5 minutes', parser.TimeLeft(5)),
+    ('Next map: ctf_Ash', parser.NextMap('ctf_Ash')),
+])
+def test_parse(line: str, expected: Optional[parser.GameEvent]) -> None:
+    game_event = parser.parse(line)
+    assert type(game_event) is type(expected)
+    assert game_event == expected
@@ -0,0 +1,60 @@
+import asyncio
+from typing import Any, List, Tuple
+from soladm import net, parser
+from soladm.pipeline import DecodePipeline
+from soladm.tests.util import make_refreshx_packet
+
+
+def test_snapshot_roundtrip() -> None:
+    game_info = net.GameInfo()
+    game_info.update_from_refreshx_packet(make_refreshx_packet(
+        [{'name': 'Major', 'hwid': '0123456789A', 'ping': 40}],
+        scores=[3, 1, 0, 0]))
+    copy = net.GameInfo()
+    copy.apply_snapshot(game_info.to_snapshot())
+    assert copy.to_snapshot() == game_info.to_snapshot()
+    assert copy.players[0].name == 'Major'
+    assert copy.scores[net.PlayerTeam.ALPHA] == 3
+
+
+def test_pipeline() -> None:
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    pipeline = DecodePipeline(workers=2, batch_interval=0.001)
+    received: List[Tuple[str, Any]] = []
+    connections = [net.Connection('host', port, 'pass') for port in (1, 2)]
+    for connection in connections:
+        pipeline.register(connection)
+
+        def on_refresh(connection: net.Connection = connection) -> None:
+            received.append((
+                'refresh', connection.game_info.players[0].name))
+
+        connection.on_message.append(
+            lambda line: received.append(('message', line)))
+        connection.on_event.append(
+            lambda game_event: received.append(('event', game_event)))
+        connection.on_refresh.append(on_refresh)
+
+    async def feed() -> None:
+        pipeline.submit_message(connections[0], b'Major has joined alpha team')
+        pipeline.submit_refreshx(
+            connections[1], make_refreshx_packet([{'name': 'Roach'}]))
+        pipeline.flush()
+        pipeline.submit_message(connections[1], b'Hello')
+        while len(received) < 4:
+            await asyncio.sleep(0.01)
+
+    try:
+        loop.run_until_complete(asyncio.wait_for(feed(), 10))
+    finally:
+        pipeline.close()
+        asyncio.set_event_loop(None)
+        loop.close()
+
+    assert received == [
+        ('message', 'Major has joined alpha team'),
+        ('event', parser.Join('Major', net.PlayerTeam.ALPHA)),
+        ('refresh', 'Roach'),
+        ('message', 'Hello'),
+    ]
@@ -0,0 +1,126 @@
+import asyncio
+import json
+from pathlib import Path
+from typing import Any, Dict
+from soladm.remote import RemoteServer
+from soladm.tests.util import FakeConnection, run_async
+
+
+class Client:
+    def __init__(
+            self,
+            reader: asyncio.StreamReader,
+            writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+
+    async def request(self, **request: Any) -> Dict[str, Any]:
+        self.writer.write((json.dumps(request) + '\n').encode())
+        return await self.receive()
+
+    async def receive(self) -> Dict[str, Any]:
+        line = await asyncio.wait_for(self.reader.readline(), 1)
+        return json.loads(line)
+
+    async def close(self) -> None:
+        self.writer.close()
+        await self.writer.wait_closed()
+        # let the server notice
+        await asyncio.sleep(0.05)
+
+
+def test_commands_and_subscriptions(tmp_path: Path) -> None:
+    connections: Dict[str, Any] = {
+        'a': FakeConnection(), 'b': FakeConnection()}
+    path = str(tmp_path / 'soladm.sock')
+
+    async def scenario() -> None:
+        server = RemoteServer(connections)
+        await server.start('unix:' + path)
+        client1 = Client(*await asyncio.open_unix_connection(path))
+        client2 = Client(*await asyncio.open_unix_connection(path))
+
+        assert await client1.request(op='servers') == {
+            'type': 'servers', 'servers': {'a': 'connected', 'b': 'connected'}}
+        assert await client1.request(
+            op='send', server='b', text='/say hi') == {'type': 'ok'}
+        assert connections['b'].sent == ['/say hi']
+        reply = await client1.request(op='send', text='/say hi')
+        assert reply['type'] == 'error'
+
+        assert (await client1.request(
+            op='subscribe', topics=['messages']))['type'] == 'ok'
+        assert (await client2.request(op='subscribe'))['type'] == 'ok'
+        connections['a'].on_refresh()
+        connections['a'].on_message('hello')
+        assert await client1.receive() == {
+            'type': 'message', 'server': 'a', 'text': 'hello'}
+        refresh = await client2.receive()
+        assert refresh['type'] == 'refresh'
+        assert refresh['data']['map'] == ''
+        assert (await client2.receive())['text'] == 'hello'
+
+        await client1.close()
+        await client2.close()
+        await server.close()
+        assert not Path(path).exists()
+
+    run_async(scenario())
+
+
+def test_token_and_slow_clients(tmp_path: Path) -> None:
+    connections: Dict[str, Any] = {'a': FakeConnection()}
+    path = str(tmp_path / 'soladm.sock')
+
+    async def scenario() -> None:
+        server = RemoteServer(connections, token='secret', queue_size=2)
+        await server.start('unix:' + path)
+        client = Client(*await asyncio.open_unix_connection(path))
+        assert (await client.request(op='servers'))['type'] == 'error'
+        assert (await client.request(op='auth', token='nope'))['type'] == (
+            'error')
+        assert await client.request(op='auth', token='secret') == {
+            'type': 'ok'}
+        assert await client.request(op='subscribe', topics=['messages']) == {
+            'type': 'ok'}
+
+        # nothing gets to run in between, so the queue overflows
+        for i in range(5):
+            connections['a'].on_message(str(i))
+        assert (await client.receive())['text'] == '0'
+        assert (await client.receive())['text'] == '1'
+        connections['a'].on_message('5')
+        assert await client.receive() == {'type': 'dropped', 'count': 3}
+        assert (await client.receive())['text'] == '5'
+
+        # replies get through even with the queue full
+        async def flood(text: str) -> None:
+            for i in range(5):
+                connections['a'].on_message(str(i))
+
+        connections['a'].write = flood
+        reply = await client.request(op='send', text='/say hi')
+        while reply['type'] == 'message':
+            reply = await client.receive()
+        assert reply == {'type': 'ok'}
+        await client.close()
+        await server.close()
+
+    run_async(scenario())
+
+
+def test_close_with_clients(tmp_path: Path) -> None:
+    path = str(tmp_path / 'soladm.sock')
+
+    async def scenario() -> None:
+        server = RemoteServer({'a': FakeConnection()})
+        await server.start('unix:' + path)
+        client = Client(*await asyncio.open_unix_connection(path))
+        assert (await client.request(op='subscribe'))['type'] == 'ok'
+        await server.close()
+        assert not server._subscribers
+        assert await client.reader.readline() == b''
+        assert not Path(path).exists()
+        await client.close()
+
+    run_async(scenario())
@@ -0,0 +1,159 @@
+import configparser
+import re
+import time
+from typing import List, Tuple
+import pytest
+from soladm import net
+from soladm.config import RulesConfig
+from soladm.rules import Rule, RuleTrigger, RuleEngine
+from soladm.tests.util import FakeClock, make_game_info, make_player
+
+
+def _make_game_info(pings: List[int]) -> net.GameInfo:
+    return make_game_info([
+        make_player(
+            id=i, hwid='{:011X}'.format(i), team=net.PlayerTeam.ALPHA,
+            ping=ping)
+        for i, ping in enumerate(pings, 1)])
+
+
+def _make_engine(
+        rules: List[Rule]) -> Tuple[RuleEngine, FakeClock, List[str]]:
+    clock = FakeClock()
+    engine = RuleEngine(rules, clock=clock)
+    actions: List[str] = []
+    engine.on_action.append(lambda rule, command: actions.append(command))
+    return engine, clock, actions
+
+
+def test_message_rule_with_cooldown() -> None:
+    engine, clock, actions = _make_engine([
+        Rule(
+            'admin', RuleTrigger.MESSAGE, '/say {1}: on my way',
+            cooldown=10, pattern=re.compile(r'^\[(.+)\] !admin$')),
+    ])
+    engine.process_message('[Major] hello')
+    engine.process_message('[Major] !admin')
+    engine.process_message('[Major] !admin')
+    clock.now = 11
+    engine.process_message('[Major] !admin')
+    assert actions == ['/say Major: on my way', '/say Major: on my way']
+
+
+def test_first_matching_rule() -> None:
+    engine, _clock, actions = _make_engine([
+        Rule(
+            'kick', RuleTrigger.MESSAGE, '/kick {1}',
+            pattern=re.compile(r'^\[(.+)\] !kick (.+)$', re.I)),
+        Rule(
+            'help', RuleTrigger.MESSAGE, '/say {1}: {2}?',
+            pattern=re.compile(r'^\[(.+)\] !(\w+)', re.I)),
+        Rule(
+            'any', RuleTrigger.MESSAGE, '/say {0}',
+            pattern=re.compile(r'^\[.+\] !', re.I)),
+    ])
+    engine.process_message('[Major] !help')
+    engine.process_message('[Major] !kick Mac')
+    assert actions == ['/say Major: help?', '/kick Major']
+
+
+def test_player_rule() -> None:
+    engine, _clock, actions = _make_engine([
+        Rule(
+            'hwid', RuleTrigger.PLAYER, '/kick {id}',
+            pattern=re.compile('^00000000002$'), field='hwid'),
+    ])
+    engine.process_refresh(_make_game_info([50, 50, 50]))
+    assert actions == ['/kick 2']
+
+
+def test_ping_rule() -> None:
+    engine, _clock, actions = _make_engine([
+        Rule(
+            'ping', RuleTrigger.PING, '/say {name}: {ping}',
+            cooldown=0, threshold=300, refreshes=2),
+    ])
+    engine.process_refresh(_make_game_info([400, 50]))
+    engine.process_refresh(_make_game_info([50, 400]))
+    assert actions == []
+    engine.process_refresh(_make_game_info([50, 500]))
+    assert actions == ['/say Player2: 500']
+
+
+def test_score_difference_rule() -> None:
+    engine, _clock, actions = _make_engine([
+        Rule(
+            'balance', RuleTrigger.SCORE_DIFFERENCE, '/balance',
+            threshold=3),
+    ])
+    game_info = _make_game_info([])
+    game_info.game_mode = net.GameMode.CaptureTheFlag
+    game_info.scores[net.PlayerTeam.ALPHA] = 5
+    game_info.scores[net.PlayerTeam.BRAVO] = 2
+    engine.process_refresh(game_info)
+    assert actions == []
+    game_info.scores[net.PlayerTeam.ALPHA] = 6
+    engine.process_refresh(game_info)
+    assert actions == ['/balance']
+
+
+def test_config_errors() -> None:
+    for text in (
+            '[rule.a]\naction=/say hi\nregex=.*\n',
+            '[rule.a]\ntrigger=sometimes\naction=/say hi\n'):
+        ini = configparser.ConfigParser()
+        ini.read_string(text)
+        with pytest.raises(ValueError, match='Rule rule.a needs a trigger'):
+            RulesConfig().read(ini)
+
+
+def test_benchmark_hundreds_of_rules() -> None:
+    rules: List[Rule] = []
+    for i in range(200):
+        rules.append(Rule(
+            'message{}'.format(i), RuleTrigger.MESSAGE, '/say {0}',
+            pattern=re.compile(r'^\[(.+)\] !word{}$'.format(i), re.I)))
+    for i in range(100):
+        rules.append(Rule(
+            'hwid{}'.format(i), RuleTrigger.PLAYER, '/kick {id}',
+            pattern=re.compile('^F{:010X}$'.format(i), re.I), field='hwid'))
+    for i in range(50):
+        rules.append(Rule(
+            'ping{}'.format(i), RuleTrigger.PING, '/say {name}',
+            threshold=300 + i * 10, refreshes=5))
+    engine, _clock, actions = _make_engine(rules)
+
+    lines = [
+        '(1) Major killed (2) Sgt. Mac with Desert Eagles',
+        '[Major] hello there',
+        'Major has joined alpha team',
+        'Time Left: 5 minutes',
+    ]
+    iterations = 5000
+    start = time.perf_counter()
+    for i in range(iterations):
+        engine.process_message(lines[i % len(lines)])
+    per_message = (time.perf_counter() - start) / iterations
+    assert actions == []
+
+    # lines that get past the combined regex are matched rule by rule
+    lines = ['[Major] !word{}'.format(i) for i in range(0, 200, 7)]
+    start = time.perf_counter()
+    for i in range(iterations):
+        engine.process_message(lines[i % len(lines)])
+    per_matching_message = (time.perf_counter() - start) / iterations
+    assert len(actions) == len(lines)
+    actions.clear()
+
+    game_info = _make_game_info([50 + i for i in range(net.MAX_PLAYERS)])
+    iterations = 500
+    start = time.perf_counter()
+    for i in range(iterations):
+        engine.process_refresh(game_info)
+    per_player = (
+        (time.perf_counter() - start) / iterations / net.MAX_PLAYERS)
+
+    assert actions == []
+    assert per_message < 100e-6
+    assert per_matching_message < 100e-6
+    assert per_player < 100e-6
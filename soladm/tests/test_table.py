@@ -0,0 +1,34 @@
+from soladm.ui import common
+
+
+def test_pack_is_cached_until_width_changes() -> None:
+    table = common.Table(column_count=2)
+    name = common.Cell('Map')
+    value = common.Cell('ctf_Ash')
+    table.add_rows([[common.Cell('Server'), common.Cell('x')], [name, value]])
+    assert table.pack((80,)) == (15, 2)
+
+    column = table.contents[1][0]
+    layout = column._layout
+    assert layout is not None
+    value.set_text('ctf_Kampf')
+    assert column._layout is None
+    assert table.pack((80,)) == (17, 2)
+
+    layout = column._layout
+    value.set_text('ctf_Lakes')
+    value.set_text('ctf_Lakes')
+    assert column._layout is layout
+    assert table.pack((80,)) == (17, 2)
+
+    table.clear_rows()
+    assert table.pack((80,)) == (2, 0)
+
+
+def test_unchanged_text_keeps_canvas() -> None:
+    cell = common.Cell('foo')
+    canvas = cell.render((10,))
+    cell.set_text('foo')
+    assert cell.render((10,)) is canvas
+    cell.set_text(('alpha', 'foo'))
+    assert cell.render((10,)) is not canvas
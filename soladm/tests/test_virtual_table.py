@@ -0,0 +1,78 @@
+from typing import List, NamedTuple
+from soladm.ui.virtual_table import Column, VirtualTable
+
+
+class Item(NamedTuple):
+    name: str
+    ping: int
+
+
+def _make_table() -> VirtualTable:
+    return VirtualTable(
+        [
+            Column('Name', lambda item: item.name),
+            Column('Ping', lambda item: item.ping, min_width=4),
+        ],
+        key=lambda item: item.name,
+        selectable=True)
+
+
+def _lines(table: VirtualTable, *size: int) -> List[str]:
+    return [
+        line.decode().rstrip() for line in table.render(size, True).text]
+
+
+def test_sorting_and_widths() -> None:
+    table = _make_table()
+    table.set_items([Item('foo', 30), Item('barbaz', 10), Item('qux', 20)])
+    assert table.widths == [6, 5]
+    assert _lines(table, 20) == [
+        'Name▲   Ping',
+        'barbaz  10',
+        'foo     30',
+        'qux     20',
+    ]
+
+    table.set_sort(1)
+    assert [item.name for item in table.visible_items] == [
+        'barbaz', 'qux', 'foo']
+    table.set_sort(1)
+    assert [item.name for item in table.visible_items] == [
+        'foo', 'qux', 'barbaz']
+    assert _lines(table, 20)[0] == 'Name    Ping▼'
+
+    table.set_items([Item('a', 1), Item('qux', 20)])
+    assert table.widths == [5, 5]
+    assert table.pack((80,)) == (12, 3)
+
+
+def test_only_visible_rows_are_rendered() -> None:
+    table = _make_table()
+    table.set_items([Item('{:04}'.format(i), i) for i in range(5000)])
+    assert _lines(table, 20, 4) == [
+        'Name▲  Ping', '0000   0', '0001   1', '0002   2']
+    assert table.keypress((20, 4), 'end') is None
+    assert table.focused_item.name == '4999'
+    assert _lines(table, 20, 4)[1:] == [
+        '4997   4997', '4998   4998', '4999   4999']
+    assert sum(row.widget is not None for row in table._rows.values()) == 6
+
+
+def test_updates_and_filter() -> None:
+    table = _make_table()
+    items = [Item('foo', 30), Item('bar', 10)]
+    table.set_items(items)
+    table.set_sort(1)
+    assert not table.update_item(Item('foo', 30))
+    assert table.update_item(Item('foo', 5))
+    # not resorted until rebuilt
+    assert table.visible_items[0].name == 'bar'
+    table.rebuild()
+    assert table.visible_items[0].name == 'foo'
+
+    table.set_filter('name:ba')
+    assert [item.name for item in table.visible_items] == ['bar']
+    table.set_filter('5')
+    assert [item.name for item in table.visible_items] == ['foo']
+    table.set_filter('')
+    assert len(table.visible_items) == 2
@@ -0,0 +1,109 @@
+import asyncio
+import struct
+from typing import Any, Dict, List, Optional, Sequence
+from soladm import event, net
+
+
+class FakeClock:
+    def __init__(self, now: float = 0.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeConnection:
+    # enough of net.Connection for the add-ons: commands written to it are
+    # recorded and, if there's a delay, echoed back as a console message
+    def __init__(
+            self, delay: Optional[float] = None, fail: bool = False) -> None:
+        self.game_info = net.GameInfo()
+        self.state = net.ConnectionState.CONNECTED
+        self.on_message = event.EventHandler()
+        self.on_refresh = event.EventHandler()
+        self.sent: List[str] = []
+        self.delay = delay
+        self.fail = fail
+
+    async def write(self, text: str) -> None:
+        if self.fail:
+            raise RuntimeError('Not connected.')
+        self.sent.append(text)
+        if self.delay is not None:
+            asyncio.get_event_loop().call_later(
+                self.delay, self.on_message, 'echo ' + text)
+
+
+def make_player(**fields: Any) -> net.PlayerInfo:
+    # players with an id are named after it unless given a name
+    player = net.PlayerInfo()
+    if 'id' in fields:
+        player.name = 'Player{}'.format(fields['id'])
+    for name, value in fields.items():
+        assert hasattr(player, name), name
+        setattr(player, name, value)
+    return player
+
+
+def make_game_info(
+        players: Sequence[net.PlayerInfo] = (),
+        **fields: Any) -> net.GameInfo:
+    # the players take the first slots, the rest stay empty
+    game_info = net.GameInfo()
+    for name, value in fields.items():
+        assert hasattr(game_info, name), name
+        setattr(game_info, name, value)
+    for player in game_info._players:
+        player.team = net.PlayerTeam.UNASSIGNED
+    game_info._players[:len(players)] = players
+    return game_info
+
+
+def run_async(coroutine: Any) -> Any:
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def _var_str(text: str, size: int) -> bytes:
+    data = text.encode('utf-8')
+    return bytes([len(data)]) + data.ljust(size, b'\0')
+
+
+def make_refreshx_packet(
+        players: List[Dict],
+        map_name: str = 'ctf_Ash',
+        next_map_name: str = 'ctf_Laos',
+        game_mode: net.GameMode = net.GameMode.CaptureTheFlag,
+        scores: Optional[List[int]] = None,
+        time_limit: int = 36000,
+        time_left: int = 18000) -> bytes:
+    slots = players + [
+        {'team': net.PlayerTeam.UNASSIGNED}
+    ] * (net.MAX_PLAYERS - len(players))
+    data = b''
+    data += b''.join(_var_str(slot.get('name', ''), 24) for slot in slots)
+    data += b''.join(_var_str(slot.get('hwid', ''), 11) for slot in slots)
+    data += bytes(
+        int(slot.get('team', net.PlayerTeam.ALPHA)) for slot in slots)
+    data += b''.join(struct.pack('<H', slot.get('kills', 0)) for slot in slots)
+    data += bytes(slot.get('caps', 0) for slot in slots)
+    data += b''.join(
+        struct.pack('<H', slot.get('deaths', 0)) for slot in slots)
+    data += b''.join(struct.pack('<i', slot.get('ping', 0)) for slot in slots)
+    data += bytes(slot.get('id', i + 1) for i, slot in enumerate(slots))
+    data += b''.join(
+        bytes(int(octet) for octet in slot.get('ip', '0.0.0.0').split('.'))
+        for slot in slots)
+    data += b''.join(struct.pack('<f', slot.get('x', 0)) for slot in slots)
+    data += b''.join(struct.pack('<f', slot.get('y', 0)) for slot in slots)
+    data += struct.pack('<ffff', 0, 0, 0, 0)
+    data += struct.pack('<HHHH', *(scores or [0, 0, 0, 0]))
+    data += _var_str(map_name, 16)
+    data += struct.pack(
+        '<iiHBBBB', time_limit, time_left, 10, game_mode, 32, 5, 0)
+    data += _var_str(next_map_name, 16)
+    assert len(data) == 1992
+    return data
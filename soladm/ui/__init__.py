@@ -1 +1,3 @@
 from soladm.ui.ui import run
+from soladm.ui.fleet import run_fleet
+from soladm.ui.log_viewer import run_viewer
@@ -1,9 +1,16 @@
 import re
-from typing import Tuple, List, Iterable
+from typing import Tuple, Callable, List, Iterable, Set
 from soladm import net
 from soladm.config import config
 
 
+NameLookup = Callable[[str], Iterable[str]]
+
+
+def no_names(prefix: str) -> Iterable[str]:
+    return []
+
+
 def get_affixes(
         edit_text: str,
         edit_pos: int) -> List[Tuple[str, str, str]]:
@@ -21,20 +28,34 @@ def get_affixes(
     return list(reversed(ret))
 
 
+def collect_names(
+        players: Iterable[net.PlayerInfo],
+        infix: str,
+        name_lookup: NameLookup = no_names) -> Iterable[str]:
+    seen: Set[str] = set()
+    for player in players:
+        if player.name.lower().startswith(infix.lower()):
+            seen.add(player.name)
+            yield player.name
+    for name in name_lookup(infix):
+        if name not in seen:
+            seen.add(name)
+            yield name
+
+
 def collect_commands(
         players: Iterable[net.PlayerInfo],
-        affixes: Iterable[Tuple[str, str, str]]) -> Iterable[str]:
+        affixes: Iterable[Tuple[str, str, str]],
+        name_lookup: NameLookup = no_names) -> Iterable[str]:
     for prefix, infix, suffix in affixes:
         if not infix:
             continue
 
-        for player in players:
-            if prefix == '' and \
-                    player.name.lower().startswith(infix.lower()):
-                yield '/say {}: {}'.format(player.name, suffix)
-            if prefix != '' and \
-                    player.name.lower().startswith(infix.lower()):
-                yield prefix + player.name + suffix
+        for name in collect_names(players, infix, name_lookup):
+            if prefix == '':
+                yield '/say {}: {}'.format(name, suffix)
+            else:
+                yield prefix + name + suffix
 
         if not prefix:
             for command in config.autocomplete.server_commands:
@@ -55,14 +76,13 @@ def collect_commands(
 
 def collect_chat(
         players: Iterable[net.PlayerInfo],
-        affixes: Iterable[Tuple[str, str, str]]) -> Iterable[str]:
+        affixes: Iterable[Tuple[str, str, str]],
+        name_lookup: NameLookup = no_names) -> Iterable[str]:
     for prefix, infix, suffix in affixes:
         if not infix:
             continue
-        for player in players:
-            if prefix == '' and \
-                    player.name.lower().startswith(infix.lower()):
-                yield '{}: {}'.format(player.name, suffix)
-            if prefix != '' and \
-                    player.name.lower().startswith(infix.lower()):
-                yield prefix + player.name + suffix
+        for name in collect_names(players, infix, name_lookup):
+            if prefix == '':
+                yield '{}: {}'.format(name, suffix)
+            else:
+                yield prefix + name + suffix
@@ -1,29 +1,53 @@
 from typing import Optional, Tuple, List, Iterable
+from pathlib import Path
 import enum
 import urwid
 import urwid_readline
 from soladm import net
+from soladm.config import config
+from soladm.history import CommandHistory
 from soladm.ui import autocomplete
 
 
 class CommandInputMode(enum.Enum):
     COMMAND = 1
     CHAT = 2
+    FILTER = 3
 
 
 class CommandInput(urwid_readline.ReadlineEdit):
-    signals = ['command', 'chat']
+    signals = ['command', 'chat', 'filter']
 
-    def __init__(self, game_info: net.GameInfo) -> None:
+    def __init__(
+            self,
+            game_info: net.GameInfo,
+            name_lookup: autocomplete.NameLookup = autocomplete.no_names
+    ) -> None:
         super().__init__(wrap=urwid.CLIP)
+        self._search_query: Optional[str] = None
+        self._search_matches: List[int] = []
+        self._search_idx = 0
+        self._search_original_text = ''
+        self._stashed_text = ''
         self._mode = CommandInputMode.COMMAND
         self._game_info = game_info
-        self._history_idx = -1
-        self._history: List[str] = []
+        self._name_lookup = name_lookup
+        self._history_idx: Optional[int] = None
+        self._history = CommandHistory(
+            Path(config.history.path) if config.history.path else None,
+            config.history.max_size)
         self._autocomplete_idx = -1
         self._autocomplete_suggestions: List[str] = []
 
     def keypress(self, size: Tuple[int, int], key: str) -> Optional[str]:
+        if key == 'meta /':
+            self._switch_mode(CommandInputMode.FILTER)
+            return None
+        if self._mode == CommandInputMode.FILTER:
+            return self._filter_keypress(size, key)
+        if self._search_query is not None:
+            if self._search_keypress(key):
+                return None
         if key == 'enter':
             self._accept()
         elif key == 'ctrl p' or key == 'up':
@@ -32,6 +56,8 @@ class CommandInput(urwid_readline.ReadlineEdit):
             self._history_down()
         elif key == 'ctrl q':
             raise KeyboardInterrupt()
+        elif key == 'ctrl r':
+            self._search_start()
         elif key == 'ctrl x':
             self._cycle_mode()
         elif key == 'tab':
@@ -50,15 +76,54 @@ class CommandInput(urwid_readline.ReadlineEdit):
     @_mode.setter
     def _mode(self, mode: CommandInputMode) -> None:
         self.__mode = mode
-        if mode == CommandInputMode.COMMAND:
+        self._update_caption()
+
+    def _update_caption(self) -> None:
+        if self._search_query is not None:
+            self.set_caption(
+                '(reverse-i-search)`{}\': '.format(self._search_query))
+        elif self._mode == CommandInputMode.COMMAND:
             self.set_caption('Command: ')
-        elif mode == CommandInputMode.CHAT:
+        elif self._mode == CommandInputMode.CHAT:
             self.set_caption('Chat: ')
+        elif self._mode == CommandInputMode.FILTER:
+            self.set_caption('Filter: ')
 
     def _cycle_mode(self) -> None:
         modes = list(CommandInputMode)
         idx = modes.index(self._mode)
-        self._mode = modes[(idx + 1) % len(modes)]
+        self._switch_mode(modes[(idx + 1) % len(modes)])
+
+    def _switch_mode(self, mode: CommandInputMode) -> None:
+        # the filter query and the command being typed are kept separately
+        filter_mode = CommandInputMode.FILTER
+        if (mode == filter_mode) != (self._mode == filter_mode):
+            text = self.edit_text
+            self.set_edit_text(self._stashed_text)
+            self.set_edit_pos(len(self.edit_text))
+            self._stashed_text = text
+        self._mode = mode
+
+    def _filter_keypress(
+            self, size: Tuple[int, int], key: str) -> Optional[str]:
+        if key in ('esc', 'ctrl g'):
+            self.set_edit_text('')
+            urwid.signals.emit_signal(self, 'filter', '')
+            self._switch_mode(CommandInputMode.COMMAND)
+        elif key == 'enter':
+            # keeps the filter while going back to typing commands
+            self._switch_mode(CommandInputMode.COMMAND)
+        elif key == 'ctrl x':
+            self._cycle_mode()
+        elif key == 'ctrl q':
+            raise KeyboardInterrupt()
+        else:
+            text = self.edit_text
+            ret = super().keypress(size, key)
+            if self.edit_text != text:
+                urwid.signals.emit_signal(self, 'filter', self.edit_text)
+            return ret
+        return None
 
     def _cycle_autocomplete(self, delta: int) -> None:
         if not self._autocomplete_suggestions:
@@ -78,10 +143,14 @@ class CommandInput(urwid_readline.ReadlineEdit):
     def _collect_autocomplete(self) -> Iterable[str]:
         if self._mode == CommandInputMode.COMMAND:
             return autocomplete.collect_commands(
-                self._game_info.players, self._get_affixes())
+                self._game_info.players,
+                self._get_affixes(),
+                self._name_lookup)
         else:
             return autocomplete.collect_chat(
-                self._game_info.players, self._get_affixes())
+                self._game_info.players,
+                self._get_affixes(),
+                self._name_lookup)
 
     def _history_up(self) -> None:
         self._history_go(-1)
@@ -90,6 +159,8 @@ class CommandInput(urwid_readline.ReadlineEdit):
         self._history_go(1)
 
     def _history_go(self, delta: int) -> None:
+        if self._history_idx is None:
+            self._history_idx = len(self._history)
         self._history_idx += delta
         if self._history_idx not in range(len(self._history)):
             self.set_edit_text('')
@@ -101,6 +172,60 @@ class CommandInput(urwid_readline.ReadlineEdit):
         if self._history_idx > len(self._history):
             self._history_idx = len(self._history)
 
+    def _search_start(self) -> None:
+        self._search_query = ''
+        self._search_matches = []
+        self._search_idx = 0
+        self._search_original_text = self.edit_text
+        self._update_caption()
+
+    def _search_stop(self, restore: bool) -> None:
+        self._search_query = None
+        self._update_caption()
+        if restore:
+            self.set_edit_text(self._search_original_text)
+        self.set_edit_pos(len(self.edit_text))
+
+    def _search_keypress(self, key: str) -> bool:
+        assert self._search_query is not None
+        if key == 'ctrl r':
+            if self._search_idx + 1 < len(self._search_matches):
+                self._search_idx += 1
+                self._search_show()
+        elif key in ('esc', 'ctrl g'):
+            self._search_stop(restore=True)
+        elif key == 'backspace':
+            self._search_update(self._search_query[:-1])
+        elif len(key) == 1 and key.isprintable():
+            self._search_update(self._search_query + key)
+        else:
+            # accept the match and let the key do its usual thing, so that
+            # enter runs it right away like in bash
+            self._search_stop(restore=False)
+            return False
+        return True
+
+    def _search_update(self, query: str) -> None:
+        # extending the query can only narrow down the previous matches
+        candidates = (
+            self._search_matches
+            if self._search_query and query.startswith(self._search_query)
+            else None)
+        self._search_query = query
+        self._search_matches = (
+            self._history.search(query, candidates) if query else [])
+        self._search_idx = 0
+        self._update_caption()
+        self._search_show()
+
+    def _search_show(self) -> None:
+        if self._search_matches:
+            self.set_edit_text(
+                self._history.get(self._search_matches[self._search_idx]))
+        else:
+            self.set_edit_text('')
+        self.set_edit_pos(len(self.edit_text))
+
     def _accept(self) -> None:
         text = self.edit_text.strip()
         if not text:
@@ -1,5 +1,6 @@
-from typing import Optional, Tuple, Sequence, List
+from typing import Any, Optional, Tuple, Sequence, List
 import urwid
+from urwid.util import calc_width
 from soladm import net
 
 
@@ -13,6 +14,10 @@ def format_time(seconds: int) -> str:
 
 
 def format_team_name(player: net.PlayerInfo) -> str:
+    return format_team(player.team)
+
+
+def format_team(team: net.PlayerTeam) -> str:
     return ({
         net.PlayerTeam.NONE:      'none',
         net.PlayerTeam.ALPHA:     'alpha',
@@ -20,22 +25,90 @@ def format_team_name(player: net.PlayerInfo) -> str:
         net.PlayerTeam.CHARLIE:   'charlie',
         net.PlayerTeam.DELTA:     'delta',
         net.PlayerTeam.SPECTATOR: 'spectator',
-    }[player.team])
+    }[team])
+
+
+def format_game_mode(game_mode: net.GameMode) -> str:
+    return ({
+        net.GameMode.DeathMatch:     'DM',
+        net.GameMode.PointMatch:     'PM',
+        net.GameMode.TeamMatch:      'TM',
+        net.GameMode.CaptureTheFlag: 'CTF',
+        net.GameMode.RamboMatch:     'RM',
+        net.GameMode.Infiltration:   'INF',
+        net.GameMode.HoldTheFlag:    'HTF',
+    }[game_mode])
 
 
 def format_player_score(player: net.PlayerInfo) -> str:
+    return format_score(player.kills, player.deaths, player.caps)
+
+
+def format_score(kills: int, deaths: int, caps: int) -> str:
     fmt = '{kills}/{deaths}'
-    if player.caps:
+    if caps:
         fmt += ' (+{caps} caps)'
-    return fmt.format(
-        kills=player.kills, deaths=player.deaths, caps=player.caps)
+    return fmt.format(kills=kills, deaths=deaths, caps=caps)
+
+
+def _text_width(text: str) -> int:
+    return max(calc_width(line, 0, len(line)) for line in text.split('\n'))
+
+
+class Cell(urwid.Text):
+    # skips redundant updates so that unchanged cells keep their cached
+    # canvases, and lets the column know only when its width might change
+    def __init__(self, markup: Any = '') -> None:
+        self._markup: Any = None
+        self.width = 0
+        self.column: Optional['TableColumn'] = None
+        super().__init__(markup)
+
+    def set_text(self, markup: Any) -> None:
+        if markup == self._markup:
+            return
+        self._markup = markup
+        super().set_text(markup)
+        width = _text_width(self.text)
+        if width != self.width:
+            self.width = width
+            if self.column:
+                self.column.invalidate_layout()
 
 
 class TableColumn(urwid.Pile):
+    def __init__(self, widget_list: List[Any], focus_item: Any = None) -> None:
+        self._layout: Optional[Tuple[Optional[int], bool, Size]] = None
+        super().__init__(widget_list, focus_item)
+
+    def invalidate_layout(self) -> None:
+        self._layout = None
+
+    def _contents_modified(self) -> None:
+        self._layout = None
+        for widget, _options in self.contents:
+            if isinstance(widget, Cell):
+                widget.column = self
+        super()._contents_modified()
+
     def pack(self, size: Size, focus: bool = False) -> Size:
+        # a column of cells only needs measuring again after one of them
+        # changed width; anything else is measured every time
         maxcol = size[0]
-        limit = max([i[0].pack((maxcol,), focus)[0] for i in self.contents])
-        return (min(limit, maxcol), len(self.contents))
+        if self._layout and self._layout[0:2] == (maxcol, focus):
+            return self._layout[2]
+        limit = 0
+        cached = True
+        for widget, _options in self.contents:
+            if isinstance(widget, Cell):
+                limit = max(limit, widget.width)
+            else:
+                limit = max(limit, widget.pack((maxcol,), focus)[0])
+                cached = False
+        result = (min(limit, maxcol), len(self.contents))
+        if cached:
+            self._layout = (maxcol, focus, result)
+        return result
 
 
 class Table(urwid.Columns):
@@ -57,12 +130,12 @@ class Table(urwid.Columns):
                 (widget, (urwid.PACK, None)))
 
     def pack(self, size: Size, focus: bool = False) -> Size:
-        maxcol = size[0]
-        width = (
-            sum(item[0].pack(size, focus)[0] for item in self.contents)
-            + self.dividechars * (len(self.contents) - 1))
-        height = sum(
-            item[0].pack(size, focus)[1] for item in self.contents)
+        width = self.dividechars * (len(self.contents) - 1)
+        height = 0
+        for item in self.contents:
+            column_width, column_height = item[0].pack(size, focus)
+            width += column_width
+            height = max(height, column_height)
         return (width, height)
 
 
@@ -78,7 +151,12 @@ class ExtendedListBox(urwid.ListBox):
         return ret
 
     def scroll_to_bottom(self) -> None:
-        self.set_focus(len(self.body) - 1)
+        if len(self.body):
+            self.set_focus(len(self.body) - 1)
+        else:
+            # nothing to focus; this also drops a focus change that is still
+            # pending from before the list box became empty (e.g. filtered)
+            self.set_focus_valign(urwid.BOTTOM)
         self.auto_scroll = True
 
 
@@ -87,3 +165,9 @@ class PackedLineBox(urwid.LineBox):
         width, height = self.original_widget.pack(size, focus)
         width2, _ = self.title_widget.pack((size[0],), focus)
         return (max(width, width2) + 2, height + 2)
+
+
+class PassiveOverlay(urwid.Overlay):
+    # overlay that leaves the keyboard input to the widget underneath
+    def keypress(self, size: Size, key: str) -> Optional[str]:
+        return self.bottom_w.keypress(size, key)
@@ -1,19 +1,37 @@
 from typing import Optional
 import urwid
 from soladm import net
-from soladm.ui import common
+from soladm.ui import autocomplete, common
 from soladm.ui.command_input import CommandInput
+from soladm.log_file import DEFAULT_SCROLLBACK
+from soladm.ui.log_walker import LogWalker
 
 
 class Console(urwid.Pile):
-    def __init__(self, game_info: net.GameInfo) -> None:
-        self.log_box = common.ExtendedListBox(urwid.SimpleListWalker([]))
-        self.input_box = CommandInput(game_info)
+    def __init__(
+            self,
+            game_info: net.GameInfo,
+            name_lookup: autocomplete.NameLookup = autocomplete.no_names,
+            scrollback: int = DEFAULT_SCROLLBACK) -> None:
+        self.log = LogWalker(scrollback)
+        self.log_box = common.ExtendedListBox(self.log)
+        self.input_box = CommandInput(game_info, name_lookup)
+        urwid.signals.connect_signal(
+            self.input_box, 'filter', self._on_filter)
         super().__init__([self.log_box, (urwid.PACK, self.input_box)])
 
+    def append(self, prefix: str, text_class: str, text: str) -> None:
+        self.log.append(prefix, text_class, text)
+        if self.log_box.auto_scroll:
+            self.log_box.scroll_to_bottom()
+
+    def _on_filter(self, text: str) -> None:
+        self.log.set_filter(text)
+        self.log_box.scroll_to_bottom()
+
     def keypress(self, size: common.Size, key: str) -> Optional[str]:
         if key == 'ctrl l':
-            self.log_box.body.clear()
+            self.log.clear()
             return None
         if key in ('page up', 'page down'):
             return self.log_box.keypress(
@@ -0,0 +1,313 @@
+import asyncio
+import time
+from typing import (
+    Any, Awaitable, Callable, Optional, Dict, Iterable, List, Tuple)
+import urwid
+from soladm import bulk, event, net
+from soladm.config import config
+from soladm.ui import common
+from soladm.ui.ui import MainLoop
+from soladm.ui.virtual_table import Column, VirtualTable
+
+
+TICK_INTERVAL = 1
+
+_TEAM_MODES = (
+    net.GameMode.TeamMatch,
+    net.GameMode.CaptureTheFlag,
+    net.GameMode.Infiltration,
+    net.GameMode.HoldTheFlag,
+)
+
+
+def _format_age(seconds: float) -> str:
+    if seconds == float('inf'):
+        return '-'
+    if seconds < 60:
+        return '{}s'.format(int(seconds))
+    if seconds < 3600:
+        return '{}m'.format(int(seconds // 60))
+    return '{}h'.format(int(seconds // 3600))
+
+
+def _average_ping(row: 'FleetRow') -> int:
+    players = row.game_info.players
+    if not players:
+        return 0
+    return sum(player.ping for player in players) // len(players)
+
+
+def _scores(row: 'FleetRow') -> Tuple[int, int]:
+    if row.game_info.game_mode not in _TEAM_MODES:
+        return (-1, -1)
+    return (
+        row.game_info.scores[net.PlayerTeam.ALPHA],
+        row.game_info.scores[net.PlayerTeam.BRAVO])
+
+
+COLUMNS = [
+    Column('Server', lambda row: row.name, width=16),
+    Column(
+        'Map',
+        lambda row: row.game_info.map_name if row.connected else '',
+        lambda value: value or '(offline)',
+        width=16),
+    Column(
+        'Mode',
+        lambda row: row.game_info.game_mode,
+        common.format_game_mode,
+        width=6),
+    Column(
+        'Players',
+        lambda row: (len(row.game_info.players), row.game_info.max_players),
+        lambda value: '{}/{}'.format(*value),
+        width=9),
+    Column(
+        'Left',
+        lambda row: row.game_info.time_left // 60,
+        common.format_time,
+        width=7),
+    Column(
+        'Scores',
+        _scores,
+        lambda value: '{}:{}'.format(*value) if value[0] >= 0 else '-',
+        width=9),
+    Column('Ping', _average_ping, width=6),
+    Column(
+        'RTT',
+        lambda row: (
+            row.connection.last_rtt
+            if row.connected and row.connection.last_rtt is not None
+            else float('inf')),
+        lambda value: '-' if value == float('inf') else str(
+            int(value * 1000)),
+        width=6),
+    Column('Last msg', lambda row: row.message_age, _format_age, width=10),
+]
+
+
+class FleetRow:
+    def __init__(self, name: str, connection: net.Connection) -> None:
+        self.name = name
+        self.connection = connection
+        self.game_info = connection.game_info
+        self.connected = False
+        self.last_message: Optional[float] = None
+
+    @property
+    def message_age(self) -> float:
+        if self.last_message is None:
+            return float('inf')
+        return time.monotonic() - self.last_message
+
+
+class FleetWidget(urwid.Frame):
+    signals = ['command']
+
+    def __init__(self, connections: Dict[str, net.Connection]) -> None:
+        self.rows = [
+            FleetRow(name, connection)
+            for name, connection in connections.items()]
+        self.table = VirtualTable(
+            COLUMNS,
+            key=lambda row: row.name,
+            selectable=True,
+            focus_attr='fleet_focus',
+            header_attr='timestamp',
+            numbered=True)
+        self.table.set_items(self.rows)
+        self._filter_edit = urwid.Edit('Filter: ')
+        self._command_edit = urwid.Edit('Command: ')
+        self._status = urwid.Text('', wrap=urwid.CLIP)
+        urwid.signals.connect_signal(
+            self._filter_edit, 'change', self._on_filter_change)
+        self._summary_box = urwid.ListBox(urwid.SimpleListWalker([]))
+        super().__init__(
+            self.table,
+            footer=urwid.Pile([
+                self._filter_edit,
+                self._command_edit,
+                urwid.AttrMap(self._status, 'timestamp'),
+            ]))
+        self._resort = False
+
+    @property
+    def selected_row(self) -> Optional[FleetRow]:
+        return self.table.focused_item
+
+    def show_summary(self, lines: List[str]) -> None:
+        self._summary_box.body[:] = [urwid.Text(line) for line in lines]
+        self.body = self._summary_box
+        self.focus_position = 'body'
+
+    def show_status(self, text: str) -> None:
+        self._status.set_text(text)
+
+    def keypress(self, size: common.Size, key: str) -> Optional[str]:
+        if key in ('ctrl q', 'ctrl c'):
+            raise KeyboardInterrupt()
+        if self.focus_position == 'footer':
+            return self._footer_keypress(size, key)
+        if key == '/':
+            self.focus_position = 'footer'
+            self.footer.focus_position = 0
+            return None
+        if key == ':':
+            self.focus_position = 'footer'
+            self.footer.focus_position = 1
+            return None
+        if key == 'esc' and self.body is self._summary_box:
+            self.body = self.table
+            return None
+        if key == 's' and self._summary_box.body:
+            self.body = self._summary_box
+            return None
+        if key.isdigit() and 1 <= int(key) <= len(COLUMNS):
+            self.table.set_sort(int(key) - 1)
+            return None
+        return super().keypress(size, key)
+
+    def _footer_keypress(self, size: common.Size, key: str) -> Optional[str]:
+        if key == 'esc':
+            self.focus_position = 'body'
+            return None
+        if key == 'enter':
+            self.focus_position = 'body'
+            if self.footer.focus is self._command_edit:
+                text = self._command_edit.edit_text.strip()
+                self._command_edit.set_edit_text('')
+                if text:
+                    urwid.signals.emit_signal(self, 'command', text)
+            return None
+        return super().keypress(size, key)
+
+    def update_row(self, row: FleetRow) -> None:
+        if self.table.update_item(row):
+            self._resort = True
+
+    def tick(self) -> None:
+        # the message age changes every second for every server; resorting
+        # is deferred to here so that a burst of refreshes costs one sort
+        for row in self.rows:
+            self.update_row(row)
+        if self._resort:
+            self._resort = False
+            self.table.rebuild()
+
+    def _on_filter_change(self, _edit: urwid.Edit, text: str) -> None:
+        self.table.set_filter(text)
+
+
+class FleetUi:
+    def __init__(self, connections: Dict[str, net.Connection]) -> None:
+        self._connections = connections
+        self._widget = FleetWidget(connections)
+        for row in self._widget.rows:
+            self._attach(row)
+        urwid.signals.connect_signal(self._widget, 'command', self._command)
+        self._loop = MainLoop(
+            self._widget, event_loop=urwid.AsyncioEventLoop())
+        self._load_palette()
+
+    def _load_palette(self) -> None:
+        palette = [
+            tuple([key] + list(value))
+            for key, value in config.ui.colors.items()
+        ]
+        self._loop.screen.set_terminal_properties(256)
+        self._loop.screen.register_palette(palette)
+
+    def _attach(self, row: FleetRow) -> None:
+        def on_connect() -> None:
+            row.connected = True
+            self._widget.update_row(row)
+
+        def on_disconnect(reason: str) -> None:
+            row.connected = False
+            self._widget.update_row(row)
+
+        def on_message(message: str) -> None:
+            row.last_message = time.monotonic()
+
+        def on_refresh() -> None:
+            self._widget.update_row(row)
+
+        row.connection.on_connect.append(on_connect)
+        row.connection.on_disconnect.append(on_disconnect)
+        row.connection.on_message.append(on_message)
+        row.connection.on_refresh.append(on_refresh)
+        row.connection.on_exception.append(
+            lambda exception: self.report_exception(exception, row.name))
+
+    def report_exception(
+            self, exception: Exception, name: Optional[str] = None) -> None:
+        self._widget.show_status('{}Exception: {} ({})'.format(
+            name + ': ' if name else '', type(exception), exception))
+
+    def _command(self, text: str) -> None:
+        # "TARGET /command" where TARGET is a list of servers or groups;
+        # without a target the command goes to the selected server only
+        if text.startswith('/'):
+            row = self._widget.selected_row
+            names = [row.name] if row else []
+            command = text
+        else:
+            target, _, command = text.partition(' ')
+            names = bulk.select_servers(target, config.fleet.servers)
+            names = [name for name in names if name in self._connections]
+        if not names or not command:
+            self._widget.show_summary(['No servers selected.'])
+            return
+        self._widget.show_summary([
+            '{} -> {} server(s)...'.format(command, len(names))])
+        asyncio.ensure_future(self._broadcast(names, command))
+
+    async def _broadcast(self, names: List[str], command: str) -> None:
+        start = time.monotonic()
+        results = await bulk.broadcast(self._connections, names, command)
+        failed = [result for result in results if result.error]
+        lines = ['{} -> {} server(s), {} failed, took {:.2f}s'.format(
+            command, len(results), len(failed), time.monotonic() - start)]
+        for result in results:
+            if result.error:
+                lines.append('{}: error: {}'.format(result.name, result.error))
+            else:
+                lines.append('{}: ok ({} ms)'.format(
+                    result.name, int(result.elapsed * 1000)))
+            lines += ['    ' + line for line in result.lines]
+        self._widget.show_summary(lines)
+
+    def start(self) -> None:
+        self._loop.start()
+        self._tick()
+
+    def stop(self) -> None:
+        self._loop.stop()
+
+    def _tick(self, *_args: Any) -> None:
+        self._widget.tick()
+        self._loop.set_alarm_in(TICK_INTERVAL, self._tick)
+
+
+def run_fleet(
+        connections: Dict[str, net.Connection],
+        shutdown: Iterable[Callable[[], Awaitable[None]]] = (),
+        on_exception: Optional[event.EventHandler] = None) -> None:
+    # on_exception is for errors that don't belong to any one server
+    ui = FleetUi(connections)
+    if on_exception:
+        on_exception.append(ui.report_exception)
+    ui.start()
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(asyncio.gather(
+        *(connection.open() for connection in connections.values())))
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    loop.run_until_complete(asyncio.gather(
+        *(connection.close() for connection in connections.values())))
+    ui.stop()
+    for func in shutdown:
+        loop.run_until_complete(func())
+    loop.close()
@@ -1,59 +1,74 @@
 from typing import Optional, Sequence, List
 import urwid
 from soladm import net
+from soladm.latency import LatencyTracker
 from soladm.ui import common
 
 
 class GameStats(common.Table):
-    def __init__(self) -> None:
+    def __init__(self, show_latency: bool = False) -> None:
         super().__init__(column_count=2)
 
         self._shown_game_mode: Optional[net.GameMode] = None
 
-        self.server = urwid.Text('')
-        self.game_mode = urwid.Text('')
-        self.current_map_name = urwid.Text('')
-        self.next_map_name = urwid.Text('')
-        self.player_count = urwid.Text('')
-        self.time = urwid.Text('')
-        self.max_score = urwid.Text('')
-        self.team_scores_header = urwid.Text('')
+        self.server = common.Cell('')
+        self.game_mode = common.Cell('')
+        self.current_map_name = common.Cell('')
+        self.next_map_name = common.Cell('')
+        self.player_count = common.Cell('')
+        self.time = common.Cell('')
+        self.latency = common.Cell('')
+        self.rtt = common.Cell('')
+        self.max_score = common.Cell('')
+        self.team_scores_header = common.Cell('')
         self.team_scores = {
-            net.PlayerTeam.ALPHA:   urwid.Text(''),
-            net.PlayerTeam.BRAVO:   urwid.Text(''),
-            net.PlayerTeam.CHARLIE: urwid.Text(''),
-            net.PlayerTeam.DELTA:   urwid.Text(''),
+            net.PlayerTeam.ALPHA:   common.Cell(''),
+            net.PlayerTeam.BRAVO:   common.Cell(''),
+            net.PlayerTeam.CHARLIE: common.Cell(''),
+            net.PlayerTeam.DELTA:   common.Cell(''),
         }
 
         basic_rows: List[Sequence[urwid.Widget]] = [
-            [urwid.Text('Server'), self.server],
-            [urwid.Text(''), urwid.Text('')],
-            [urwid.Text('Game mode'), self.game_mode],
-            [urwid.Text('Map'), self.current_map_name],
-            [urwid.Text('Next map'), self.next_map_name],
-            [urwid.Text('Players'), self.player_count],
-            [urwid.Text('Time'), self.time],
+            [common.Cell('Server'), self.server],
+            [common.Cell('RTT'), self.rtt],
+            [common.Cell(''), common.Cell('')],
+            [common.Cell('Game mode'), self.game_mode],
+            [common.Cell('Map'), self.current_map_name],
+            [common.Cell('Next map'), self.next_map_name],
+            [common.Cell('Players'), self.player_count],
+            [common.Cell('Time'), self.time],
         ]
+        if show_latency:
+            basic_rows.append([common.Cell('Ping'), self.latency])
         self.add_rows(basic_rows)
 
         self._no_teams_rows = basic_rows + [
-            [urwid.Text('Max score'), self.max_score],
+            [common.Cell('Max score'), self.max_score],
         ]
         self._two_teams_rows = basic_rows + [
-            [urwid.Text(''), urwid.Text('')],
-            [urwid.Text('Scores'), self.team_scores_header],
-            [urwid.Text('Alpha'), self.team_scores[net.PlayerTeam.ALPHA]],
-            [urwid.Text('Bravo'), self.team_scores[net.PlayerTeam.BRAVO]],
+            [common.Cell(''), common.Cell('')],
+            [common.Cell('Scores'), self.team_scores_header],
+            [common.Cell('Alpha'), self.team_scores[net.PlayerTeam.ALPHA]],
+            [common.Cell('Bravo'), self.team_scores[net.PlayerTeam.BRAVO]],
         ]
         self._four_teams_rows = self._two_teams_rows + [
-            [urwid.Text('Charlie'), self.team_scores[net.PlayerTeam.CHARLIE]],
-            [urwid.Text('Delta'), self.team_scores[net.PlayerTeam.DELTA]],
+            [common.Cell('Charlie'), self.team_scores[net.PlayerTeam.CHARLIE]],
+            [common.Cell('Delta'), self.team_scores[net.PlayerTeam.DELTA]],
         ]
 
-    def update(self, connection: net.Connection) -> None:
+    def update(
+            self,
+            connection: net.Connection,
+            latency: Optional[LatencyTracker] = None) -> None:
         game_info = connection.game_info
 
         self.server.set_text('{}:{}'.format(connection.host, connection.port))
+        self.rtt.set_text(
+            '{:.0f} ms (avg: {:.0f} ms, max: {:.0f} ms)'.format(
+                connection.rtt[-1] * 1000,
+                sum(connection.rtt) / len(connection.rtt) * 1000,
+                max(connection.rtt) * 1000)
+            if connection.rtt else '-')
 
         if self._shown_game_mode != game_info.game_mode:
             self._shown_game_mode = game_info.game_mode
@@ -68,15 +83,7 @@ class GameStats(common.Table):
                 net.GameMode.HoldTheFlag:    self._two_teams_rows,
             }[game_info.game_mode])
 
-        self.game_mode.set_text({
-            net.GameMode.DeathMatch:     'DM',
-            net.GameMode.PointMatch:     'PM',
-            net.GameMode.TeamMatch:      'TM',
-            net.GameMode.CaptureTheFlag: 'CTF',
-            net.GameMode.RamboMatch:     'RM',
-            net.GameMode.Infiltration:   'INF',
-            net.GameMode.HoldTheFlag:    'HTF',
-        }[game_info.game_mode])
+        self.game_mode.set_text(common.format_game_mode(game_info.game_mode))
         self.current_map_name.set_text(game_info.map_name)
         self.next_map_name.set_text(game_info.next_map_name)
         self.player_count.set_text(
@@ -94,6 +101,11 @@ class GameStats(common.Table):
                 common.format_time(game_info.time_elapsed // 60),
                 common.format_time(game_info.time_limit // 60),
                 common.format_time(game_info.time_left // 60)))
+        summary = latency.server.summary() if latency else None
+        self.latency.set_text(
+            '{} / {} / {} ms (jitter: {} ms)'.format(
+                summary.p50, summary.p95, summary.p99, summary.get('jitter'))
+            if summary else '-')
         self.team_scores_header.set_text(
             '(max: {})'.format(game_info.score_limit))
         for team in (
@@ -0,0 +1,13 @@
+from typing import Optional
+import urwid
+from soladm.heatmap import Grid
+
+
+class HeatmapView(urwid.Text):
+    def __init__(self, columns: int) -> None:
+        super().__init__('')
+        self.columns = columns
+
+    def update(self, grid: Optional[Grid]) -> None:
+        lines = grid.render(self.columns) if grid else []
+        self.set_text('\n'.join(lines) if lines else 'No data yet')
@@ -0,0 +1,203 @@
+import re
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+import urwid
+from soladm.config import config
+from soladm.log_file import MappedLog, TIMESTAMP_LENGTH
+from soladm.ui import common
+from soladm.ui.log_walker import WIDGET_CACHE_SIZE
+
+
+Classifier = Callable[[str], str]
+
+_TIME_RE = re.compile(r'^(\d{1,2})(:\d{2}(:\d{2})?)?$')
+
+
+def _default_class(text: str) -> str:
+    return 'default'
+
+
+class MappedLogWalker(urwid.ListWalker):
+    # the positions are byte offsets of the lines in the file
+    def __init__(
+            self,
+            log: MappedLog,
+            classify: Classifier = _default_class) -> None:
+        self.log = log
+        self._classify = classify
+        self._focus = 0
+        self._widgets: Dict[int, urwid.Widget] = {}
+
+    @property
+    def focus(self) -> int:
+        return self._focus
+
+    def get_focus(self) -> Tuple[Optional[urwid.Widget], Optional[int]]:
+        return self._get(self._focus)
+
+    def set_focus(self, position: int) -> None:
+        self._focus = self.log.line_start(position)
+        self._modified()
+
+    def get_next(
+            self,
+            position: int) -> Tuple[Optional[urwid.Widget], Optional[int]]:
+        next_position = self.log.next_line(position)
+        if next_position is None:
+            return (None, None)
+        return self._get(next_position)
+
+    def get_prev(
+            self,
+            position: int) -> Tuple[Optional[urwid.Widget], Optional[int]]:
+        prev_position = self.log.prev_line(position)
+        if prev_position is None:
+            return (None, None)
+        return self._get(prev_position)
+
+    def _get(
+            self,
+            position: int) -> Tuple[Optional[urwid.Widget], Optional[int]]:
+        if not self.log.size:
+            return (None, None)
+        widget = self._widgets.get(position)
+        if widget is None:
+            if len(self._widgets) >= WIDGET_CACHE_SIZE:
+                self._widgets.clear()
+            line = self.log.read_line(position)
+            prefix, text = '', line
+            if line.startswith('[') and '] ' in line:
+                prefix, text = line.split('] ', 1)
+                prefix += '] '
+            widget = urwid.Text(
+                [('timestamp', prefix), (self._classify(text), text)])
+            self._widgets[position] = widget
+        return (widget, position)
+
+
+class LogViewer(urwid.Frame):
+    # read-only pager over a log file: t jumps to a time, : to a line
+    signals = ['close']
+
+    def __init__(
+            self,
+            path: Path,
+            classify: Classifier = _default_class) -> None:
+        self.log = MappedLog(path)
+        self.walker = MappedLogWalker(self.log, classify)
+        self._list_box = urwid.ListBox(self.walker)
+        self._status = urwid.Text('', wrap=urwid.CLIP)
+        self._prompt = urwid.Edit()
+        self._prompt_action: Optional[Callable[[str], None]] = None
+        super().__init__(
+            self._list_box,
+            footer=urwid.AttrMap(self._status, 'timestamp'))
+        self._update_status()
+
+    def close(self) -> None:
+        self.log.close()
+
+    def go_to_line(self, number: int) -> None:
+        self._go_to(self.log.line_offset(max(0, number - 1)))
+
+    def go_to_time(self, text: str) -> None:
+        # a bare time is looked up on the day currently shown
+        match = _TIME_RE.match(text)
+        if match:
+            text = match.group(1).zfill(2) + (match.group(2) or '')
+            line = self.log.read_line(
+                self.log.line_start(self.walker.focus))
+            if len(line) >= TIMESTAMP_LENGTH:
+                text = line[1:11] + ' ' + text
+        self._go_to(self.log.find_timestamp(text))
+
+    def go_to_end(self) -> None:
+        self._go_to(self.log.last_line)
+
+    def keypress(self, size: common.Size, key: str) -> Optional[str]:
+        if self.focus_position == 'footer':
+            return self._prompt_keypress(size, key)
+        if key in ('q', 'esc'):
+            urwid.signals.emit_signal(self, 'close')
+            return None
+        if key in ('home', 'g'):
+            self._go_to(0)
+            return None
+        if key in ('end', 'G'):
+            self.go_to_end()
+            return None
+        if key == 't':
+            self._ask(
+                'Go to time (YYYY-mm-dd HH:MM:SS or a prefix): ',
+                self.go_to_time)
+            return None
+        if key == ':':
+            self._ask('Go to line: ', self._go_to_line_text)
+            return None
+        ret = super().keypress(size, key)
+        self._update_status()
+        return ret
+
+    def _go_to_line_text(self, text: str) -> None:
+        if text.isdigit():
+            self.go_to_line(int(text))
+
+    def _go_to(self, offset: int) -> None:
+        # an empty file has no lines to focus
+        if self.log.size:
+            self._list_box.set_focus(offset)
+            self._list_box.set_focus_valign(urwid.TOP)
+        self._update_status()
+
+    def _ask(self, caption: str, action: Callable[[str], None]) -> None:
+        self._prompt.set_caption(caption)
+        self._prompt.set_edit_text('')
+        self._prompt_action = action
+        self.footer = self._prompt
+        self.focus_position = 'footer'
+
+    def _prompt_keypress(
+            self, size: common.Size, key: str) -> Optional[str]:
+        if key not in ('enter', 'esc'):
+            return super().keypress(size, key)
+        text = self._prompt.edit_text.strip()
+        action = self._prompt_action
+        self._prompt_action = None
+        self.footer = urwid.AttrMap(self._status, 'timestamp')
+        self.focus_position = 'body'
+        if key == 'enter' and text and action:
+            action(text)
+        return None
+
+    def _update_status(self) -> None:
+        if self.log.size:
+            position = '{}%'.format(100 * self.walker.focus // self.log.size)
+        else:
+            position = '(empty file)'
+        self._status.set_text(
+            '{}  {}  (q: close, t: go to time, :: go to line)'.format(
+                self.log.path, position))
+
+
+def run_viewer(path: Path) -> None:
+    def on_close() -> None:
+        raise urwid.ExitMainLoop()
+
+    def on_unhandled_input(key: str) -> None:
+        if key in ('ctrl q', 'ctrl c'):
+            raise urwid.ExitMainLoop()
+
+    viewer = LogViewer(path, config.ui.classify)
+    urwid.signals.connect_signal(viewer, 'close', on_close)
+    viewer.go_to_end()
+    loop = urwid.MainLoop(viewer, unhandled_input=on_unhandled_input)
+    loop.screen.set_terminal_properties(256)
+    loop.screen.register_palette([
+        tuple([key] + list(value)) for key, value in config.ui.colors.items()
+    ])
+    try:
+        loop.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        viewer.close()
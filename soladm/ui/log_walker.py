@@ -0,0 +1,133 @@
+from typing import Dict, List, Optional, Tuple
+import urwid
+from soladm.log_file import DEFAULT_SCROLLBACK
+
+
+WIDGET_CACHE_SIZE = 500
+
+
+class LogWalker(urwid.ListWalker):
+    # scrollback kept as plain strings rather than widgets; text widgets are
+    # only made for the lines that are on screen. with a filter set, the
+    # positions index the list of matching lines instead of all of them.
+    def __init__(self, max_lines: int = DEFAULT_SCROLLBACK) -> None:
+        self.max_lines = max_lines
+        self._prefixes: List[str] = []
+        self._classes: List[str] = []
+        self._texts: List[str] = []
+        self._matches: Optional[List[int]] = None
+        self._query = ''
+        self._focus = 0
+        self._widgets: Dict[int, urwid.Widget] = {}
+
+    @property
+    def query(self) -> str:
+        return self._query
+
+    @property
+    def line_count(self) -> int:
+        return len(self._texts)
+
+    def __len__(self) -> int:
+        if self._matches is not None:
+            return len(self._matches)
+        return len(self._texts)
+
+    def append(self, prefix: str, text_class: str, text: str) -> None:
+        index = len(self._texts)
+        self._prefixes.append(prefix)
+        self._classes.append(text_class)
+        self._texts.append(text)
+        visible = self._matches is None or self._query in text.lower()
+        if self._matches is not None and visible:
+            self._matches.append(index)
+        # trimmed in chunks, since it moves every line
+        if len(self._texts) > self.max_lines + self.max_lines // 10:
+            self._trim(len(self._texts) - self.max_lines)
+            visible = True
+        if visible:
+            self._modified()
+
+    def clear(self) -> None:
+        self._prefixes.clear()
+        self._classes.clear()
+        self._texts.clear()
+        if self._matches is not None:
+            self._matches = []
+        self._widgets.clear()
+        self._focus = 0
+        self._modified()
+
+    def set_filter(self, query: str) -> None:
+        query = query.lower()
+        if query == self._query:
+            return
+        if not query:
+            self._matches = None
+        elif self._matches is not None and self._query in query:
+            # a longer query can only match a subset of the previous lines
+            self._matches = [
+                i for i in self._matches if query in self._texts[i].lower()]
+        else:
+            self._matches = [
+                i for i, text in enumerate(self._texts)
+                if query in text.lower()]
+        self._query = query
+        self._focus = max(0, len(self) - 1)
+        self._modified()
+
+    def get_line(self, position: int) -> Tuple[str, str, str]:
+        index = self._index(position)
+        return (
+            self._prefixes[index], self._classes[index], self._texts[index])
+
+    def get_focus(self) -> Tuple[Optional[urwid.Widget], Optional[int]]:
+        return self._get(self._focus)
+
+    def set_focus(self, position: int) -> None:
+        self._focus = max(0, min(position, len(self) - 1))
+        self._modified()
+
+    def get_next(
+            self,
+            position: int) -> Tuple[Optional[urwid.Widget], Optional[int]]:
+        return self._get(position + 1)
+
+    def get_prev(
+            self,
+            position: int) -> Tuple[Optional[urwid.Widget], Optional[int]]:
+        return self._get(position - 1)
+
+    def _get(
+            self,
+            position: int) -> Tuple[Optional[urwid.Widget], Optional[int]]:
+        if position < 0 or position >= len(self):
+            return (None, None)
+        index = self._index(position)
+        widget = self._widgets.get(index)
+        if widget is None:
+            if len(self._widgets) >= WIDGET_CACHE_SIZE:
+                self._widgets.clear()
+            widget = urwid.Text([
+                ('timestamp', self._prefixes[index]),
+                (self._classes[index], self._texts[index])])
+            self._widgets[index] = widget
+        return (widget, position)
+
+    def _index(self, position: int) -> int:
+        if self._matches is not None:
+            return self._matches[position]
+        return position
+
+    def _trim(self, count: int) -> None:
+        del self._prefixes[:count]
+        del self._classes[:count]
+        del self._texts[:count]
+        if self._matches is not None:
+            old_length = len(self._matches)
+            self._matches = [i - count for i in self._matches if i >= count]
+            self._focus -= old_length - len(self._matches)
+        else:
+            self._focus -= count
+        self._focus = max(0, self._focus)
+        self._widgets.clear()
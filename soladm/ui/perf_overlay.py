@@ -0,0 +1,39 @@
+from typing import Dict, List
+from soladm.profiling import StageStats
+from soladm.ui import common
+
+
+def _format_ms(seconds: float) -> str:
+    return '{:.3f}'.format(seconds * 1000)
+
+
+class PerfOverlay(common.Table):
+    def __init__(self) -> None:
+        super().__init__(column_count=5)
+        self._header_row = [
+            common.Cell('Stage'),
+            common.Cell('Count'),
+            common.Cell('Last ms'),
+            common.Cell('Avg ms'),
+            common.Cell('Max ms'),
+        ]
+        self._rows: Dict[str, List[common.Cell]] = {}
+        self.add_row(self._header_row)
+
+    def update(self, stats: Dict[str, StageStats]) -> None:
+        # rows are only rebuilt when a new stage shows up
+        if set(stats) != set(self._rows):
+            self._rows = {
+                stack: [common.Cell(
+                    '  ' * stack.count(';') + stack.split(';')[-1])] + [
+                    common.Cell() for i in range(4)]
+                for stack in sorted(stats)}
+            self.clear_rows()
+            self.add_row(self._header_row)
+            self.add_rows(list(self._rows.values()))
+        for stack, row in self._rows.items():
+            stage_stats = stats[stack]
+            row[1].set_text(str(stage_stats.count))
+            row[2].set_text(_format_ms(stage_stats.last))
+            row[3].set_text(_format_ms(stage_stats.average))
+            row[4].set_text(_format_ms(stage_stats.max))
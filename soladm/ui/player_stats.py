@@ -1,72 +1,71 @@
-from typing import Any, Sequence, List
-import urwid
+from typing import Any, Optional, Sequence, Tuple
 from soladm import net
+from soladm.latency import LatencyTracker
 from soladm.ui import common
+from soladm.ui.virtual_table import Column, VirtualTable
 
 
-def _pad(text: str, size: int) -> str:
-    return text + ' ' * max(0, size - len(text))
+TEAM_ATTRS = {
+    net.PlayerTeam.NONE: 'player_list_none',
+    net.PlayerTeam.ALPHA: 'player_list_alpha',
+    net.PlayerTeam.BRAVO: 'player_list_bravo',
+    net.PlayerTeam.CHARLIE: 'player_list_charlie',
+    net.PlayerTeam.DELTA: 'player_list_delta',
+    net.PlayerTeam.SPECTATOR: 'player_list_spec',
+}
 
+DEFAULT_SORT_COLUMN = 'Team'
 
-class PlayerStats(common.Table):
-    def __init__(self) -> None:
-        self._header_row = [
-            urwid.Text(_pad('ID', 2)),
-            urwid.Text(_pad('Nick', 24)),
-            urwid.Text(_pad('Team', 9)),
-            urwid.Text(_pad('Ping', 4)),
-            urwid.Text(_pad('HWID', 11)),
-            urwid.Text(_pad('IP', 15)),
-            urwid.Text(_pad('Score', 15)),
-        ]
 
-        super().__init__(column_count=len(self._header_row))
-        self.add_row(self._header_row)
+def _score(player: net.PlayerInfo) -> Tuple[int, int, int]:
+    return (player.kills, -player.deaths, player.caps)
+
 
-        self.ids = [urwid.Text('') for i in range(net.MAX_PLAYERS)]
-        self.names = [urwid.Text('') for i in range(net.MAX_PLAYERS)]
-        self.teams = [urwid.Text('') for i in range(net.MAX_PLAYERS)]
-        self.pings = [urwid.Text('') for i in range(net.MAX_PLAYERS)]
-        self.hwids = [urwid.Text('') for i in range(net.MAX_PLAYERS)]
-        self.ips = [urwid.Text('') for i in range(net.MAX_PLAYERS)]
-        self.scores = [urwid.Text('') for i in range(net.MAX_PLAYERS)]
+def _format_score(value: Tuple[int, int, int]) -> str:
+    kills, deaths, caps = value
+    return common.format_score(kills, -deaths, caps)
 
-        self._visible_rows: List[Sequence[urwid.Widget]] = []
-        self._all_rows: List[Sequence[urwid.Widget]] = []
-        for i in range(net.MAX_PLAYERS):
-            self._all_rows.append([
-                self.ids[i],
-                self.names[i],
-                self.teams[i],
-                self.pings[i],
-                self.hwids[i],
-                self.ips[i],
-                self.scores[i],
-            ])
 
-    def update(self, game_info: net.GameInfo) -> None:
-        if len(self._visible_rows) != len(game_info.players):
-            self._visible_rows = self._all_rows[0:len(game_info.players)]
-            self.clear_rows()
-            self.add_row(self._header_row)
-            self.add_rows(self._visible_rows)
+class PlayerStats(VirtualTable):
+    def __init__(self, latency_columns: Sequence[str] = ()) -> None:
+        self._latency: Optional[LatencyTracker] = None
+        columns = [
+            Column('ID', lambda player: player.id, min_width=2),
+            Column('Nick', lambda player: player.name, min_width=24),
+            Column(
+                'Team',
+                lambda player: player.team,
+                common.format_team,
+                min_width=9,
+                attr=TEAM_ATTRS.get),
+            Column('Ping', lambda player: player.ping, min_width=4),
+            Column(
+                'HWID',
+                lambda player: player.hwid,
+                lambda hwid: hwid or '-',
+                min_width=11),
+            Column('IP', lambda player: player.ip, min_width=15),
+            Column('Score', _score, _format_score, min_width=15),
+        ] + [
+            Column(
+                name.capitalize(),
+                self._latency_getter(name),
+                lambda value: '-' if value < 0 else str(value),
+                min_width=4)
+            for name in latency_columns
+        ]
+        super().__init__(columns, key=lambda player: player.id)
+        self.set_sort(self.find_column(DEFAULT_SORT_COLUMN) or 0)
 
-        def player_sort(player: net.PlayerInfo) -> Any:
-            return (player.team, player.id)
+    def _latency_getter(self, name: str) -> Any:
+        def getter(player: net.PlayerInfo) -> int:
+            summary = self._latency.get(player) if self._latency else None
+            return summary.get(name) if summary else -1
+        return getter
 
-        for i, player in enumerate(sorted(game_info.players, key=player_sort)):
-            cls = {
-                net.PlayerTeam.NONE: 'player_list_none',
-                net.PlayerTeam.ALPHA: 'player_list_alpha',
-                net.PlayerTeam.BRAVO: 'player_list_bravo',
-                net.PlayerTeam.CHARLIE: 'player_list_charlie',
-                net.PlayerTeam.DELTA: 'player_list_delta',
-                net.PlayerTeam.SPECTATOR: 'player_list_spec',
-            }[player.team]
-            self.ids[i].set_text(str(player.id))
-            self.names[i].set_text(player.name)
-            self.teams[i].set_text((cls, common.format_team_name(player)))
-            self.pings[i].set_text(str(player.ping))
-            self.hwids[i].set_text(player.hwid or '-')
-            self.ips[i].set_text(player.ip)
-            self.scores[i].set_text(common.format_player_score(player))
+    def update(
+            self,
+            game_info: net.GameInfo,
+            latency: Optional[LatencyTracker] = None) -> None:
+        self._latency = latency
+        self.set_items(game_info.players)
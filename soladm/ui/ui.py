@@ -1,49 +1,138 @@
 import asyncio
 from datetime import datetime
-from typing import Optional
+from typing import (
+    Any, Awaitable, Optional, Callable, Dict, Iterable, List, Sequence)
 from pathlib import Path
 import urwid
 from soladm import net
 from soladm import util
-from soladm.config import config
-from soladm.ui import common
+from soladm.balance import BalanceTracker, RatingStore
+from soladm.config import (
+    config, DEFAULT_LAYOUT, PANE_CONSOLE, PANE_PLAYERS, PANE_STATS)
+from soladm.heatmap import HeatmapTracker, LAYERS, LAYER_PLAYERS
+from soladm.identity import IdentityStore
+from soladm.latency import LatencyTracker, PingSummary
+from soladm.log_file import DEFAULT_SCROLLBACK
+from soladm.matches import MatchLog, MatchSummary
+from soladm.profiling import profiler
+from soladm.ui import autocomplete, common
 from soladm.ui.console import Console
 from soladm.ui.game_stats import GameStats
+from soladm.ui.heatmap_view import HeatmapView
+from soladm.ui.log_viewer import LogViewer
+from soladm.ui.perf_overlay import PerfOverlay
 from soladm.ui.player_stats import PlayerStats
 
 
+LOCAL_COMMAND_PREFIX = ':'
+HEATMAP_COLUMNS = 64
+
+
 def _get_log_prefix() -> str:
     return datetime.now().strftime('[%Y-%m-%d %H:%M:%S] ')
 
 
+def _format_timestamp(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _format_match_scores(summary: MatchSummary) -> str:
+    game_mode = net.GameMode(summary.game_mode)
+    if game_mode in (
+            net.GameMode.DeathMatch,
+            net.GameMode.PointMatch,
+            net.GameMode.RamboMatch):
+        return '-'
+    team_count = 4 if game_mode == net.GameMode.TeamMatch else 2
+    return ' - '.join(str(score) for score in summary.scores[:team_count])
+
+
+class MainLoop(urwid.MainLoop):
+    def draw_screen(self) -> None:
+        with profiler.measure('render'):
+            super().draw_screen()
+
+
 class MainWidget(urwid.Columns):
-    def __init__(self, game_info: net.GameInfo) -> None:
-        self.stats_table = GameStats()
-        self.players_table = PlayerStats()
-        self.console = Console(game_info)
-        super().__init__([
-            urwid.LineBox(self.console, title='Console'),
-            (
-                urwid.PACK,
-                common.TableColumn([
-                    (
-                        urwid.PACK,
-                        common.PackedLineBox(
-                            self.stats_table, title='Game stats')
-                    ),
-                    common.PackedLineBox(self.players_table, title='Players'),
-                ]),
-            ),
-        ])
-        self.contents[0][0].original_widget.set_focus(1)
-        self.set_focus(0)
+    # panes other than the console are created only once they're first shown;
+    # columns without the console take only as much room as they need
+    def __init__(
+            self,
+            game_info: net.GameInfo,
+            name_lookup: autocomplete.NameLookup = autocomplete.no_names,
+            latency_columns: Sequence[str] = (),
+            show_latency: bool = False,
+            scrollback: int = DEFAULT_SCROLLBACK,
+            layout: Sequence[Sequence[str]] = DEFAULT_LAYOUT,
+            hidden: Iterable[str] = ()) -> None:
+        self._latency_columns = latency_columns
+        self._show_latency = show_latency
+        self._layout = layout
+        self._hidden = set(hidden)
+        self.stats_table: Optional[GameStats] = None
+        self.players_table: Optional[PlayerStats] = None
+        self.console = Console(game_info, name_lookup, scrollback)
+        self.console.set_focus(1)
+        self._panes: Dict[str, urwid.Widget] = {
+            PANE_CONSOLE: urwid.LineBox(self.console, title='Console')}
+        super().__init__([])
+        self._arrange()
+
+    @property
+    def pane_names(self) -> List[str]:
+        return [name for column in self._layout for name in column]
+
+    def is_shown(self, name: str) -> bool:
+        return name in self.pane_names and name not in self._hidden
+
+    def set_shown(self, name: str, shown: bool) -> None:
+        if name not in self.pane_names or name == PANE_CONSOLE:
+            raise ValueError('Unknown pane: {}'.format(name))
+        if shown:
+            self._hidden.discard(name)
+        else:
+            self._hidden.add(name)
+        self._arrange()
+
+    def _get_pane(self, name: str) -> Any:
+        if name not in self._panes:
+            if name == PANE_STATS:
+                self.stats_table = GameStats(self._show_latency)
+                self._panes[name] = common.PackedLineBox(
+                    self.stats_table, title='Game stats')
+            elif name == PANE_PLAYERS:
+                self.players_table = PlayerStats(self._latency_columns)
+                self._panes[name] = common.PackedLineBox(
+                    self.players_table, title='Players')
+        if name == PANE_STATS:
+            return (urwid.PACK, self._panes[name])
+        return self._panes[name]
+
+    def _arrange(self) -> None:
+        contents = []
+        focus = 0
+        for column in self._layout:
+            names = [name for name in column if name not in self._hidden]
+            if not names:
+                continue
+            pile = common.TableColumn(
+                [self._get_pane(name) for name in names])
+            if PANE_CONSOLE in names:
+                pile.focus_position = names.index(PANE_CONSOLE)
+                focus = len(contents)
+                contents.append((pile, self.options()))
+            else:
+                contents.append((pile, self.options(urwid.PACK)))
+        self.contents[:] = contents
+        self.focus_position = focus
 
 
 class Ui:
     def __init__(
             self,
             connection: net.Connection,
-            log_path: Optional[Path]) -> None:
+            log_path: Optional[Path],
+            screen: Optional[urwid.BaseScreen] = None) -> None:
         self._connection = connection
         self._connection.on_connecting.append(self._on_connecting)
         self._connection.on_connect.append(self._on_connect)
@@ -51,16 +140,94 @@ class Ui:
         self._connection.on_message.append(self._on_message)
         self._connection.on_refresh.append(self._on_refresh)
         self._connection.on_exception.append(self._on_exception)
+        self._connection.on_outbox_expired.append(self._on_outbox_expired)
         self._refreshed = False
         self._log_path = log_path
 
-        self._main_widget = MainWidget(self._connection.game_info)
+        self._local_commands: Dict[str, Callable[[str], None]] = {
+            'heatmap': self._local_command_heatmap,
+            'help': self._local_command_help,
+            'hide': self._local_command_hide,
+            'show': self._local_command_show,
+            'sort': self._local_command_sort,
+        }
+
+        self._log_viewer: Optional[LogViewer] = None
+        if log_path:
+            self._local_commands['log'] = self._local_command_log
+
+        self._match_log: Optional[MatchLog] = None
+        if config.matches.path:
+            self._match_log = MatchLog(
+                Path(config.matches.path).expanduser(),
+                config.matches.max_size,
+                config.matches.backups)
+            self._local_commands['match'] = self._local_command_match
+            self._local_commands['matches'] = self._local_command_matches
+
+        self._balance: Optional[BalanceTracker] = None
+        if config.balance.path:
+            store = RatingStore(Path(config.balance.path).expanduser())
+            store.load()
+            self._balance = BalanceTracker(store, config.balance.move_penalty)
+            self._balance.attach(self._connection)
+            self._local_commands['balance'] = self._local_command_balance
+
+        name_lookup = autocomplete.no_names
+        self._identity: Optional[IdentityStore] = None
+        if config.identity.path:
+            self._identity = IdentityStore(Path(config.identity.path))
+            self._identity.on_known_player.append(self._on_known_player)
+            self._local_commands['whois'] = self._local_command_whois
+            name_lookup = self._identity.names_starting_with
+
+        self._latency: Optional[LatencyTracker] = None
+        if config.latency.enabled:
+            self._latency = LatencyTracker(
+                window=config.latency.window,
+                p95_alert=config.latency.p95_alert,
+                jitter_alert=config.latency.jitter_alert)
+            self._latency.on_alert.append(self._on_latency_alert)
+
+        self._main_widget = MainWidget(
+            self._connection.game_info,
+            name_lookup,
+            latency_columns=config.latency.columns,
+            show_latency=self._latency is not None,
+            scrollback=config.ui.scrollback,
+            layout=config.layout.columns,
+            hidden=config.layout.hidden)
         urwid.signals.connect_signal(
             self._main_widget.console.input_box, 'command', self._command)
         urwid.signals.connect_signal(
             self._main_widget.console.input_box, 'chat', self._chat)
-        self._loop = urwid.MainLoop(
-            self._main_widget, event_loop=urwid.AsyncioEventLoop())
+        self._perf_overlay = PerfOverlay()
+        self._perf_overlay_widget = common.PassiveOverlay(
+            common.PackedLineBox(self._perf_overlay, title='Performance'),
+            self._main_widget,
+            align=urwid.RIGHT,
+            width=60,
+            valign=urwid.BOTTOM,
+            height=urwid.PACK)
+        self._profiling_requested = profiler.enabled
+
+        self._heatmap = HeatmapTracker()
+        self._heatmap_layer = LAYER_PLAYERS
+        self._heatmap_view = HeatmapView(HEATMAP_COLUMNS)
+        self._heatmap_box = common.PackedLineBox(
+            self._heatmap_view, title='Heatmap')
+        self._heatmap_widget = common.PassiveOverlay(
+            self._heatmap_box,
+            self._main_widget,
+            align=urwid.RIGHT,
+            width=HEATMAP_COLUMNS + 2,
+            valign=urwid.BOTTOM,
+            height=urwid.PACK)
+        self._loop = MainLoop(
+            self._main_widget,
+            screen=screen,
+            event_loop=urwid.AsyncioEventLoop(),
+            unhandled_input=self._on_unhandled_input)
         self._loop.screen.set_terminal_properties(256)
 
         self._load_palette()
@@ -95,15 +262,285 @@ class Ui:
             self._log_to_ui('End of last log', prefix='')
 
     def start(self) -> None:
+        if self._identity:
+            self._identity.start()
         self._loop.start()
 
     def stop(self) -> None:
         self._loop.stop()
+        if self._log_viewer:
+            self._log_viewer.close()
+        if self._identity:
+            self._identity.close()
+        if self._balance:
+            self._balance.store.save()
+
+    def _on_unhandled_input(self, key: str) -> None:
+        if self._log_viewer:
+            return
+        if key == 'f2':
+            self._toggle_perf_overlay()
+        elif key == 'f3' and self._balance:
+            self._apply_balance()
+
+    def _toggle_perf_overlay(self) -> None:
+        if self._loop.widget is self._heatmap_widget:
+            self._loop.widget = self._main_widget
+        if self._loop.widget is self._perf_overlay_widget:
+            self._loop.widget = self._main_widget
+            profiler.enabled = self._profiling_requested
+        else:
+            self._loop.widget = self._perf_overlay_widget
+            profiler.enabled = True
+            self._perf_overlay.update(profiler.stats)
 
     def _command(self, text: str) -> None:
         self._main_widget.console.log_box.scroll_to_bottom()
+        if text.startswith(LOCAL_COMMAND_PREFIX):
+            self._local_command(text[len(LOCAL_COMMAND_PREFIX):])
+            return
         asyncio.ensure_future(self._connection.send(text))
 
+    def _local_command(self, text: str) -> None:
+        name, _, args = text.partition(' ')
+        func = self._local_commands.get(name)
+        if not func:
+            self._log('-*- Unknown command: {}{} (try {}help)'.format(
+                LOCAL_COMMAND_PREFIX, name, LOCAL_COMMAND_PREFIX))
+            return
+        func(args.strip())
+
+    def _local_command_help(self, args: str) -> None:
+        self._log('-*- Available commands: {}'.format(', '.join(
+            LOCAL_COMMAND_PREFIX + name
+            for name in sorted(self._local_commands))))
+
+    def _local_command_show(self, args: str) -> None:
+        self._set_pane_shown(args, True)
+
+    def _local_command_hide(self, args: str) -> None:
+        self._set_pane_shown(args, False)
+
+    def _set_pane_shown(self, name: str, shown: bool) -> None:
+        try:
+            self._main_widget.set_shown(name, shown)
+        except ValueError:
+            self._log('-*- Usage: {}{} {}'.format(
+                LOCAL_COMMAND_PREFIX,
+                'show' if shown else 'hide',
+                '|'.join(
+                    name for name in self._main_widget.pane_names
+                    if name != PANE_CONSOLE)))
+            return
+        # hidden panes weren't kept up to date
+        if shown and self._refreshed:
+            self._update_panes()
+
+    def _update_panes(self) -> None:
+        stats_table = self._main_widget.stats_table
+        if stats_table and self._main_widget.is_shown(PANE_STATS):
+            with profiler.measure('game_stats'):
+                stats_table.update(self._connection, self._latency)
+        players_table = self._main_widget.players_table
+        if players_table and self._main_widget.is_shown(PANE_PLAYERS):
+            with profiler.measure('player_stats'):
+                players_table.update(
+                    self._connection.game_info, self._latency)
+
+    def _local_command_sort(self, args: str) -> None:
+        table = self._main_widget.players_table
+        if not table:
+            self._log('-*- The player list is not shown')
+            return
+        column = table.find_column(args)
+        if column is None:
+            self._log('-*- Usage: {}sort {}'.format(
+                LOCAL_COMMAND_PREFIX,
+                '|'.join(column.title.lower() for column in table.columns)))
+            return
+        # sorting by the same column again reverses the order
+        table.set_sort(column)
+
+    def _local_command_heatmap(self, args: str) -> None:
+        words = args.split()
+        if words[:1] == ['export'] and len(words) in (2, 3):
+            layer = words[2] if len(words) == 3 else LAYER_PLAYERS
+            if layer not in LAYERS:
+                self._log('-*- Unknown layer: {}'.format(layer))
+                return
+            try:
+                self._heatmap.export(
+                    self._connection.game_info.map_name,
+                    layer,
+                    Path(words[1]).expanduser())
+            except (ValueError, OSError) as ex:
+                self._log('-*- Error exporting heatmap: {}'.format(ex))
+            else:
+                self._log('-*- Heatmap saved to {}'.format(words[1]))
+            return
+        if len(words) > 1 or (words and words[0] not in LAYERS):
+            self._log(
+                '-*- Usage: {prefix}heatmap [{layers}] or '
+                '{prefix}heatmap export PATH [{layers}]'.format(
+                    prefix=LOCAL_COMMAND_PREFIX, layers='|'.join(LAYERS)))
+            return
+        layer = words[0] if words else LAYER_PLAYERS
+        if self._loop.widget is self._heatmap_widget and (
+                layer == self._heatmap_layer):
+            self._loop.widget = self._main_widget
+            return
+        if self._loop.widget is self._perf_overlay_widget:
+            self._toggle_perf_overlay()
+        self._heatmap_layer = layer
+        self._loop.widget = self._heatmap_widget
+        self._update_heatmap_view()
+
+    def _update_heatmap_view(self) -> None:
+        map_name = self._connection.game_info.map_name
+        self._heatmap_box.set_title('Heatmap: {} ({})'.format(
+            map_name, self._heatmap_layer.replace('_', ' ')))
+        self._heatmap_view.update(
+            self._heatmap.get(map_name, self._heatmap_layer))
+
+    def _local_command_balance(self, args: str) -> None:
+        tracker = self._balance
+        assert tracker
+        if args == 'apply':
+            self._apply_balance()
+            return
+        if args:
+            self._log('-*- Usage: {}balance [apply]'.format(
+                LOCAL_COMMAND_PREFIX))
+            return
+        players = sorted(
+            (
+                player for player in self._connection.game_info.players
+                if player.team in (net.PlayerTeam.ALPHA, net.PlayerTeam.BRAVO)
+            ),
+            key=lambda player: (player.team, -tracker.rating(player)))
+        for player in players:
+            self._log('-*- {} ({}): {:.0f}'.format(
+                player.name,
+                common.format_team_name(player),
+                tracker.rating(player)))
+        suggestion = tracker.suggestion
+        if not suggestion:
+            self._log('-*- No teams to balance')
+            return
+        self._log('-*- Team ratings: {:.0f} - {:.0f}'.format(
+            suggestion.alpha, suggestion.bravo))
+        for move in suggestion.moves:
+            self._log('-*- Suggested: {} to {}'.format(
+                move.name, common.format_team(move.team)))
+        if not suggestion.moves:
+            self._log('-*- Teams are balanced')
+
+    def _apply_balance(self) -> None:
+        assert self._balance
+        moves = self._balance.apply()
+        if not moves:
+            self._log('-*- Teams are balanced')
+            return
+        self._log('-*- Balancing teams: {}'.format(', '.join(
+            '{} to {}'.format(move.name, common.format_team(move.team))
+            for move in moves)))
+
+    def _local_command_log(self, args: str) -> None:
+        assert self._log_path
+        if not self._log_path.exists():
+            self._log('-*- Nothing logged yet')
+            return
+        self._log_viewer = LogViewer(self._log_path, config.ui.classify)
+        urwid.signals.connect_signal(
+            self._log_viewer, 'close', self._close_log_viewer)
+        if args:
+            self._log_viewer.go_to_time(args)
+        else:
+            self._log_viewer.go_to_end()
+        self._loop.widget = self._log_viewer
+
+    def _close_log_viewer(self) -> None:
+        assert self._log_viewer
+        self._log_viewer.close()
+        self._log_viewer = None
+        self._loop.widget = self._main_widget
+
+    def _local_command_matches(self, args: str) -> None:
+        assert self._match_log
+        if args and not args.isdigit():
+            self._log('-*- Usage: {}matches [COUNT]'.format(
+                LOCAL_COMMAND_PREFIX))
+            return
+        summaries = self._match_log.recent(int(args) if args else 10)
+        if not summaries:
+            self._log('-*- No matches recorded yet')
+            return
+        for i, summary in reversed(list(enumerate(summaries, 1))):
+            self._log(
+                '-*- {idx}. {ended} {server} {map_name} ({game_mode}, '
+                '{minutes} min, {players} players, scores: {scores})'.format(
+                    idx=i,
+                    ended=_format_timestamp(summary.ended),
+                    server=summary.server,
+                    map_name=summary.map_name,
+                    game_mode=common.format_game_mode(
+                        net.GameMode(summary.game_mode)),
+                    minutes=int(summary.duration // 60),
+                    players=summary.peak_players,
+                    scores=_format_match_scores(summary)))
+
+    def _local_command_match(self, args: str) -> None:
+        assert self._match_log
+        if not args.isdigit() or not int(args):
+            self._log('-*- Usage: {}match NUMBER (1 is the latest)'.format(
+                LOCAL_COMMAND_PREFIX))
+            return
+        summaries = self._match_log.recent(int(args))
+        if len(summaries) < int(args):
+            self._log('-*- No such match')
+            return
+        summary = summaries[-1]
+        self._log('-*- {} on {}, {} - {} ({}), scores: {}'.format(
+            summary.map_name,
+            summary.server,
+            _format_timestamp(summary.started),
+            _format_timestamp(summary.ended),
+            summary.reason,
+            _format_match_scores(summary)))
+        if not summary.players:
+            return
+        max_nick_length = max(len(player.name) for player in summary.players)
+        for player in summary.players:
+            self._log(
+                ('-*- {name:%d} (team: {team}, score: {kills}/{deaths}, '
+                 'caps: {caps})' % max_nick_length).format(
+                    name=player.name,
+                    team=net.PlayerTeam(player.team).name.lower(),
+                    kills=player.kills,
+                    deaths=player.deaths,
+                    caps=player.caps))
+
+    def _local_command_whois(self, args: str) -> None:
+        assert self._identity
+        if not args:
+            self._log('-*- Usage: {}whois NAME|HWID|IP'.format(
+                LOCAL_COMMAND_PREFIX))
+            return
+        identities = self._identity.lookup(args)
+        if not identities:
+            self._log('-*- Nothing known about {}'.format(args))
+            return
+        max_nick_length = max(len(identity.name) for identity in identities)
+        for identity in identities:
+            self._log(
+                ('-*- {name:%d} (IP: {ip}, HWID: {hwid}, '
+                 'seen: {first_seen} - {last_seen})' % max_nick_length).format(
+                    name=identity.name,
+                    ip=identity.ip,
+                    hwid=identity.hwid or '-',
+                    first_seen=_format_timestamp(identity.first_seen),
+                    last_seen=_format_timestamp(identity.last_seen)))
+
     def _chat(self, text: str) -> None:
         self._main_widget.console.log_box.scroll_to_bottom()
         asyncio.ensure_future(self._connection.send('/say ' + text))
@@ -121,9 +558,31 @@ class Ui:
     def _on_message(self, message: str) -> None:
         self._log(message)
 
+    def _on_known_player(
+            self, name: str, hwid: str, names: List[str]) -> None:
+        self._log('-*- {} (HWID: {}) was previously seen as: {}'.format(
+            name, hwid, ', '.join(names)))
+
+    def _on_latency_alert(
+            self, player: net.PlayerInfo, summary: PingSummary) -> None:
+        self._log(
+            '-*- Unstable connection: {} (ping p95: {} ms, '
+            'jitter: {} ms)'.format(
+                player.name, summary.p95, summary.get('jitter')))
+
     def _on_refresh(self) -> None:
-        self._main_widget.stats_table.update(self._connection)
-        self._main_widget.players_table.update(self._connection.game_info)
+        with profiler.measure('heatmap'):
+            self._heatmap.update(self._connection.game_info)
+        if self._loop.widget is self._heatmap_widget:
+            self._update_heatmap_view()
+        if self._latency:
+            with profiler.measure('latency'):
+                self._latency.update(self._connection.game_info.players)
+        self._update_panes()
+        if self._loop.widget is self._perf_overlay_widget:
+            self._perf_overlay.update(profiler.stats)
+        if self._identity:
+            self._identity.update(self._connection.game_info.players)
 
         if self._refreshed:
             return
@@ -147,6 +606,10 @@ class Ui:
         else:
             self._log('-*- (no players)')
 
+    def _on_outbox_expired(self, texts: List[str]) -> None:
+        for text in texts:
+            self._log('-*- Not sent, disconnected for too long: ' + text)
+
     def _on_exception(self, exception: Exception) -> None:
         self._log('-*- Exception: {} ({})'.format(type(exception), exception))
 
@@ -166,6 +629,11 @@ class Ui:
             self._log_to_ui('~*~ Error writing log file: {}'.format(ex))
 
     def _log_to_ui(self, text: str, prefix: Optional[str] = None) -> None:
+        with profiler.measure('log_to_ui'):
+            self._log_to_ui_impl(text, prefix)
+
+    def _log_to_ui_impl(
+            self, text: str, prefix: Optional[str] = None) -> None:
         if prefix is None:
             prefix = _get_log_prefix()
         if any(pattern.match(text) for pattern in config.ui.filter_regexes):
@@ -173,18 +641,16 @@ class Ui:
         if any(pattern.match(text) for pattern in config.ui.bell_regexes):
             self._loop.screen.write('\N{BEL}')
 
-        text_class = 'default'
-        for key, pattern in config.ui.color_assignment_regexes:
-            if pattern.match(text):
-                text_class = key
-
-        self._main_widget.console.log_box.body.append(
-            urwid.Text([('timestamp', prefix), (text_class, text)]))
-        if self._main_widget.console.log_box.auto_scroll:
-            self._main_widget.console.log_box.scroll_to_bottom()
+        self._main_widget.console.append(
+            prefix, config.ui.classify(text), text)
 
 
-def run(connection: net.Connection, log_path: Optional[Path]) -> None:
+def run(
+        connection: net.Connection,
+        log_path: Optional[Path],
+        shutdown: Iterable[Callable[[], Awaitable[None]]] = ()) -> None:
+    # the shutdown coroutines get to finish what they're doing while the
+    # event loop still runs
     ui = Ui(connection, log_path)
     ui.start()
     loop = asyncio.get_event_loop()
@@ -195,4 +661,6 @@ def run(connection: net.Connection, log_path: Optional[Path]) -> None:
         pass
     loop.run_until_complete(connection.close())
     ui.stop()
+    for func in shutdown:
+        loop.run_until_complete(func())
     loop.close()
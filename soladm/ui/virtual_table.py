@@ -0,0 +1,328 @@
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence
+import urwid
+from urwid.util import calc_width
+from soladm.ui import common
+
+
+SORT_ASCENDING = '▲'
+SORT_DESCENDING = '▼'
+
+
+def _width(text: str) -> int:
+    return calc_width(text, 0, len(text))
+
+
+class Column:
+    # value() is what rows are sorted by, text() turns it into the cell;
+    # columns without a fixed width grow to fit the widest cell
+    def __init__(
+            self,
+            title: str,
+            value: Callable[[Any], Any],
+            text: Callable[[Any], str] = str,
+            width: Optional[int] = None,
+            min_width: int = 0,
+            attr: Optional[Callable[[Any], Optional[str]]] = None) -> None:
+        self.title = title
+        self.value = value
+        self.text = text
+        self.width = width
+        self.min_width = min_width
+        self.attr = attr
+
+
+class _Row:
+    __slots__ = (
+        'key', 'item', 'values', 'texts', 'widths', 'widget', 'stale')
+
+    def __init__(self, key: Hashable, item: Any) -> None:
+        self.key = key
+        self.item = item
+        self.values: Sequence[Any] = ()
+        self.texts: List[str] = []
+        self.widths: List[int] = []
+        self.widget: Optional[urwid.Widget] = None
+        self.stale = True
+
+
+class VirtualTable(urwid.Widget):
+    # one text widget per row instead of one per cell, created only once the
+    # row is scrolled into view and updated only when its cells change. in a
+    # box it shows the rows around the focus, as a flow widget all of them.
+    _sizing = frozenset([urwid.FLOW, urwid.BOX])
+
+    def __init__(
+            self,
+            columns: Sequence[Column],
+            key: Callable[[Any], Hashable],
+            selectable: bool = False,
+            focus_attr: Optional[str] = None,
+            header_attr: Optional[str] = None,
+            numbered: bool = False,
+            divider: int = 2) -> None:
+        super().__init__()
+        self.columns = list(columns)
+        self._key = key
+        self._selectable = selectable
+        self._focus_attr = focus_attr
+        self._numbered = numbered
+        self._divider = divider
+        self._rows: Dict[Hashable, _Row] = {}
+        self._visible: List[_Row] = []
+        self._focus = 0
+        self._top = 0
+        self._widths: List[int] = []
+        self._widths_stale = True
+        self._needs_rebuild = False
+        self.sort_column = 0
+        self.sort_reverse = False
+        self.filter_column: Optional[int] = None
+        self.filter_text = ''
+        self._header_text = urwid.Text('', wrap=urwid.CLIP)
+        self._header: urwid.Widget = self._header_text
+        if header_attr:
+            self._header = urwid.AttrMap(self._header_text, header_attr)
+        self._header_stale = True
+
+    @property
+    def items(self) -> List[Any]:
+        return [row.item for row in self._rows.values()]
+
+    @property
+    def visible_items(self) -> List[Any]:
+        return [row.item for row in self._visible]
+
+    @property
+    def focused_item(self) -> Any:
+        if not self._visible:
+            return None
+        return self._visible[self._focus].item
+
+    @property
+    def widths(self) -> List[int]:
+        if self._widths_stale:
+            self._update_widths()
+        return self._widths
+
+    def set_items(self, items: Sequence[Any]) -> None:
+        rows: Dict[Hashable, _Row] = {}
+        for item in items:
+            key = self._key(item)
+            row = self._rows.get(key) or _Row(key, item)
+            row.item = item
+            self._update_row(row)
+            rows[key] = row
+        if rows.keys() != self._rows.keys():
+            self._widths_stale = True
+            self._needs_rebuild = True
+        self._rows = rows
+        self.rebuild()
+
+    def update_item(self, item: Any) -> bool:
+        # the new values are only applied to the order on the next rebuild,
+        # so that a burst of updates costs a single sort
+        row = self._rows.get(self._key(item))
+        if not row:
+            return False
+        row.item = item
+        return self._update_row(row)
+
+    def rebuild(self, force: bool = False) -> None:
+        if not force and not self._needs_rebuild:
+            return
+        self._needs_rebuild = False
+        focused = self._visible[self._focus] if self._visible else None
+        column = self.sort_column
+        self._visible = sorted(
+            (row for row in self._rows.values() if self._matches(row)),
+            key=lambda row: (row.values[column], row.key),
+            reverse=self.sort_reverse)
+        if focused in self._visible:
+            self._focus = self._visible.index(focused)
+        else:
+            self._focus = 0
+        self._invalidate()
+
+    def set_sort(self, column: int) -> None:
+        if self.sort_column == column:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_column = column
+            self.sort_reverse = False
+        self._header_stale = True
+        self.rebuild(force=True)
+
+    def find_column(self, title: str) -> Optional[int]:
+        for i, column in enumerate(self.columns):
+            if column.title.lower() == title.strip().lower():
+                return i
+        return None
+
+    def set_filter(self, query: str) -> None:
+        # "text" matches any cell, "column:text" only the given column
+        self.filter_column = None
+        self.filter_text = query.strip().lower()
+        if ':' in query:
+            title, text = query.split(':', 1)
+            column = self.find_column(title)
+            if column is not None:
+                self.filter_column = column
+                self.filter_text = text.strip().lower()
+        self.rebuild(force=True)
+
+    def selectable(self) -> bool:
+        return self._selectable
+
+    def rows(self, size: common.Size, focus: bool = False) -> int:
+        return 1 + len(self._visible)
+
+    def pack(self, size: common.Size, focus: bool = False) -> common.Size:
+        widths = self.widths
+        width = sum(widths) + self._divider * max(0, len(widths) - 1)
+        if size:
+            width = min(width, size[0])
+        return (width, 1 + len(self._visible))
+
+    def keypress(self, size: common.Size, key: str) -> Optional[str]:
+        if not self._selectable or not self._visible:
+            return key
+        page = max(1, size[1] - 2) if len(size) == 2 else 1
+        focus = {
+            'up': self._focus - 1,
+            'down': self._focus + 1,
+            'page up': self._focus - page,
+            'page down': self._focus + page,
+            'home': 0,
+            'end': len(self._visible) - 1,
+        }.get(key)
+        if focus is None:
+            return key
+        focus = max(0, min(focus, len(self._visible) - 1))
+        if focus == self._focus and key in ('up', 'down'):
+            return key
+        self._focus = focus
+        self._invalidate()
+        return None
+
+    def render(
+            self,
+            size: common.Size,
+            focus: bool = False) -> urwid.Canvas:
+        maxcol = size[0]
+        if self._widths_stale:
+            self._update_widths()
+        if self._header_stale:
+            self._update_header()
+        if len(size) == 2:
+            rows = self._window(size[1] - 1)
+        else:
+            rows = list(enumerate(self._visible))
+        canvases = [(self._header.render((maxcol,)), None, False)]
+        for i, row in rows:
+            row_focus = focus and self._selectable and i == self._focus
+            canvases.append((
+                self._row_widget(row).render((maxcol,), row_focus),
+                None,
+                row_focus))
+        canvas = urwid.CanvasCombine(canvases)
+        if len(size) == 2:
+            canvas.pad_trim_top_bottom(0, size[1] - canvas.rows())
+        return canvas
+
+    def _window(self, height: int) -> List[Any]:
+        # keeps the scroll position stable and the focused row on screen
+        if height <= 0:
+            return []
+        if self._focus < self._top:
+            self._top = self._focus
+        elif self._focus >= self._top + height:
+            self._top = self._focus - height + 1
+        self._top = max(0, min(self._top, len(self._visible) - height))
+        return list(enumerate(
+            self._visible[self._top:self._top + height], self._top))
+
+    def _update_row(self, row: _Row) -> bool:
+        values = [column.value(row.item) for column in self.columns]
+        if values == row.values:
+            return False
+        row.values = values
+        self._needs_rebuild = True
+        texts = [
+            column.text(value) for column, value in zip(self.columns, values)]
+        row.stale = True
+        if texts != row.texts:
+            row.texts = texts
+            row.widths = [_width(text) for text in texts]
+            self._widths_stale = True
+        return True
+
+    def _update_widths(self) -> None:
+        self._widths_stale = False
+        widths = []
+        for i, column in enumerate(self.columns):
+            if column.width is not None:
+                widths.append(column.width)
+                continue
+            # room for the sort marker, so that sorting doesn't move columns
+            width = max(column.min_width, _width(self._title(i)) + 1)
+            for row in self._rows.values():
+                width = max(width, row.widths[i])
+            widths.append(width)
+        if widths != self._widths:
+            self._widths = widths
+            self._header_stale = True
+            for row in self._rows.values():
+                row.stale = True
+
+    def _title(self, column: int) -> str:
+        if self._numbered:
+            return '{}:{}'.format(column + 1, self.columns[column].title)
+        return self.columns[column].title
+
+    def _update_header(self) -> None:
+        self._header_stale = False
+        titles = []
+        for i in range(len(self.columns)):
+            title = self._title(i)
+            if i == self.sort_column:
+                title += (
+                    SORT_DESCENDING if self.sort_reverse else SORT_ASCENDING)
+            titles.append(title)
+        self._header_text.set_text(self._format_line(titles))
+
+    def _row_widget(self, row: _Row) -> urwid.Widget:
+        if row.widget is None:
+            text = urwid.Text('', wrap=urwid.CLIP)
+            row.widget = text
+            if self._focus_attr:
+                row.widget = urwid.AttrMap(text, None, self._focus_attr)
+        if row.stale:
+            row.stale = False
+            text = row.widget
+            if self._focus_attr:
+                text = row.widget.original_widget
+            text.set_text(self._format_line(row.texts, row.values))
+        return row.widget
+
+    def _format_line(
+            self,
+            texts: List[str],
+            values: Optional[Sequence[Any]] = None) -> Any:
+        markup: List[Any] = []
+        for i, (column, text, width) in enumerate(
+                zip(self.columns, texts, self._widths)):
+            if _width(text) > width:
+                text = text[0:width]
+            cell = text + ' ' * (width - _width(text))
+            if i:
+                markup.append(' ' * self._divider)
+            attr = column.attr(values[i]) if values and column.attr else None
+            markup.append((attr, cell) if attr else cell)
+        return markup or ''
+
+    def _matches(self, row: _Row) -> bool:
+        if not self.filter_text:
+            return True
+        if self.filter_column is not None:
+            return self.filter_text in row.texts[self.filter_column].lower()
+        return any(self.filter_text in text.lower() for text in row.texts)
@@ -1,5 +1,6 @@
 import os
-from typing import Any, List
+import time
+from typing import Any, Callable, Dict, Hashable, List
 
 
 def tail(handle: Any, lines: int, _buffer: int = 256) -> List[bytes]:
@@ -14,3 +15,32 @@ def tail(handle: Any, lines: int, _buffer: int = 256) -> List[bytes]:
         lines_found = handle.readlines()
         block_counter -= 1
     return lines_found[-lines:]
+
+
+class Cooldown:
+    def __init__(
+            self,
+            seconds: float,
+            clock: Callable[[], float] = time.monotonic) -> None:
+        self.seconds = seconds
+        self._clock = clock
+        self._last: Dict[Hashable, float] = {}
+
+    def remaining(self, key: Hashable) -> float:
+        last = self._last.get(key)
+        if last is None:
+            return 0.0
+        return max(0.0, last + self.seconds - self._clock())
+
+    def ready(self, key: Hashable) -> bool:
+        now = self._clock()
+        last = self._last.get(key)
+        if last is not None and now - last < self.seconds:
+            return False
+        self._last[key] = now
+        if len(self._last) > 1024:
+            self._last = {
+                key: value
+                for key, value in self._last.items()
+                if now - value < self.seconds}
+        return True